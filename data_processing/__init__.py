@@ -1,12 +0,0 @@
-from .base_processor import BaseProcessor, DataProcessor
-from .cleaning_processor import CleaningProcessor
-from .transform_processor import TransformProcessor
-from .feature_processor import FeatureProcessor
-
-__all__ = [
-    'BaseProcessor',
-    'DataProcessor',
-    'CleaningProcessor',
-    'TransformProcessor',
-    'FeatureProcessor'
-]
@@ -0,0 +1,234 @@
+"""基准测试用的合成实验室数据
+
+按 database/schema/tables/core_tables.sql 中 experiments、samples、analysis_results
+三张表的列与取值分布生成数据（枚举列取枚举值，DECIMAL 列含缺失值与异常值，时间列为时间戳），
+并为每个数据集提供一份对应的处理配置。
+
+生成按块进行，第 i 块只依赖 (seed, i)，因此同一参数下的数据在整体生成与分块生成时完全一致，
+5000 万行这样超出内存的规模可以直接交给 DataProcessor.process_stream。
+"""
+from typing import Any, Callable, Dict, Iterator
+import numpy as np
+import pandas as pd
+
+EXPERIMENT_STATUSES = ['planned', 'setup', 'running', 'paused', 'completed', 'failed', 'cancelled']
+SAMPLE_TYPES = ['raw_material', 'intermediate', 'final_product', 'control', 'standard']
+SAMPLE_STATUSES = ['prepared', 'in_analysis', 'completed', 'disposed', 'stored']
+ANALYSIS_TYPES = [
+    'xrd', 'sem', 'tem', 'ftir', 'raman', 'uv_vis', 'tga', 'dsc', 'bet', 'particle_size'
+]
+VALIDATION_STATUSES = ['pending', 'validated', 'rejected', 'needs_review']
+
+# 每个实验平均的样品数、每个样品平均的分析结果数
+SAMPLES_PER_EXPERIMENT = 20
+RESULTS_PER_SAMPLE = 50
+
+EPOCH = np.datetime64('2023-01-01T00:00:00', 's')
+
+
+def generate_experiments(rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """experiments 表：实验编号、协议版本、目标温度/压力、状态与时间"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start, start + rows)
+    planned = EPOCH + (ids * 3600 + rng.integers(0, 3600, rows)).astype('timedelta64[s]')
+    delay = rng.exponential(7200, rows).astype('int64').astype('timedelta64[s]')
+    
+    data = pd.DataFrame({
+        'experiment_code': _codes('EXP', ids),
+        'name': _codes('Experiment ', ids),
+        'protocol_version': _choice(rng, [f'v{major}.{minor}' for major in range(1, 4) for minor in range(5)], rows),
+        'target_temperature': np.round(rng.normal(150, 60, rows), 2),
+        'target_pressure': np.round(rng.lognormal(4.5, 0.8, rows), 2),
+        'status': _choice(rng, EXPERIMENT_STATUSES, rows),
+        'created_by': _choice(rng, [f'user_{i:03d}' for i in range(100)], rows),
+        'planned_start_time': planned,
+        'actual_start_time': planned + delay
+    }, index=pd.RangeIndex(start, start + rows))
+    _add_missing(rng, data, {'target_temperature': 0.05, 'target_pressure': 0.08, 'actual_start_time': 0.1})
+    _add_outliers(rng, data, 'target_temperature', 0.002, 5000.0)
+    return data
+
+
+def generate_samples(rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """samples 表：样品编号、所属实验、类型/状态枚举、质量/体积/浓度与制备时间"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start, start + rows)
+    
+    data = pd.DataFrame({
+        'sample_code': _codes('SMP', ids),
+        'experiment_code': _codes('EXP', ids // SAMPLES_PER_EXPERIMENT),
+        'type': _choice(rng, SAMPLE_TYPES, rows),
+        'status': _choice(rng, SAMPLE_STATUSES, rows),
+        'material_type': _choice(rng, [f'material_{i:02d}' for i in range(60)], rows),
+        'mass': np.round(rng.lognormal(1.0, 0.6, rows), 4),
+        'volume': np.round(rng.lognormal(2.0, 0.5, rows), 4),
+        'concentration': np.round(rng.gamma(2.0, 0.25, rows), 4),
+        'preparation_date': EPOCH + (ids * 180 + rng.integers(0, 180, rows)).astype('timedelta64[s]'),
+        'storage_location': _choice(rng, [f'freezer_{i}/shelf_{j}' for i in range(10) for j in range(8)], rows),
+        'quality_status': _choice(rng, ['pass', 'fail', 'pending'], rows)
+    }, index=pd.RangeIndex(start, start + rows))
+    _add_missing(rng, data, {'mass': 0.03, 'volume': 0.05, 'concentration': 0.1, 'quality_status': 0.2})
+    _add_outliers(rng, data, 'mass', 0.001, 1e4)
+    return data
+
+
+def generate_measurements(rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """analysis_results 表展开后的测量值：每个样品一串按时间排列的分析结果"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start, start + rows)
+    samples = ids // RESULTS_PER_SAMPLE
+    started = EPOCH + (ids * 60 + rng.integers(0, 60, rows)).astype('timedelta64[s]')
+    
+    data = pd.DataFrame({
+        'result_code': _codes('RES', ids),
+        'sample_code': _codes('SMP', samples),
+        'experiment_code': _codes('EXP', samples // SAMPLES_PER_EXPERIMENT),
+        'analysis_type': _choice(rng, ANALYSIS_TYPES, rows),
+        'analysis_version': _choice(rng, ['1.0.0', '1.1.0', '1.2.3', '2.0.0'], rows),
+        'measurement': rng.normal(100, 15, rows) + (samples % 97),
+        'confidence_score': np.round(rng.beta(8, 2, rows), 4),
+        'validation_status': _choice(rng, VALIDATION_STATUSES, rows),
+        'is_valid': rng.random(rows) > 0.03,
+        'started_at': started,
+        'duration_seconds': rng.gamma(2.0, 30.0, rows)
+    }, index=pd.RangeIndex(start, start + rows))
+    _add_missing(rng, data, {'measurement': 0.02, 'confidence_score': 0.05, 'validation_status': 0.1})
+    _add_outliers(rng, data, 'measurement', 0.001, 1e5)
+    return data
+
+
+DATASETS: Dict[str, Callable[..., pd.DataFrame]] = {
+    'experiments': generate_experiments,
+    'samples': generate_samples,
+    'measurements': generate_measurements
+}
+
+# 各数据集对应的处理配置（与 processing_config.yml 的结构一致）
+DATASET_CONFIGS: Dict[str, Dict[str, Any]] = {
+    'experiments': {
+        'cleaning': {
+            'remove_duplicates': True,
+            'null_handling': {
+                'target_temperature': 'median',
+                'target_pressure': 'mean'
+            },
+            'outlier_handling': {
+                'target_temperature': {'method': 'iqr'}
+            }
+        },
+        'transform': {
+            'scaling': {
+                'target_temperature': 'standard',
+                'target_pressure': 'minmax'
+            },
+            'encoding': {
+                'status': 'onehot',
+                'protocol_version': 'label',
+                'created_by': 'frequency'
+            }
+        },
+        'feature': {
+            'datetime_features': ['planned_start_time']
+        }
+    },
+    'samples': {
+        'cleaning': {
+            'remove_duplicates': True,
+            'null_handling': {
+                'mass': 'median',
+                'volume': 'mean',
+                'concentration': 'mean',
+                'quality_status': 'mode'
+            },
+            'outlier_handling': {
+                'mass': {'method': 'iqr'}
+            }
+        },
+        'transform': {
+            'scaling': {
+                'mass': 'minmax',
+                'concentration': 'standard'
+            },
+            'encoding': {
+                'type': 'onehot',
+                'status': 'label',
+                'material_type': 'frequency'
+            }
+        },
+        'feature': {
+            'feature_combinations': [
+                {
+                    'name': 'density',
+                    'columns': ['mass', 'volume'],
+                    'method': 'divide'
+                }
+            ],
+            'datetime_features': ['preparation_date']
+        }
+    },
+    'measurements': {
+        'cleaning': {
+            'remove_duplicates': True,
+            'null_handling': {
+                'measurement': 'mean',
+                'confidence_score': 'median',
+                'validation_status': 'mode'
+            },
+            'outlier_handling': {
+                'measurement': {'method': 'iqr'}
+            }
+        },
+        'transform': {
+            'scaling': {
+                'measurement': 'standard'
+            },
+            'encoding': {
+                'analysis_type': 'onehot',
+                'validation_status': 'label',
+                'analysis_version': 'frequency'
+            }
+        },
+        'feature': {
+            'datetime_features': ['started_at'],
+            'window_features': [
+                {
+                    'column': 'measurement',
+                    'window': 5,
+                    'group_by': 'sample_code',
+                    'operations': ['mean', 'std']
+                }
+            ]
+        }
+    }
+}
+
+
+def generate(name: str, rows: int, seed: int = 0, chunksize: int = 1000000) -> pd.DataFrame:
+    """整体生成一个数据集（与 iter_dataset 分块生成的结果一致）"""
+    return pd.concat(list(iter_dataset(name, rows, seed, chunksize)))
+
+
+def iter_dataset(name: str, rows: int, seed: int = 0, chunksize: int = 1000000) -> Iterator[pd.DataFrame]:
+    """分块生成数据集，索引在块之间连续"""
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset: {name}")
+    generator = DATASETS[name]
+    for number, start in enumerate(range(0, rows, chunksize)):
+        yield generator(min(chunksize, rows - start), seed=seed * 100003 + number, start=start)
+
+
+def _codes(prefix: str, ids: np.ndarray) -> np.ndarray:
+    return np.char.add(prefix, np.char.zfill(ids.astype(str), 9)).astype(object)
+
+
+def _choice(rng: np.random.Generator, values: list, rows: int) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+
+def _add_missing(rng: np.random.Generator, data: pd.DataFrame, rates: Dict[str, float]) -> None:
+    for col, rate in rates.items():
+        data.loc[rng.random(len(data)) < rate, col] = None
+
+
+def _add_outliers(rng: np.random.Generator, data: pd.DataFrame, col: str, rate: float, value: float) -> None:
+    data.loc[rng.random(len(data)) < rate, col] = value
@@ -0,0 +1,238 @@
+"""处理器吞吐量基准
+
+在合成的实验室数据（见 datasets.py）上分别测量 CleaningProcessor、TransformProcessor、
+FeatureProcessor 以及完整处理链的吞吐量（行/秒）、峰值 RSS 和每个阶段/操作的耗时，
+结果写入 JSON，可以与之前某次提交的结果对比，吞吐量低于基线超过容差时标记为回退并以非零状态退出。
+
+行数不超过 --chunksize 时整体处理；超过时按块生成并通过 process_stream 流式处理
+（耗时包含数据生成，统计遍历会重复生成数据）。默认每个用例在独立的子进程中运行，
+峰值 RSS 只反映该用例（包含生成的输入数据）。
+
+用法:
+    python -m data_processing.benchmarks.processing_benchmark --rows 10000,1000000 --output bench.json
+    python -m data_processing.benchmarks.processing_benchmark --rows 50000000 --datasets measurements --stages chain
+    python -m data_processing.benchmarks.processing_benchmark --output new.json --baseline bench.json --tolerance 0.1
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import concurrent.futures
+import copy
+import datetime
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from data_processing.processors import (
+    DataProcessor,
+    CleaningProcessor,
+    TransformProcessor,
+    FeatureProcessor
+)
+from data_processing.benchmarks.datasets import DATASETS, DATASET_CONFIGS, generate, iter_dataset
+
+STAGES = {
+    'cleaning': [('cleaning', CleaningProcessor)],
+    'transform': [('transform', TransformProcessor)],
+    'feature': [('feature', FeatureProcessor)],
+    'chain': [
+        ('cleaning', CleaningProcessor),
+        ('transform', TransformProcessor),
+        ('feature', FeatureProcessor)
+    ]
+}
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+
+
+def build_processor(dataset: str, stage: str) -> DataProcessor:
+    config = copy.deepcopy(DATASET_CONFIGS[dataset])
+    config['execution'] = {'profile': True}
+    processor = DataProcessor(config)
+    for section, processor_class in STAGES[stage]:
+        processor.add_processor(processor_class(config[section]))
+    return processor
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """当前进程的峰值 RSS（Windows 上不可用）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return int(peak) if sys.platform == 'darwin' else int(peak) * 1024
+
+
+def run_case(dataset: str, rows: int, stage: str, repeat: int = 3, chunksize: int = 1000000) -> Dict[str, Any]:
+    """运行一个用例，取多次运行中耗时最短的一次"""
+    streaming = rows > chunksize
+    data = None if streaming else generate(dataset, rows)
+    
+    runs = []
+    for _ in range(repeat):
+        processor = build_processor(dataset, stage)
+        start = time.perf_counter()
+        if streaming:
+            output_rows = 0
+            for chunk in processor.process_stream(lambda: iter_dataset(dataset, rows, chunksize=chunksize)):
+                output_rows += len(chunk)
+        else:
+            output_rows = len(processor.process(data))
+        seconds = time.perf_counter() - start
+        runs.append((seconds, output_rows, processor.profiler.summary()))
+        
+    seconds, output_rows, summary = min(runs, key=lambda run: run[0])
+    return {
+        'dataset': dataset,
+        'rows': rows,
+        'stage': stage,
+        'mode': 'stream' if streaming else 'memory',
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else float('inf'),
+        'output_rows': output_rows,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'input_bytes': None if data is None else int(data.memory_usage(deep=True).sum()),
+        'stage_seconds': {
+            entry['name']: entry['wall_seconds'] for entry in summary if entry['depth'] == 0
+        },
+        'operation_seconds': {
+            entry['path']: entry['self_seconds'] for entry in summary if entry['depth'] > 0
+        }
+    }
+
+
+def run(
+    datasets: List[str],
+    rows: List[int],
+    stages: List[str],
+    repeat: int = 3,
+    chunksize: int = 1000000,
+    isolate: bool = True
+) -> List[Dict[str, Any]]:
+    results = []
+    for dataset in datasets:
+        for count in rows:
+            for stage in stages:
+                if isolate:
+                    # 每个用例使用新的子进程，避免前一个用例抬高峰值 RSS
+                    context = multiprocessing.get_context('spawn')
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        result = executor.submit(run_case, dataset, count, stage, repeat, chunksize).result()
+                else:
+                    result = run_case(dataset, count, stage, repeat, chunksize)
+                print(format_result(result), flush=True)
+                results.append(result)
+    return results
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['dataset']}/{result['rows']}/{result['stage']}"
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float = 0.1
+) -> List[Dict[str, Any]]:
+    """与基线逐用例比较吞吐量，返回低于基线 (1 - tolerance) 倍的用例"""
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result_key(result))
+        if base is None:
+            continue
+        ratio = result['rows_per_second'] / base['rows_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append({
+                'case': result_key(result),
+                'baseline_rows_per_second': base['rows_per_second'],
+                'rows_per_second': result['rows_per_second'],
+                'ratio': ratio
+            })
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境与当前提交，便于在不同提交之间比较结果"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    rss = result['peak_rss_bytes']
+    stages = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in result['stage_seconds'].items())
+    return (
+        f"{result_key(result):>32} [{result['mode']}]: {result['seconds']:.3f}s, "
+        f"{result['rows_per_second']:,.0f} rows/s, "
+        f"peak RSS {'n/a' if rss is None else f'{rss / 2**20:.0f} MiB'} ({stages})"
+    )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(float(item)) for item in value.split(',') if item]
+
+
+def _name_list(choices: Any):
+    def parse(value: str) -> List[str]:
+        names = [item for item in value.split(',') if item]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown: {', '.join(unknown)}")
+        return names
+    return parse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark data_processing processors on synthetic lab data')
+    parser.add_argument('--datasets', type=_name_list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--rows', type=_int_list, default=DEFAULT_ROWS, help='comma separated, e.g. 10000,1e6,5e7')
+    parser.add_argument('--stages', type=_name_list(STAGES), default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--chunksize', type=int, default=1000000, help='larger inputs are streamed in chunks')
+    parser.add_argument('--no-isolate', dest='isolate', action='store_false', help='run all cases in this process')
+    parser.add_argument('--output', default=None, help='JSON file for the results')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative throughput drop')
+    args = parser.parse_args()
+    
+    results = run(args.datasets, args.rows, args.stages, args.repeat, args.chunksize, args.isolate)
+    report = {'environment': environment(), 'results': results}
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['baseline'] = baseline.get('environment')
+        report['regressions'] = compare(results, baseline['results'], args.tolerance)
+        for regression in report['regressions']:
+            print(
+                f"REGRESSION {regression['case']}: {regression['rows_per_second']:,.0f} rows/s "
+                f"vs {regression['baseline_rows_per_second']:,.0f} rows/s ({regression['ratio']:.2f}x)"
+            )
+            
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,16 @@ from data_processing.processors import (
     DataProcessor,
     CleaningProcessor,
     TransformProcessor,
-    FeatureProcessor
+    FeatureProcessor,
+    MemoryOptimizer
 )
 import pandas as pd
 
 # 配置
 config = {
+    'memory': {
+        'category_threshold': 0.5
+    },
     'cleaning': {
         'remove_duplicates': True,
         'null_handling': {
@@ -50,18 +54,35 @@ config = {
     }
 }
 
-def process_data(data: pd.DataFrame) -> pd.DataFrame:
-    """处理数据"""
-    # 创建处理器
+def build_processor() -> DataProcessor:
+    """创建处理器"""
     processor = DataProcessor(config)
     
     # 添加处理步骤
+    processor.add_processor(MemoryOptimizer(config['memory']))
     processor.add_processor(CleaningProcessor(config['cleaning']))
     processor.add_processor(TransformProcessor(config['transform']))
     processor.add_processor(FeatureProcessor(config['feature']))
-    
+    return processor
+
+def process_data(data: pd.DataFrame) -> pd.DataFrame:
+    """处理数据"""
     # 执行处理
-    return processor.process(data)
+    return build_processor().process(data)
+
+def process_large_file(input_path: str, output_path: str, chunksize: int = 100000) -> int:
+    """分块处理超出内存的大文件（CSV/Parquet）"""
+    return build_processor().process_file(input_path, output_path, chunksize=chunksize)
+
+def fit_state(data: pd.DataFrame, state_path: str) -> None:
+    """在历史数据上拟合一次统计量并保存，供后续批次复用"""
+    build_processor().fit(data).save_state(state_path)
+
+def process_batch(batch: pd.DataFrame, state_path: str) -> pd.DataFrame:
+    """使用已保存的统计量处理小批次，保证各批次缩放和编码一致"""
+    processor = build_processor()
+    processor.load_state(state_path)
+    return processor.transform(batch)
 
 if __name__ == "__main__":
     # 示例数据
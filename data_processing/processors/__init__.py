@@ -0,0 +1,29 @@
+from .base_processor import BaseProcessor, DataProcessor
+from .cleaning_processor import CleaningProcessor
+from .transform_processor import TransformProcessor
+from .feature_processor import FeatureProcessor
+from .memory_optimizer import MemoryOptimizer
+from .streaming import iter_chunks, ChunkWriter
+from .parallel import PartitionedExecutor
+from .plan import ProcessingPlan
+from .profiling import StageProfiler
+from .cache import CheckpointCache
+from .backends import to_backend, to_arrow_table, read_parquet
+
+__all__ = [
+    'BaseProcessor',
+    'DataProcessor',
+    'CleaningProcessor',
+    'TransformProcessor',
+    'FeatureProcessor',
+    'MemoryOptimizer',
+    'iter_chunks',
+    'ChunkWriter',
+    'PartitionedExecutor',
+    'ProcessingPlan',
+    'StageProfiler',
+    'CheckpointCache',
+    'to_backend',
+    'to_arrow_table',
+    'read_parquet'
+]
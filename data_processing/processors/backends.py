@@ -0,0 +1,82 @@
+from typing import Any, Union
+import pandas as pd
+
+# numpy: pandas 默认的 NumPy/object 列；pyarrow: Arrow 支持的列（pd.ArrowDtype），
+# 字符串与可空整数不再退化为 object/float64
+BACKENDS = ('numpy', 'pyarrow')
+
+
+def is_arrow_table(data: Any) -> bool:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+    return isinstance(data, pa.Table)
+
+
+def is_arrow_column(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.ArrowDtype)
+
+
+def to_backend(data: Union[pd.DataFrame, Any], backend: str) -> pd.DataFrame:
+    """把 DataFrame 或 pyarrow.Table 转换为指定后端的 DataFrame
+    
+    pyarrow.Table 通过 types_mapper 直接包装为 ArrowDtype 列，不复制列数据；
+    DataFrame 只转换尚不是 Arrow 的列，类别列保持 pandas category。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+        
+    if is_arrow_table(data):
+        if backend == 'pyarrow':
+            return data.to_pandas(types_mapper=pd.ArrowDtype)
+        return data.to_pandas()
+        
+    if backend == 'numpy':
+        arrow_columns = [col for col in data.columns if is_arrow_column(data[col])]
+        if not arrow_columns:
+            return data
+        converted = data.copy(deep=False)
+        for col in arrow_columns:
+            converted[col] = _arrow_to_numpy(data[col])
+        return converted
+        
+    import pyarrow as pa
+    
+    numpy_columns = [
+        col for col in data.columns
+        if not is_arrow_column(data[col]) and not isinstance(data[col].dtype, pd.CategoricalDtype)
+    ]
+    if not numpy_columns:
+        return data
+    converted = data.copy(deep=False)
+    for col in numpy_columns:
+        # from_pandas=True 使 NaN/None 成为 Arrow 的 null
+        converted[col] = pd.arrays.ArrowExtensionArray(pa.array(data[col], from_pandas=True))
+    return converted
+
+
+def to_arrow_table(data: pd.DataFrame) -> Any:
+    """DataFrame 转换为 pyarrow.Table，ArrowDtype 列不复制数据"""
+    import pyarrow as pa
+    
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def read_parquet(path: str, backend: str = 'numpy', **read_options: Any) -> pd.DataFrame:
+    """读取 Parquet 文件（如 extract_from_s3 生成的文件），pyarrow 后端直接使用 Arrow 列"""
+    if backend == 'pyarrow':
+        import pyarrow.parquet as pq
+        
+        return pq.read_table(path, **read_options).to_pandas(types_mapper=pd.ArrowDtype)
+    return pd.read_parquet(path, **read_options)
+
+
+def _arrow_to_numpy(series: pd.Series) -> pd.Series:
+    """Arrow 列转换为 pandas 默认类型，空值按列类型变为 NaN/NaT/None"""
+    import pyarrow as pa
+    
+    converted = pa.array(series.array).to_pandas()
+    converted.index = series.index
+    converted.name = series.name
+    return converted
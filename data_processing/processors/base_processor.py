@@ -1,9 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Union, Optional
+from typing import Dict, Any, List, Union, Optional, Iterator, Callable
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
+import json
+import contextlib
+import tracemalloc
+
+from .streaming import ChunkSource, ChunkWriter, iter_chunks
+from .backends import BACKENDS, is_arrow_table, to_arrow_table, to_backend
+from .profiling import NULL_SPAN, StageProfiler
+from .cache import CheckpointCache, data_fingerprint, stage_key
+
+# copy: 每个阶段复制输入（默认）；cow: 借助 pandas 写时复制只做浅拷贝；
+# owned: 处理链接管输入数据框的所有权，各阶段直接在其上修改
+COPY_MODES = ('copy', 'cow', 'owned')
+PANDAS_MAJOR_VERSION = int(pd.__version__.split('.')[0])
 
 class BaseProcessor(ABC):
     """数据处理基类"""
@@ -11,6 +24,8 @@ class BaseProcessor(ABC):
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.copy_mode = 'copy'
+        self.profiler = None
         
     @abstractmethod
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
@@ -20,6 +35,79 @@ class BaseProcessor(ABC):
     def validate_input(self, data: pd.DataFrame) -> bool:
         """验证输入数据"""
         return True
+        
+    def _working_frame(self, data: pd.DataFrame) -> pd.DataFrame:
+        """返回本阶段可以修改的数据框，是否复制由 copy_mode 决定"""
+        if self.copy_mode == 'owned':
+            return data
+        if self.copy_mode == 'cow':
+            return data.copy(deep=False)
+        return data.copy()
+        
+    def _profile(self, operation: str, data: pd.DataFrame):
+        """记录一个配置操作（某列的 fillna、缩放、滚动窗口等），未启用性能分析时不做记录"""
+        if self.profiler is None:
+            return contextlib.nullcontext(NULL_SPAN)
+        return self.profiler.span(operation, data)
+        
+    @property
+    def requires_fit(self) -> bool:
+        """是否依赖全量数据统计量（均值、分位数、缩放参数等）"""
+        return False
+        
+    @property
+    def is_fitted(self) -> bool:
+        """统计量是否已拟合（无状态处理器始终视为已拟合）"""
+        return not self.requires_fit
+        
+    def partial_fit(self, data: pd.DataFrame) -> 'BaseProcessor':
+        """按块累积统计量，无状态处理器无需实现"""
+        return self
+        
+    def fit(self, data: pd.DataFrame) -> 'BaseProcessor':
+        """在完整数据上重新拟合统计量"""
+        self.reset_statistics()
+        return self.partial_fit(data)
+        
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """只应用已拟合的统计量处理数据"""
+        if not self.is_fitted:
+            raise ValueError(f"{self.__class__.__name__} is not fitted, call fit() first")
+        return self.process(data)
+        
+    def reset_statistics(self) -> None:
+        """清空已累积的统计量"""
+        pass
+        
+    def get_state(self, include_accumulators: bool = True) -> Dict[str, Any]:
+        """返回可JSON序列化的拟合状态
+        
+        include_accumulators 为 True 时同时保存累积器，载入后可继续 partial_fit；
+        为 False 时只保存最终参数，适合只做 transform 的生产环境。
+        """
+        return {}
+        
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """载入 get_state 返回的拟合状态"""
+        pass
+        
+    def save_state(self, path: str, include_accumulators: bool = True) -> None:
+        """将拟合状态保存为JSON文件"""
+        with open(path, 'w') as f:
+            json.dump(self.get_state(include_accumulators), f)
+            
+    def load_state(self, path: str) -> None:
+        """从JSON文件载入拟合状态"""
+        with open(path, 'r') as f:
+            self.set_state(json.load(f))
+            
+    def begin_stream(self) -> None:
+        """开始一次分块遍历，子类在此初始化跨块状态（去重哈希、窗口历史等）"""
+        pass
+        
+    def end_stream(self) -> None:
+        """结束分块遍历，释放跨块状态"""
+        pass
 
 class DataProcessor:
     """数据处理管理器"""
@@ -29,21 +117,336 @@ class DataProcessor:
         self.logger = logging.getLogger(__name__)
         self.processors = []
         
+        execution = config.get('execution', {})
+        self.copy_mode = execution.get('copy_mode', 'copy')
+        if self.copy_mode not in COPY_MODES:
+            raise ValueError(f"Unknown copy_mode: {self.copy_mode}")
+        if self.copy_mode == 'cow' and PANDAS_MAJOR_VERSION < 2:
+            self.logger.warning("Copy-on-write requires pandas >= 2.0, falling back to copy mode")
+            self.copy_mode = 'copy'
+        self.track_memory = execution.get('track_memory', False)
+        self.memory_report = []
+        self.backend = execution.get('backend', 'numpy')
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {self.backend}")
+        self.profiler = StageProfiler() if execution.get('profile', False) else None
+        
+        cache_config = dict(execution.get('cache') or {})
+        self.cache = None
+        if cache_config.pop('enabled', False):
+            self.cache = CheckpointCache(**cache_config)
+            
     def add_processor(self, processor: BaseProcessor) -> None:
         """添加处理器"""
         self.processors.append(processor)
         
+    def enable_cache(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ) -> CheckpointCache:
+        """启用阶段输出缓存，process 时从已缓存的最深阶段继续执行"""
+        self.cache = CheckpointCache(directory, max_bytes, max_entries)
+        return self.cache
+        
+    def enable_profiling(self) -> StageProfiler:
+        """启用逐阶段性能分析，返回记录器（结果见 profiler.format_table()/export_json()）"""
+        if self.profiler is None:
+            self.profiler = StageProfiler()
+        return self.profiler
+        
+    def add_hook(
+        self,
+        pre: Optional[Callable[[Dict[str, Any]], None]] = None,
+        post: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
+        """注册处理器/配置操作级别的钩子，接收该阶段的记录字典，同时启用性能分析"""
+        self.enable_profiling().add_hook(pre, post)
+        
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
-        """执行所有处理步骤"""
-        processed_data = data.copy()
+        """执行所有处理步骤
+        
+        copy_mode 为 owned 时输入数据框的所有权转交给处理链，调用方之后不应再使用它。
+        输入为 pyarrow.Table 时按 backend 转换，处理结果同样以 pyarrow.Table 返回。
+        """
+        self.memory_report = []
+        if self.profiler is not None:
+            self.profiler.reset()
+        arrow_input = is_arrow_table(data)
+        if arrow_input or self.backend == 'pyarrow':
+            data = to_backend(data, self.backend)
+            
+        with self._copy_on_write():
+            if self.copy_mode == 'owned':
+                processed_data = data
+            elif self.copy_mode == 'cow':
+                processed_data = data.copy(deep=False)
+            else:
+                processed_data = data.copy()
+            start = 0
+            if self.cache is not None:
+                keys = self._checkpoint_keys(data)
+                start, processed_data = self._resume_from_checkpoint(keys, processed_data)
+            for index, processor in enumerate(self.processors[start:], start):
+                processed_data = self._run_processor(processor, processed_data)
+                if self.cache is not None:
+                    self.cache.put(keys[index + 1], processed_data)
+                    
+        if arrow_input:
+            return to_arrow_table(processed_data)
+        return processed_data
+        
+    def _checkpoint_keys(self, data: pd.DataFrame) -> List[str]:
+        """输入数据及每个阶段输出的缓存键，第 i 个键对应前 i 个处理器的输出"""
+        keys = [data_fingerprint(data) + self.backend]
+        for processor in self.processors:
+            keys.append(stage_key(keys[-1], processor))
+        return keys
+        
+    def _resume_from_checkpoint(self, keys: List[str], data: pd.DataFrame) -> tuple:
+        """查找已缓存的最深阶段，返回（下一个要执行的处理器序号, 该阶段的输出）"""
+        for index in range(len(self.processors), 0, -1):
+            cached = self.cache.get(keys[index])
+            if cached is None:
+                continue
+            self.logger.info(
+                f"Resuming after {self.processors[index - 1].__class__.__name__} "
+                f"from cached stage {index}/{len(self.processors)}"
+            )
+            if self.backend == 'pyarrow':
+                cached = to_backend(cached, 'pyarrow')
+            return index, cached
+        return 0, data
+        
+    def _copy_on_write(self):
+        """cow 模式下在 pandas 2.x 中开启写时复制（pandas 3 起默认开启）"""
+        if self.copy_mode == 'cow' and PANDAS_MAJOR_VERSION == 2:
+            return pd.option_context('mode.copy_on_write', True)
+        return contextlib.nullcontext()
+        
+    def process_partitioned(
+        self,
+        data: pd.DataFrame,
+        partition_key: Union[str, List[str]],
+        max_workers: Optional[int] = None,
+        preserve_order: bool = False
+    ) -> pd.DataFrame:
+        """按分区键（如 experiment_id、device_id）在进程池中并行处理"""
+        from .parallel import PartitionedExecutor
+        
+        executor = PartitionedExecutor(self, partition_key, max_workers, preserve_order)
+        return executor.process(data)
+        
+    def lazy(self, columns: Optional[List[str]] = None):
+        """构建优化后的惰性执行计划，columns 为需要输出的列（None 表示全部）
+        
+        plan.explain() 查看优化结果，plan.execute(data) 执行。
+        """
+        from .plan import ProcessingPlan
+        
+        return ProcessingPlan.from_processors(self.processors, columns)
+        
+    def fit(self, data: pd.DataFrame) -> 'DataProcessor':
+        """按顺序拟合各处理器，每个处理器在前序处理器的输出上拟合"""
+        return self._fit(data, incremental=False)
+        
+    def partial_fit(self, data: pd.DataFrame) -> 'DataProcessor':
+        """用一个批次增量更新各处理器的统计量
+        
+        后续处理器看到的是前序处理器按当前统计量处理后的批次。
+        """
+        return self._fit(data, incremental=True)
+        
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """只应用已拟合的统计量，不在批次上重新拟合"""
         for processor in self.processors:
-            try:
-                if processor.validate_input(processed_data):
-                    processed_data = processor.process(processed_data)
+            if not processor.is_fitted:
+                raise ValueError(f"{processor.__class__.__name__} is not fitted, call fit() first")
+        return self.process(data)
+        
+    def _fit(self, data: pd.DataFrame, incremental: bool) -> 'DataProcessor':
+        processed_data = data
+        for index, processor in enumerate(self.processors):
+            if processor.requires_fit:
+                if incremental:
+                    processor.partial_fit(processed_data)
                 else:
-                    self.logger.error(f"Validation failed for {processor.__class__.__name__}")
-            except Exception as e:
-                self.logger.error(f"Processing failed: {str(e)}")
-                raise
+                    processor.fit(processed_data)
+            if index < len(self.processors) - 1:
+                processed_data = self._run_processor(processor, processed_data)
+        return self
+        
+    def get_state(self, include_accumulators: bool = True) -> Dict[str, Any]:
+        """返回全部处理器的拟合状态"""
+        return {
+            'processors': [
+                {
+                    'class': processor.__class__.__name__,
+                    'state': processor.get_state(include_accumulators)
+                }
+                for processor in self.processors
+            ]
+        }
+        
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """载入全部处理器的拟合状态，处理器顺序和类型必须一致"""
+        entries = state['processors']
+        if len(entries) != len(self.processors):
+            raise ValueError(
+                f"State has {len(entries)} processors, pipeline has {len(self.processors)}"
+            )
+        for processor, entry in zip(self.processors, entries):
+            if entry['class'] != processor.__class__.__name__:
+                raise ValueError(
+                    f"State for {entry['class']} cannot be loaded into {processor.__class__.__name__}"
+                )
+            processor.set_state(entry['state'])
+            
+    def save_state(self, path: str, include_accumulators: bool = True) -> None:
+        """将全部处理器的拟合状态保存为JSON文件"""
+        with open(path, 'w') as f:
+            json.dump(self.get_state(include_accumulators), f)
+            
+    def load_state(self, path: str) -> None:
+        """从JSON文件载入全部处理器的拟合状态"""
+        with open(path, 'r') as f:
+            self.set_state(json.load(f))
+            
+    def _run_processor(self, processor: BaseProcessor, data: pd.DataFrame) -> pd.DataFrame:
+        """校验并执行单个处理器"""
+        # 处理链内部的中间结果归处理链所有，按处理链的 copy_mode 执行
+        processor_copy_mode = processor.copy_mode
+        processor_profiler = processor.profiler
+        processor.copy_mode = self.copy_mode
+        processor.profiler = self.profiler or processor_profiler
+        try:
+            if processor.validate_input(data):
+                with self._profile_stage(processor, data) as span:
+                    if self.track_memory:
+                        result = self._process_with_memory_tracking(processor, data)
+                    else:
+                        result = processor.process(data)
+                    if self.backend == 'pyarrow':
+                        # 处理器新生成的 NumPy 列（缩放结果、窗口特征等）转换为 Arrow 列
+                        result = to_backend(result, 'pyarrow')
+                    span.output(result)
+                return result
+            self.logger.error(f"Validation failed for {processor.__class__.__name__}")
+            return data
+        except Exception as e:
+            self.logger.error(f"Processing failed: {str(e)}")
+            raise
+        finally:
+            processor.copy_mode = processor_copy_mode
+            processor.profiler = processor_profiler
+            
+    def _profile_stage(self, processor: BaseProcessor, data: pd.DataFrame):
+        if self.profiler is None:
+            return contextlib.nullcontext(NULL_SPAN)
+        return self.profiler.span(processor.__class__.__name__, data)
+        
+    def _process_with_memory_tracking(self, processor: BaseProcessor, data: pd.DataFrame) -> pd.DataFrame:
+        """执行处理器并记录该阶段的峰值内存（相对阶段开始时的增量）"""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            result = processor.process(data)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
                 
-        return processed_data
+        stage = {
+            'processor': processor.__class__.__name__,
+            'copy_mode': self.copy_mode,
+            'peak_bytes': peak - baseline,
+            'retained_bytes': current - baseline
+        }
+        self.memory_report.append(stage)
+        self.logger.info(
+            f"{stage['processor']}: peak {stage['peak_bytes'] / 1024 ** 2:.1f} MiB, "
+            f"retained {stage['retained_bytes'] / 1024 ** 2:.1f} MiB"
+        )
+        return result
+        
+    def process_stream(
+        self,
+        source: ChunkSource,
+        chunksize: int = 100000,
+        columns: Optional[List[str]] = None,
+        fit: bool = True,
+        **read_options: Any
+    ) -> Iterator[pd.DataFrame]:
+        """分块流式处理，输出与整体处理一致，峰值内存只与块大小相关
+        
+        对每个依赖全量统计量的处理器先做一次统计遍历（其前序处理器已完成拟合），
+        最后一次遍历逐块输出结果。因此 source 必须可以重复读取。
+        fit 为 False 时直接使用已拟合/已载入的统计量，只遍历一次。
+        """
+        def open_chunks() -> Iterator[pd.DataFrame]:
+            return iter_chunks(
+                source, chunksize=chunksize, columns=columns, backend=self.backend, **read_options
+            )
+            
+        if self.profiler is not None:
+            self.profiler.reset()
+        if fit:
+            self.fit_stream(open_chunks)
+        yield from self._stream_pass(open_chunks, self.processors)
+        
+    def fit_stream(self, open_chunks: ChunkSource) -> None:
+        """逐阶段遍历数据源，为需要统计量的处理器累积全量统计量"""
+        for index, processor in enumerate(self.processors):
+            if not processor.requires_fit:
+                continue
+            processor.reset_statistics()
+            self.logger.info(f"Collecting statistics for {processor.__class__.__name__}")
+            for chunk in self._stream_pass(open_chunks, self.processors[:index], processor):
+                pass
+                
+    def process_file(
+        self,
+        input_path: str,
+        output_path: str,
+        chunksize: int = 100000,
+        columns: Optional[List[str]] = None,
+        fit: bool = True,
+        **read_options: Any
+    ) -> int:
+        """流式处理文件并逐块写出，返回写出的行数"""
+        with ChunkWriter(output_path) as writer:
+            for chunk in self.process_stream(input_path, chunksize, columns, fit, **read_options):
+                writer.write(chunk)
+        self.logger.info(f"Wrote {writer.rows_written} rows to {output_path}")
+        return writer.rows_written
+        
+    def _stream_pass(
+        self,
+        open_chunks: ChunkSource,
+        processors: List[BaseProcessor],
+        fit_target: Optional[BaseProcessor] = None
+    ) -> Iterator[pd.DataFrame]:
+        """一次完整的分块遍历；指定 fit_target 时只累积其统计量"""
+        stream_processors = processors + ([fit_target] if fit_target is not None else [])
+        for processor in stream_processors:
+            processor.begin_stream()
+        try:
+            for chunk in iter_chunks(open_chunks):
+                for processor in processors:
+                    # 去重或drop后可能出现空块，空块不再交给后续处理器
+                    if not len(chunk):
+                        break
+                    chunk = self._run_processor(processor, chunk)
+                if not len(chunk):
+                    continue
+                if fit_target is not None:
+                    fit_target.partial_fit(chunk)
+                else:
+                    yield chunk
+        finally:
+            for processor in stream_processors:
+                processor.end_stream()
@@ -0,0 +1,129 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+
+CACHE_SUFFIX = '.parquet'
+
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """数据框内容的哈希：列名、类型、索引与全部取值"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in data.columns]).encode())
+    digest.update(json.dumps([str(dtype) for dtype in data.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def stage_key(parent_key: str, processor: Any) -> str:
+    """阶段输出的缓存键：上一阶段的键 + 处理器类名 + 配置 + 已拟合的统计量
+    
+    统计量参与哈希，重新拟合或载入不同状态后不会命中旧的缓存。
+    """
+    digest = hashlib.sha256()
+    digest.update(parent_key.encode())
+    digest.update(processor.__class__.__name__.encode())
+    digest.update(json.dumps(processor.config, sort_keys=True, default=str).encode())
+    state = processor.get_state(include_accumulators=False)
+    digest.update(json.dumps(state, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class CheckpointCache:
+    """按内容寻址的阶段输出缓存，以 Parquet 文件保存在 directory 下
+    
+    文件修改时间作为最近使用时间，命中时刷新；写入后按 LRU 淘汰，
+    直到总大小不超过 max_bytes 且文件数不超过 max_entries。
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+        
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+        
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """读取缓存，不存在或文件损坏时返回 None"""
+        path = self.path(key)
+        try:
+            data = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self._remove(path)
+            return None
+        os.utime(path)
+        return data
+        
+    def put(self, key: str, data: pd.DataFrame) -> bool:
+        """写入缓存；无法保存为 Parquet 的数据（如混合类型的 object 列）只记录警告"""
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            data.to_parquet(temp_path)
+            # 先写临时文件再替换，并发读取时不会看到写了一半的文件
+            os.replace(temp_path, path)
+        except Exception as e:
+            self.logger.warning(f"Could not cache stage output {key}: {str(e)}")
+            self._remove(temp_path)
+            return False
+        self.evict()
+        return True
+        
+    def evict(self) -> None:
+        """按最近使用时间淘汰最旧的条目"""
+        if self.max_bytes is None and self.max_entries is None:
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (
+            (self.max_bytes is not None and total_bytes > self.max_bytes)
+            or (self.max_entries is not None and len(entries) > self.max_entries)
+        ):
+            _, size, name = entries.pop(0)
+            self._remove(os.path.join(self.directory, name))
+            total_bytes -= size
+            self.logger.info(f"Evicted cache entry {name}")
+            
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(CACHE_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+                
+    def stats(self) -> Dict[str, Any]:
+        sizes = [
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory) if name.endswith(CACHE_SUFFIX)
+        ]
+        return {'entries': len(sizes), 'bytes': sum(sizes)}
+        
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
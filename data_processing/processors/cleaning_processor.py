@@ -1,38 +1,319 @@
 from .base_processor import BaseProcessor
+from .statistics import (
+    HashRuns,
+    MeanAccumulator,
+    ModeAccumulator,
+    ValuesAccumulator,
+    accumulator_from_state,
+    to_builtin
+)
+from .sketches import (
+    KLLSketch,
+    MisraGriesAccumulator,
+    MomentsAccumulator,
+    kll_k_for_error
+)
+from typing import Dict, Any, Optional
 import pandas as pd
 import numpy as np
 
+STATISTIC_STRATEGIES = ('mean', 'median', 'mode')
+
+# 流式去重默认最多记录的不同行数（每行 8 字节，约 400 MB）
+DEFAULT_MAX_TRACKED_ROWS = 50_000_000
+
+
+def fill_missing(series: pd.Series, value: Any) -> pd.Series:
+    """填充缺失值；类别列的填充值不在类别中时先加入该类别（如内存优化阶段转换的枚举列）"""
+    if (
+        isinstance(series.dtype, pd.CategoricalDtype)
+        and not pd.isna(value)
+        and value not in series.cat.categories
+    ):
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
 class CleaningProcessor(BaseProcessor):
-    """数据清洗处理器"""
+    """数据清洗处理器
+    
+    config['approximate']['enabled'] 为 True 时用草图代替精确统计：中位数与IQR分位数使用
+    KLL（quantile_error 为归一化秩误差），众数使用 Misra-Gries（mode_error 为计数误差占总行数的比例），
+    均值使用可合并的均值/方差累积器。状态大小与行数无关，可按块、按分区累积后合并。
+    默认值 auto 只在流式拟合（DataProcessor.fit_stream/process_stream）时使用草图，内存上限与数据量无关；
+    False 时流式拟合也使用精确统计，中位数/IQR 保留整列的值，内存与行数成正比。
     
+    流式遍历时跨块去重记录已见行的哈希（每行 8 字节），最多 max_tracked_rows
+    （默认 DEFAULT_MAX_TRACKED_ROWS，None 为不限制）个不同行；超出后记录警告，
+    之后首次出现的行只在块内去重。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        approximate = config.get('approximate') or {}
+        self.approximate_mode = approximate.get('enabled', 'auto')
+        self.max_tracked_rows = config.get('max_tracked_rows', DEFAULT_MAX_TRACKED_ROWS)
+        self.quantile_error = approximate.get('quantile_error', 0.01)
+        self.mode_error = approximate.get('mode_error', 0.001)
+        self._statistics = None
+        self._accumulators = None
+        self._stale = False
+        self._seen_hashes = None
+        self._streaming = False
+        
+    @property
+    def approximate(self) -> bool:
+        """当前是否使用草图统计（auto 时只在流式遍历中使用）"""
+        if self.approximate_mode == 'auto':
+            return self._streaming
+        return bool(self.approximate_mode)
+        
+    @property
+    def requires_fit(self) -> bool:
+        return (
+            any(strategy in STATISTIC_STRATEGIES
+                for strategy in self.config.get('null_handling', {}).values())
+            or any(limits.get('method') == 'iqr'
+                   for limits in self.config.get('outlier_handling', {}).values())
+        )
+        
+    @property
+    def is_fitted(self) -> bool:
+        return not self.requires_fit or self.statistics is not None
+        
+    @property
+    def statistics(self) -> Optional[Dict[str, Any]]:
+        """已拟合的填充值与异常值边界，未拟合时为 None"""
+        if self._stale:
+            self._statistics = self._finalize_statistics()
+            self._stale = False
+        return self._statistics
+        
+    def reset_statistics(self) -> None:
+        self._statistics = None
+        self._accumulators = None
+        self._stale = False
+        
+    def get_state(self, include_accumulators: bool = True, include_values: bool = False) -> Dict[str, Any]:
+        """include_values 为 False 时，含精确累积器（整列的值/全部计数）的状态不保存累积器"""
+        state = {'statistics': self.statistics}
+        if include_accumulators and self._accumulators is not None and (include_values or self._accumulators_bounded()):
+            state['accumulators'] = {
+                group: {col: accumulator.to_state() for col, accumulator in accumulators.items()}
+                for group, accumulators in self._accumulators.items()
+            }
+        return state
+        
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.reset_statistics()
+        statistics = state.get('statistics')
+        if statistics is not None:
+            # JSON 会把边界元组存为列表
+            statistics = dict(statistics)
+            statistics['outlier_bounds'] = {
+                col: tuple(bounds) for col, bounds in statistics['outlier_bounds'].items()
+            }
+        self._statistics = statistics
+        if state.get('accumulators') is not None:
+            self._accumulators = {
+                group: {col: accumulator_from_state(acc_state) for col, acc_state in accumulators.items()}
+                for group, accumulators in state['accumulators'].items()
+            }
+            
+    def begin_stream(self) -> None:
+        self._seen_hashes = HashRuns(self.max_tracked_rows)
+        self._streaming = True
+        
+    def end_stream(self) -> None:
+        self._seen_hashes = None
+        self._streaming = False
+        
+    def _accumulators_bounded(self) -> bool:
+        return all(
+            getattr(accumulator, 'bounded', True)
+            for accumulators in self._accumulators.values() for accumulator in accumulators.values()
+        )
+        
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
-        df = data.copy()
+        df = self._working_frame(data)
+        statistics = self.statistics
         
         # 处理重复值
         if self.config.get('remove_duplicates', True):
-            df = df.drop_duplicates()
-            
+            with self._profile('drop_duplicates', df) as span:
+                df = self._drop_duplicates(df)
+                span.output(df)
+                
+        if statistics is None and self.approximate and self.requires_fit:
+            # 未拟合时在本批数据上用草图估计统计量，不做整列排序
+            with self._profile('sketch_statistics', df):
+                accumulators = self._create_accumulators()
+                self._accumulate(accumulators, df, deduplicate=False)
+                statistics = self._finalize_statistics(accumulators)
+                
         # 处理缺失值
         for col, strategy in self.config.get('null_handling', {}).items():
-            if strategy == 'drop':
-                df = df.dropna(subset=[col])
-            elif strategy == 'mean':
-                df[col] = df[col].fillna(df[col].mean())
-            elif strategy == 'median':
-                df[col] = df[col].fillna(df[col].median())
-            elif strategy == 'mode':
-                df[col] = df[col].fillna(df[col].mode()[0])
-            elif isinstance(strategy, (int, float, str)):
-                df[col] = df[col].fillna(strategy)
+            operation = 'dropna' if strategy == 'drop' else 'fillna'
+            with self._profile(f'{operation}:{col}', df) as span:
+                if strategy == 'drop':
+                    df = df.dropna(subset=[col])
+                elif statistics is not None and strategy in STATISTIC_STRATEGIES:
+                    df[col] = fill_missing(df[col], statistics['fill_values'][col])
+                elif strategy == 'mean':
+                    df[col] = fill_missing(df[col], df[col].mean())
+                elif strategy == 'median':
+                    df[col] = fill_missing(df[col], df[col].median())
+                elif strategy == 'mode':
+                    df[col] = fill_missing(df[col], df[col].mode()[0])
+                elif isinstance(strategy, (int, float, str)):
+                    df[col] = fill_missing(df[col], strategy)
+                span.output(df)
                 
         # 处理异常值
         for col, limits in self.config.get('outlier_handling', {}).items():
             if limits.get('method') == 'iqr':
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - 1.5 * IQR
-                upper = Q3 + 1.5 * IQR
-                df[col] = df[col].clip(lower=lower, upper=upper)
-                
+                with self._profile(f'clip:{col}', df) as span:
+                    if statistics is not None:
+                        lower, upper = statistics['outlier_bounds'][col]
+                    else:
+                        Q1 = df[col].quantile(0.25)
+                        Q3 = df[col].quantile(0.75)
+                        IQR = Q3 - Q1
+                        lower = Q1 - 1.5 * IQR
+                        upper = Q3 + 1.5 * IQR
+                    df[col] = df[col].clip(lower=lower, upper=upper)
+                    span.output(df)
+                    
         return df
+        
+    def partial_fit(self, data: pd.DataFrame) -> 'CleaningProcessor':
+        """按块累积填充值与IQR边界所需的统计量
+        
+        行过滤（去重、drop）按配置顺序先执行，使每个统计量看到的行与整体处理时一致；
+        依赖统计量填充的列在IQR计算时保留缺失值，拟合结束后再用最终填充值替换。
+        """
+        if self._accumulators is None:
+            self._accumulators = self._create_accumulators()
+        self._stale = True
+        self._accumulate(self._accumulators, data)
+        return self
+        
+    def merge(self, other: 'CleaningProcessor') -> 'CleaningProcessor':
+        """合并另一个处理器（例如在其他分区或块上 partial_fit）累积的统计量"""
+        if other._accumulators is None:
+            return self
+        if self._accumulators is None:
+            self._accumulators = self._create_accumulators()
+        for group, accumulators in other._accumulators.items():
+            for col, accumulator in accumulators.items():
+                self._accumulators[group][col].merge(accumulator)
+        self._stale = True
+        return self
+        
+    def error_bounds(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """近似统计量的误差界（精确模式下为空）"""
+        if self._accumulators is None:
+            return {}
+        return {
+            group: {
+                col: accumulator.error_bound()
+                for col, accumulator in accumulators.items() if hasattr(accumulator, 'error_bound')
+            }
+            for group, accumulators in self._accumulators.items()
+        }
+        
+    def _accumulate(
+        self,
+        accumulators: Dict[str, Dict[str, Any]],
+        data: pd.DataFrame,
+        deduplicate: bool = True
+    ) -> None:
+        """按配置顺序执行行过滤并更新累积器"""
+        df = data
+        if deduplicate and self.config.get('remove_duplicates', True):
+            df = self._drop_duplicates(df)
+            
+        for col, strategy in self.config.get('null_handling', {}).items():
+            if strategy == 'drop':
+                df = df.dropna(subset=[col])
+            elif strategy in STATISTIC_STRATEGIES:
+                accumulators['fill_values'][col].update(df[col])
+            elif isinstance(strategy, (int, float, str)):
+                df = df.copy()
+                df[col] = fill_missing(df[col], strategy)
+                
+        for col, accumulator in accumulators['outlier_bounds'].items():
+            accumulator.update(df[col])
+            
+    def _create_accumulators(self) -> Dict[str, Dict[str, Any]]:
+        """按配置创建统计量累积器"""
+        if self.approximate:
+            k = kll_k_for_error(self.quantile_error)
+            capacity = int(np.ceil(1 / self.mode_error))
+            factories = {
+                'mean': MomentsAccumulator,
+                'median': lambda: KLLSketch(k),
+                'mode': lambda: MisraGriesAccumulator(capacity),
+                'iqr': lambda: KLLSketch(k, keep_missing=True)
+            }
+        else:
+            factories = {
+                'mean': MeanAccumulator,
+                'median': ValuesAccumulator,
+                'mode': ModeAccumulator,
+                'iqr': lambda: ValuesAccumulator(keep_missing=True)
+            }
+            
+        fill_accumulators = {
+            col: factories[strategy]()
+            for col, strategy in self.config.get('null_handling', {}).items()
+            if strategy in STATISTIC_STRATEGIES
+        }
+        outlier_accumulators = {
+            col: factories['iqr']()
+            for col, limits in self.config.get('outlier_handling', {}).items()
+            if limits.get('method') == 'iqr'
+        }
+        return {'fill_values': fill_accumulators, 'outlier_bounds': outlier_accumulators}
+        
+    def _finalize_statistics(self, accumulators: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """由累积器计算最终统计量"""
+        accumulators = accumulators or self._accumulators
+        fill_values = {
+            col: to_builtin(accumulator.result())
+            for col, accumulator in accumulators['fill_values'].items()
+        }
+        
+        # 依赖统计量填充的列，缺失值按最终填充值计入分位数
+        outlier_bounds = {
+            col: accumulator.iqr_bounds(fill_values.get(col))
+            for col, accumulator in accumulators['outlier_bounds'].items()
+        }
+        
+        return {'fill_values': fill_values, 'outlier_bounds': outlier_bounds}
+        
+    def _drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """去重；流式遍历时通过行哈希跨块去重，只保留每个哈希的首次出现
+        
+        已见过的 64 位行哈希保存在 HashRuns 中（每行 8 字节，最多 max_tracked_rows 行）。
+        """
+        if self._seen_hashes is None:
+            return df.drop_duplicates()
+            
+        # 数值列统一为float64再哈希，避免各块类型推断不同导致同值不同哈希
+        hashable = pd.DataFrame({
+            col: df[col].astype('float64')
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+            else df[col]
+            for col in df.columns
+        }, index=df.index)
+        hashes = pd.util.hash_pandas_object(hashable, index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~self._seen_hashes.contains(hashes)
+        # 只在首次达到上限时警告
+        was_full = self.max_tracked_rows is not None and len(self._seen_hashes) >= self.max_tracked_rows
+        if not self._seen_hashes.add(hashes[keep]) and not was_full:
+            self.logger.warning(
+                f"Tracking {self.max_tracked_rows} distinct rows for deduplication, "
+                "rows first seen after this are only deduplicated within their chunk"
+            )
+        return df[keep]
@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import numpy as np
+
+from .statistics import to_builtin
+
+ENCODING_METHODS = ('onehot', 'label', 'hashing', 'frequency', 'target')
+
+# 需要拟合统计量（类别词表、频次、目标均值）的编码方式；hashing 无状态
+FITTED_METHODS = ('onehot', 'label', 'frequency', 'target')
+
+
+def encoding_spec(spec: Any) -> Dict[str, Any]:
+    """统一编码配置：'onehot' 这样的字符串等价于 {'method': 'onehot'}
+    
+    可选参数：
+    - onehot: sparse（稀疏输出）、max_categories / min_frequency（限制词表，其余类别全为0）
+    - hashing: n_features（桶数，默认1024）、sparse
+    - target: target（目标列）、smoothing（平滑强度，默认10）
+    """
+    spec = {'method': spec} if isinstance(spec, str) else dict(spec)
+    if spec.get('method') not in ENCODING_METHODS:
+        raise ValueError(f"Unknown encoding method: {spec.get('method')}")
+    if spec['method'] == 'target' and not spec.get('target'):
+        raise ValueError("Target encoding requires a 'target' column")
+    return spec
+
+
+def column_statistics(values: pd.Series, target: Optional[pd.Series] = None) -> Dict[str, Any]:
+    """一个批次的编码统计量：各类别计数，目标编码另有各类别的目标和与目标总和"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # 类别列的 value_counts 会包含未出现的类别，统一按取值统计
+        values = values.astype(object)
+    statistics = {'counts': values.value_counts(dropna=True, sort=False)}
+    if target is not None:
+        target = pd.to_numeric(target, errors='coerce')
+        observed = target.notna()
+        statistics['target_sums'] = target[observed].groupby(
+            values[observed], observed=True, dropna=True
+        ).sum()
+        statistics['target_counts'] = target[observed].groupby(
+            values[observed], observed=True, dropna=True
+        ).count()
+        statistics['target_total'] = [float(target[observed].sum()), int(observed.sum())]
+    return statistics
+
+
+def merge_statistics(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """合并两个批次的编码统计量，结果与在合并后的数据上统计一致"""
+    merged = {}
+    for key in ('counts', 'target_sums', 'target_counts'):
+        if key in left and key in right:
+            merged[key] = left[key].add(right[key], fill_value=0)
+        elif key in left or key in right:
+            merged[key] = left.get(key, right.get(key))
+    if 'target_total' in left and 'target_total' in right:
+        merged['target_total'] = [
+            left['target_total'][0] + right['target_total'][0],
+            left['target_total'][1] + right['target_total'][1]
+        ]
+    elif 'target_total' in left or 'target_total' in right:
+        merged['target_total'] = left.get('target_total', right.get('target_total'))
+    return merged
+
+
+def vocabulary(counts: pd.Series, spec: Dict[str, Any]) -> pd.Index:
+    """由类别计数得到词表，按 min_frequency / max_categories 截断后排序"""
+    if spec.get('min_frequency'):
+        counts = counts[counts >= spec['min_frequency']]
+    if spec.get('max_categories'):
+        # 计数相同时按类别取值排序，保证截断结果与批次顺序无关
+        counts = _sort_index(counts).sort_values(ascending=False, kind='stable')
+        counts = counts.iloc[:spec['max_categories']]
+    return _sort_index(counts).index
+
+
+def encode_column(
+    df: pd.DataFrame,
+    col: str,
+    spec: Dict[str, Any],
+    categories: Optional[pd.Index] = None,
+    statistics: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """按编码配置转换一列
+    
+    未提供已拟合的 categories/statistics 时在当前数据上计算（与原有的批内编码行为一致）。
+    """
+    method = spec['method']
+    if method == 'hashing':
+        return _hashing(df, col, spec)
+        
+    if method == 'label':
+        if categories is not None:
+            df[col] = pd.Categorical(df[col], categories=categories)
+        df[col] = df[col].astype('category').cat.codes
+        return df
+        
+    if method == 'onehot':
+        if not spec.get('sparse'):
+            if categories is not None:
+                # 使用全量类别，保证各块输出的编码和哑变量列一致
+                df[col] = pd.Categorical(df[col], categories=categories)
+            return pd.get_dummies(df, columns=[col], prefix=col)
+        if categories is None:
+            categories = vocabulary(column_statistics(df[col])['counts'], spec)
+        codes = categories.get_indexer(df[col])
+        indicators = _indicator_frame(
+            codes, [f'{col}_{category}' for category in categories], df.index, sparse=True
+        )
+        return pd.concat([df.drop(columns=[col]), indicators], axis=1)
+        
+    if statistics is None:
+        target = df[spec['target']] if method == 'target' else None
+        statistics = column_statistics(df[col], target)
+    counts = statistics['counts']
+    codes = counts.index.get_indexer(df[col])
+    
+    if method == 'frequency':
+        encoded = counts.to_numpy(dtype='float64') / max(counts.sum(), 1)
+        df[col] = _lookup(codes, encoded, 0.0)
+    elif method == 'target':
+        df[col] = _target_values(codes, counts.index, statistics, spec.get('smoothing', 10.0))
+    return df
+
+
+def dump_statistics(statistics: Dict[str, Any]) -> Dict[str, Any]:
+    """编码统计量转换为可JSON序列化的形式"""
+    state = {}
+    for key in ('counts', 'target_sums', 'target_counts'):
+        if key in statistics:
+            state[key] = [[to_builtin(value), to_builtin(count)] for value, count in statistics[key].items()]
+    if 'target_total' in statistics:
+        state['target_total'] = list(statistics['target_total'])
+    return state
+
+
+def load_statistics(state: Dict[str, Any]) -> Dict[str, Any]:
+    statistics = {}
+    for key in ('counts', 'target_sums', 'target_counts'):
+        if key in state:
+            pairs = state[key]
+            statistics[key] = pd.Series(
+                [count for _, count in pairs],
+                index=pd.Index([value for value, _ in pairs]),
+                dtype='float64' if key == 'target_sums' else 'int64'
+            )
+    if 'target_total' in state:
+        statistics['target_total'] = list(state['target_total'])
+    return statistics
+
+
+def _hashing(df: pd.DataFrame, col: str, spec: Dict[str, Any]) -> pd.DataFrame:
+    """哈希技巧：类别取值的字符串哈希对 n_features 取模，输出列数固定，不需要词表"""
+    n_features = spec.get('n_features', 1024)
+    values = df[col]
+    present = values.notna().to_numpy()
+    hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+    codes = np.where(present, (hashes % np.uint64(n_features)).astype('int64'), -1)
+    indicators = _indicator_frame(
+        codes, [f'{col}_hash_{i}' for i in range(n_features)], df.index, spec.get('sparse', False)
+    )
+    return pd.concat([df.drop(columns=[col]), indicators], axis=1)
+
+
+def _indicator_frame(codes: np.ndarray, columns: List[str], index: pd.Index, sparse: bool) -> pd.DataFrame:
+    """由类别编号构建指示矩阵，编号为 -1 的行全为 False；sparse 时不生成稠密矩阵"""
+    rows = np.flatnonzero(codes >= 0)
+    shape = (len(codes), len(columns))
+    if sparse:
+        from scipy import sparse as sp
+        
+        matrix = sp.csc_matrix((np.ones(len(rows), dtype=bool), (rows, codes[rows])), shape=shape)
+        return pd.DataFrame.sparse.from_spmatrix(matrix, index=index, columns=columns)
+    dense = np.zeros(shape, dtype=bool)
+    dense[rows, codes[rows]] = True
+    return pd.DataFrame(dense, index=index, columns=columns)
+
+
+def _target_values(
+    codes: np.ndarray,
+    categories: pd.Index,
+    statistics: Dict[str, Any],
+    smoothing: float
+) -> np.ndarray:
+    """平滑目标编码：(类别目标和 + smoothing * 全局均值) / (类别计数 + smoothing)，未见类别取全局均值"""
+    total, count = statistics['target_total']
+    prior = total / count if count else np.nan
+    sums = statistics['target_sums'].reindex(categories, fill_value=0).to_numpy(dtype='float64')
+    counts = statistics['target_counts'].reindex(categories, fill_value=0).to_numpy(dtype='float64')
+    encoded = (sums + smoothing * prior) / (counts + smoothing)
+    return _lookup(codes, encoded, prior)
+
+
+def _lookup(codes: np.ndarray, encoded: np.ndarray, default: float) -> np.ndarray:
+    """按类别编号取编码值，编号为 -1（缺失或未见类别）时取 default"""
+    if not len(encoded):
+        return np.full(len(codes), default)
+    return np.where(codes >= 0, encoded[np.maximum(codes, 0)], default)
+
+
+def _sort_index(series: pd.Series) -> pd.Series:
+    try:
+        return series.sort_index()
+    except TypeError:
+        return series
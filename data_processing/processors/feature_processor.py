@@ -1,35 +1,115 @@
 from .base_processor import BaseProcessor
+from .windows import (
+    compute_window_feature,
+    dump_history,
+    load_history,
+    validate_incremental,
+    window_columns,
+    window_history,
+    window_output_names
+)
+from typing import Dict, Any
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
-class TransformProcessor(BaseProcessor):
-    """数据转换处理器"""
+class FeatureProcessor(BaseProcessor):
+    """特征工程处理器
     
+    config['incremental'] 为 True 时窗口特征的历史在各次 process 调用之间保留
+    （并随 get_state/save_state 保存），追加的新批次只计算新行，不重新计算历史。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.incremental = config.get('incremental', False)
+        self._window_history = None
+        if self.incremental:
+            for feature in config.get('window_features', []):
+                validate_incremental(feature)
+            self._window_history = {}
+            
+    def begin_stream(self) -> None:
+        # 记录每个窗口特征所需的尾部历史，使窗口跨块连续
+        if not self.incremental:
+            for feature in self.config.get('window_features', []):
+                validate_incremental(feature)
+            self._window_history = {}
+            
+    def end_stream(self) -> None:
+        if not self.incremental:
+            self._window_history = None
+            
+    def reset_statistics(self) -> None:
+        if self.incremental:
+            self._window_history = {}
+            
+    def get_state(self, include_accumulators: bool = True) -> Dict[str, Any]:
+        if not self.incremental:
+            return {}
+        return {
+            'window_history': {
+                str(index): dump_history(history) for index, history in self._window_history.items()
+            }
+        }
+        
+    def set_state(self, state: Dict[str, Any]) -> None:
+        if self.incremental:
+            self._window_history = {
+                int(index): load_history(history)
+                for index, history in state.get('window_history', {}).items()
+            }
+            
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
-        df = data.copy()
+        df = self._working_frame(data)
         
-        # 数据类型转换
-        for col, dtype in self.config.get('dtype_mapping', {}).items():
-            try:
-                df[col] = df[col].astype(dtype)
-            except Exception as e:
-                self.logger.error(f"Type conversion failed for {col}: {str(e)}")
-                
-        # 特征缩放
-        for col, method in self.config.get('scaling', {}).items():
-            if method == 'standard':
-                scaler = StandardScaler()
-                df[col] = scaler.fit_transform(df[[col]])
-            elif method == 'minmax':
-                scaler = MinMaxScaler()
-                df[col] = scaler.fit_transform(df[[col]])
-                
-        # 特征编码
-        for col, method in self.config.get('encoding', {}).items():
-            if method == 'onehot':
-                df = pd.get_dummies(df, columns=[col], prefix=col)
-            elif method == 'label':
-                df[col] = df[col].astype('category').cat.codes
+        # 特征组合
+        for feature in self.config.get('feature_combinations', []):
+            cols = feature['columns']
+            method = feature['method']
+            name = feature['name']
+            
+            with self._profile(f'combine:{name}', df):
+                if method == 'multiply':
+                    df[name] = df[cols].prod(axis=1)
+                elif method == 'divide':
+                    df[name] = df[cols[0]] / df[cols[1]]
+                elif method == 'add':
+                    df[name] = df[cols].sum(axis=1)
+                elif method == 'subtract':
+                    df[name] = df[cols[0]] - df[cols[1]]
+                    
+        # 时间特征提取
+        for col in self.config.get('datetime_features', []):
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                with self._profile(f'datetime:{col}', df):
+                    df[f'{col}_year'] = df[col].dt.year
+                    df[f'{col}_month'] = df[col].dt.month
+                    df[f'{col}_day'] = df[col].dt.day
+                    df[f'{col}_hour'] = df[col].dt.hour
+                    df[f'{col}_dayofweek'] = df[col].dt.dayofweek
+                    
+        # 窗口特征：计数窗口、时间窗口（'5min'）与 EWMA，可按 group_by 分组
+        for index, feature in enumerate(self.config.get('window_features', [])):
+            label = feature.get('window', 'ewm')
+            with self._profile(f"rolling:{feature['column']}:{label}", df):
+                self._add_window_feature(df, index, feature)
                 
         return df
+        
+    def _add_window_feature(self, df: pd.DataFrame, index: int, feature: Dict[str, Any]) -> None:
+        """计算一个窗口特征并写入 df；存在历史时拼接在本批数据之前，只输出本批的行"""
+        columns = window_columns(feature)
+        history = self._window_history.get(index) if self._window_history is not None else None
+        if history is None:
+            source, offset = df[columns], 0
+        else:
+            source = pd.concat([history, df[columns]], ignore_index=True)
+            offset = len(history)
+            
+        values = compute_window_feature(source, feature)
+        for name, array in values.items():
+            df[name] = array[offset:]
+            
+        if self._window_history is not None:
+            smoothed = values.get(window_output_names(feature).get('mean'))
+            self._window_history[index] = window_history(source, feature, smoothed)
@@ -0,0 +1,154 @@
+from .base_processor import BaseProcessor
+from typing import Dict, Any, Optional
+from decimal import Decimal
+import numbers
+import pandas as pd
+import numpy as np
+
+# 列名带有这些后缀/名称时尝试按时间戳解析（如 created_at、capture_date）
+TIMESTAMP_HINTS = ('_at', '_date', '_time', 'timestamp', 'date')
+
+# float32 可以精确表示绝对值不超过 2^24 的整数
+FLOAT32_EXACT_INTEGER = 2 ** 24
+
+# 整数不降到 int32 以下：int8/int16 在后续阶段的加减乘运算中会静默溢出
+MIN_INTEGER_DTYPE = np.dtype('int32')
+
+class MemoryOptimizer(BaseProcessor):
+    """内存优化处理器，通常作为 DataProcessor 的第一个阶段
+    
+    - int64 列取值范围允许时降为 int32（不低于 int32，避免后续阶段的算术运算溢出）
+    - 取值全为整数的 float64 列（数据库整数列含空值时常见）降为 int32，含缺失值时降为 float32（无损）；
+      float_precision 为 32 时其余浮点列也降为 float32（有精度损失，需显式开启）
+    - 数据库驱动返回的 Decimal 等数值对象列转换为数值类型
+    - 时间戳字符串列只解析一次（显式配置的 datetime_columns，或列名符合 TIMESTAMP_HINTS 且可以完整解析）
+    - 唯一值比例不超过 category_threshold 的字符串列，以及 categorical_columns（如 status、sample_type）转为 category
+    
+    每次处理后 report 记录各列转换前后的类型与字节数（memory_usage(deep=True)）。
+    转换只依据当前数据，分块处理时各块的类型可能不同。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.category_threshold = config.get('category_threshold', 0.5)
+        self.categorical_columns = set(config.get('categorical_columns', []))
+        self.datetime_columns = set(config.get('datetime_columns', []))
+        self.parse_timestamps = config.get('parse_timestamps', True)
+        self.float_precision = config.get('float_precision', 64)
+        self.exclude = set(config.get('exclude', []))
+        self.report: Optional[Dict[str, Any]] = None
+        
+    def process(self, data: pd.DataFrame) -> pd.DataFrame:
+        df = self._working_frame(data)
+        bytes_before = df.memory_usage(deep=True, index=False)
+        dtypes_before = df.dtypes
+        
+        for col in df.columns:
+            if col in self.exclude:
+                continue
+            try:
+                converted = self._optimize_column(col, df[col])
+            except Exception as e:
+                self.logger.warning(f"Memory optimization skipped for {col}: {str(e)}")
+                continue
+            if converted is not None:
+                df[col] = converted
+                
+        bytes_after = df.memory_usage(deep=True, index=False)
+        self.report = {
+            'bytes_before': int(bytes_before.sum()),
+            'bytes_after': int(bytes_after.sum()),
+            'columns': {
+                str(col): {
+                    'dtype_before': str(dtypes_before[col]),
+                    'dtype_after': str(df[col].dtype),
+                    'bytes_before': int(bytes_before[col]),
+                    'bytes_after': int(bytes_after[col])
+                }
+                for col in df.columns
+            }
+        }
+        ratio = self.report['bytes_before'] / max(self.report['bytes_after'], 1)
+        self.logger.info(
+            f"Memory optimized: {self.report['bytes_before'] / 1024 ** 2:.1f} MiB -> "
+            f"{self.report['bytes_after'] / 1024 ** 2:.1f} MiB ({ratio:.1f}x)"
+        )
+        return df
+        
+    def _optimize_column(self, col: str, series: pd.Series) -> Optional[pd.Series]:
+        """返回转换后的列，无需转换时返回 None"""
+        if col in self.datetime_columns:
+            return pd.to_datetime(series)
+        if col in self.categorical_columns:
+            return None if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+            
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, (pd.CategoricalDtype, pd.ArrowDtype)):
+            return None
+        if pd.api.types.is_integer_dtype(dtype):
+            if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+                return None
+            return self._downcast_integer(series)
+        if pd.api.types.is_float_dtype(dtype):
+            if isinstance(dtype, pd.api.extensions.ExtensionDtype) or dtype == np.float32:
+                return None
+            return self._downcast_float(series)
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            return self._convert_objects(col, series)
+        return None
+        
+    def _downcast_float(self, series: pd.Series) -> Optional[pd.Series]:
+        values = series.to_numpy()
+        missing = np.isnan(values)
+        present = values[~missing]
+        integral = (
+            len(present) > 0
+            and np.all(present == np.round(present))
+            and np.abs(present).max() <= FLOAT32_EXACT_INTEGER
+        )
+        if integral and not missing.any():
+            # 绝对值不超过 2^24，int32 一定能容纳
+            return series.astype(MIN_INTEGER_DTYPE)
+        if integral or self.float_precision == 32:
+            return series.astype('float32')
+        return None
+        
+    def _downcast_integer(self, series: pd.Series) -> Optional[pd.Series]:
+        if series.dtype.itemsize <= MIN_INTEGER_DTYPE.itemsize or series.empty:
+            return None
+        limits = np.iinfo(MIN_INTEGER_DTYPE)
+        if series.min() < limits.min or series.max() > limits.max:
+            return None
+        return series.astype(MIN_INTEGER_DTYPE)
+        
+    def _convert_objects(self, col: str, series: pd.Series) -> Optional[pd.Series]:
+        present = series.dropna()
+        if present.empty:
+            return None
+        first = present.iloc[0]
+        
+        # 数据库驱动返回的 NUMERIC/整数对象
+        if isinstance(first, (Decimal, numbers.Number)) and not isinstance(first, bool):
+            numeric = pd.to_numeric(series, errors='coerce')
+            if numeric.notna().sum() != len(present):
+                return None
+            numeric = numeric.astype('float64')
+            downcast = self._downcast_float(numeric)
+            return numeric if downcast is None else downcast
+            
+        if isinstance(first, str) and self._looks_like_timestamp(col, present):
+            parsed = pd.to_datetime(series, errors='coerce')
+            # 只有全部非空值都能解析时才转换
+            if parsed.notna().sum() == len(present):
+                return parsed
+                
+        unique = present.nunique()
+        if unique <= self.category_threshold * len(series):
+            return series.astype('category')
+        return None
+        
+    def _looks_like_timestamp(self, col: str, present: pd.Series) -> bool:
+        if not self.parse_timestamps or not str(col).lower().endswith(TIMESTAMP_HINTS):
+            return False
+        sample = present.iloc[:100]
+        return pd.to_datetime(sample, errors='coerce').notna().all()
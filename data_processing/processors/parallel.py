@@ -0,0 +1,74 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Union
+import os
+import logging
+import pandas as pd
+
+# 工作进程内的处理链，通过进程池 initializer 只传输一次
+_worker_processor = None
+
+
+def _init_worker(processor: Any) -> None:
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _process_partition(partition: pd.DataFrame) -> pd.DataFrame:
+    return _worker_processor.process(partition)
+
+
+class PartitionedExecutor:
+    """按分区键将数据拆分，在进程池中并行执行处理链
+    
+    每个分区独立执行完整的处理链，因此去重、滚动窗口等都只作用于分区内部，
+    一个实验的序列不会进入另一个实验的窗口。未拟合的处理器会在各分区上分别计算统计量；
+    需要全局一致的填充值/缩放参数时，先调用 DataProcessor.fit 或 load_state。
+    结果按分区键排序合并（preserve_order=True 时恢复输入行顺序），与完成顺序无关。
+    """
+    
+    def __init__(
+        self,
+        processor: Any,
+        partition_key: Union[str, List[str]],
+        max_workers: Optional[int] = None,
+        preserve_order: bool = False
+    ):
+        self.processor = processor
+        self.partition_key = partition_key
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.preserve_order = preserve_order
+        self.logger = logging.getLogger(__name__)
+        
+    def split(self, data: pd.DataFrame) -> List[pd.DataFrame]:
+        """按分区键拆分数据，分区按键排序，分区内保持原有行顺序"""
+        groups = data.groupby(self.partition_key, sort=True, dropna=False, observed=True)
+        return [partition for _, partition in groups]
+        
+    def process(self, data: pd.DataFrame) -> pd.DataFrame:
+        partitions = self.split(data)
+        self.logger.info(
+            f"Processing {len(partitions)} partitions by {self.partition_key} "
+            f"with {self.max_workers} workers"
+        )
+        
+        if self.max_workers == 1 or len(partitions) <= 1:
+            results = [self.processor.process(partition) for partition in partitions]
+        else:
+            # 分区较多时成批提交，降低进程间通信开销
+            chunksize = max(1, len(partitions) // (self.max_workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.processor,)
+            ) as pool:
+                results = list(pool.map(_process_partition, partitions, chunksize=chunksize))
+                
+        results = [result for result in results if len(result)]
+        if not results:
+            return data.iloc[0:0]
+        merged = pd.concat(results)
+        
+        if self.preserve_order and data.index.is_unique:
+            positions = data.index.get_indexer(merged.index)
+            merged = merged.iloc[positions.argsort(kind='stable')]
+        return merged
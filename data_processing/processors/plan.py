@@ -0,0 +1,525 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import logging
+import pandas as pd
+import numpy as np
+
+from .base_processor import BaseProcessor
+from .cleaning_processor import CleaningProcessor, STATISTIC_STRATEGIES, fill_missing
+from .transform_processor import TransformProcessor, SCALERS, _scaler_input
+from .feature_processor import FeatureProcessor
+from .encoders import encode_column
+from .windows import compute_window_feature, window_columns, window_output_names
+
+# 可以把相邻同类节点合并为一次列操作的算子
+FUSIBLE_OPS = ('dropna', 'fillna', 'clip', 'astype', 'scale')
+
+DATETIME_PARTS = ('year', 'month', 'day', 'hour', 'dayofweek')
+
+
+class PlanNode:
+    """逻辑计划中的一个算子
+    
+    reads/writes 描述读写的列，write_prefixes 用于列名事先未知的输出（如独热编码）；
+    row_filter 表示算子会删除行；row_dependent 表示结果依赖当前的行集合或行顺序
+    （未拟合的统计量、滚动窗口等），行过滤不能越过这样的算子下推。
+    """
+    
+    def __init__(
+        self,
+        op: str,
+        params: Optional[Dict[str, Any]] = None,
+        reads: Iterable[str] = (),
+        writes: Iterable[str] = (),
+        write_prefixes: Iterable[str] = (),
+        reads_all: bool = False,
+        row_filter: bool = False,
+        row_dependent: bool = False,
+        source: str = ''
+    ):
+        self.op = op
+        self.params = params or {}
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.write_prefixes = tuple(write_prefixes)
+        self.reads_all = reads_all
+        self.row_filter = row_filter
+        self.row_dependent = row_dependent
+        self.source = source
+        self.fused_count = 1
+        self.notes: List[str] = []
+        
+    @property
+    def opaque(self) -> bool:
+        return self.op == 'processor'
+        
+    def produces(self, columns: Set[str]) -> bool:
+        """是否写出给定列中的任意一列"""
+        if self.opaque:
+            return True
+        return bool(self.writes & columns) or any(
+            col.startswith(prefix) for col in columns for prefix in self.write_prefixes
+        )
+        
+    def describe(self) -> str:
+        if self.op == 'dropna':
+            detail = f"subset={self.params['columns']}"
+        elif self.op == 'fillna':
+            detail = ', '.join(
+                f"{col}={spec.get('strategy', repr(spec.get('value')))}"
+                for col, spec in self.params['fills'].items()
+            )
+        elif self.op == 'clip':
+            detail = ', '.join(
+                f"{col}={'iqr' if bounds is None else tuple(round(b, 6) for b in bounds)}"
+                for col, bounds in self.params['bounds'].items()
+            )
+        elif self.op == 'astype':
+            detail = ', '.join(f"{col}->{dtype}" for col, dtype in self.params['dtypes'].items())
+        elif self.op == 'scale':
+            detail = ', '.join(
+                f"{col}={method}{'' if scaler is None else '(fitted)'}"
+                for col, (method, scaler) in self.params['scalers'].items()
+            )
+        elif self.op == 'encode':
+            spec, categories = self.params['spec'], self.params['categories']
+            detail = f"{self.params['column']} {spec['method']}"
+            if spec.get('sparse'):
+                detail += ' sparse'
+            if categories is not None:
+                detail += f" ({len(categories)} categories)"
+        elif self.op == 'combine':
+            feature = self.params['feature']
+            detail = f"{feature['name']} = {feature['method']}({', '.join(feature['columns'])})"
+        elif self.op == 'datetime_parts':
+            detail = self.params['column']
+        elif self.op == 'rolling':
+            feature = self.params['feature']
+            window = f"ewm={feature['ewm']}" if 'ewm' in feature else f"window={feature['window']}"
+            detail = f"{feature['column']} {window} {feature['operations']}"
+            if feature.get('group_by'):
+                detail += f" by {feature['group_by']}"
+        elif self.op == 'processor':
+            detail = self.params['processor'].__class__.__name__
+        else:
+            detail = ''
+        return f"{self.op}({detail})" if detail else self.op
+
+
+class ProcessingPlan:
+    """由处理器配置构建的惰性逻辑计划
+    
+    优化包括：按所需输出列裁剪无用算子并在读入时投影列、把 dropna 等行过滤下推到
+    不依赖行集合的算子之前、把相邻的同类列操作合并为一次向量化操作。
+    计划构建时读取处理器已拟合的统计量，处理器重新拟合后需要重新构建计划。
+    """
+    
+    def __init__(self, nodes: List[PlanNode], columns: Optional[List[str]] = None):
+        self.logical_nodes = nodes
+        self.columns = columns
+        self.logger = logging.getLogger(__name__)
+        self.pruned: List[PlanNode] = []
+        self.input_columns: Optional[Set[str]] = None
+        self.nodes = self._optimize(list(nodes))
+        
+    @classmethod
+    def from_processors(
+        cls,
+        processors: List[BaseProcessor],
+        columns: Optional[List[str]] = None
+    ) -> 'ProcessingPlan':
+        nodes = []
+        for processor in processors:
+            if type(processor) is CleaningProcessor:
+                nodes.extend(_cleaning_nodes(processor))
+            elif type(processor) is TransformProcessor:
+                nodes.extend(_transform_nodes(processor))
+            elif type(processor) is FeatureProcessor and not processor.incremental:
+                nodes.extend(_feature_nodes(processor))
+            else:
+                # 未知处理器（以及保留跨批次窗口历史的增量特征处理器）作为整体执行，也是优化的边界
+                nodes.append(PlanNode(
+                    'processor', {'processor': processor}, reads_all=True,
+                    row_filter=True, row_dependent=True, source=processor.__class__.__name__
+                ))
+        return cls(nodes, columns)
+        
+    # ---- 优化 ----
+    
+    def _optimize(self, nodes: List[PlanNode]) -> List[PlanNode]:
+        nodes = self._prune_columns(nodes)
+        nodes = self._push_down_filters(nodes)
+        return self._fuse(nodes)
+        
+    def _prune_columns(self, nodes: List[PlanNode]) -> List[PlanNode]:
+        """自后向前做列活跃性分析，删除输出无人使用的算子，并得到需要读入的列"""
+        if self.columns is None:
+            return nodes
+            
+        live: Optional[Set[str]] = set(self.columns)
+        kept = []
+        for node in reversed(nodes):
+            if live is not None and not node.row_filter and not node.produces(live):
+                self.pruned.append(node)
+                continue
+            kept.append(node)
+            if live is None:
+                continue
+            if node.reads_all:
+                live = None
+                continue
+            live = {
+                col for col in live
+                if col not in node.writes and not col.startswith(node.write_prefixes)
+            }
+            live |= node.reads
+        self.pruned.reverse()
+        self.input_columns = live
+        return list(reversed(kept))
+        
+    def _push_down_filters(self, nodes: List[PlanNode]) -> List[PlanNode]:
+        """把 dropna 移到与其可交换的算子之前，尽早减少后续算子处理的行数"""
+        result: List[PlanNode] = []
+        for node in nodes:
+            if node.op != 'dropna':
+                result.append(node)
+                continue
+            index = len(result)
+            while index > 0 and _commutes_with_filter(result[index - 1], node):
+                index -= 1
+            if index < len(result):
+                node.notes.append(f"pushed down past {len(result) - index} ops")
+            result.insert(index, node)
+        return result
+        
+    def _fuse(self, nodes: List[PlanNode]) -> List[PlanNode]:
+        """合并相邻的同类列操作（作用于不同列），每组只遍历一次数据"""
+        fused: List[PlanNode] = []
+        for node in nodes:
+            previous = fused[-1] if fused else None
+            if (
+                previous is not None
+                and node.op == previous.op
+                and node.op in FUSIBLE_OPS
+                and _can_fuse(previous, node)
+            ):
+                fused[-1] = _merge(previous, node)
+            else:
+                fused.append(node)
+        return fused
+        
+    # ---- 展示与执行 ----
+    
+    def explain(self) -> str:
+        """返回逻辑计划与优化后计划的文本说明"""
+        lines = ['== Logical plan ==']
+        lines += [f"  {i:>2}  {node.describe()}  [{node.source}]" for i, node in enumerate(self.logical_nodes)]
+        
+        lines.append('== Optimized plan ==')
+        scan = 'all columns' if self.input_columns is None else sorted(self.input_columns)
+        lines.append(f"   0  scan({scan})")
+        for i, node in enumerate(self.nodes, start=1):
+            notes = f"  <- {'; '.join(node.notes)}" if node.notes else ''
+            lines.append(f"  {i:>2}  {node.describe()}  [{node.source}]{notes}")
+        if self.columns is not None:
+            lines.append(f"  {len(self.nodes) + 1:>2}  project({self.columns})")
+            
+        if self.pruned:
+            lines.append('== Pruned (outputs not required) ==')
+            lines += [f"      {node.describe()}  [{node.source}]" for node in self.pruned]
+            
+        lines.append(f"== {len(self.logical_nodes)} logical ops -> {len(self.nodes)} physical ops ==")
+        return '\n'.join(lines)
+        
+    def execute(self, data: pd.DataFrame) -> pd.DataFrame:
+        """执行优化后的计划"""
+        if self.input_columns is not None:
+            df = data[[col for col in data.columns if col in self.input_columns]].copy()
+        else:
+            df = data.copy()
+            
+        for node in self.nodes:
+            df = EXECUTORS[node.op](df, node, self.logger)
+            
+        if self.columns is not None:
+            df = df[self.columns]
+        return df
+
+
+def _commutes_with_filter(node: PlanNode, row_filter: PlanNode) -> bool:
+    """行过滤能否越过 node 提前执行而不改变结果"""
+    if node.opaque or node.row_dependent:
+        return False
+    if node.op == 'dropna':
+        return False
+    # 去重按整行比较，完全相同的行在过滤列上的缺失情况一致，因此可交换
+    return not node.produces(row_filter.reads)
+
+
+def _can_fuse(first: PlanNode, second: PlanNode) -> bool:
+    if first.op == 'dropna':
+        return True
+    return not (first.writes & second.writes)
+
+
+def _merge(first: PlanNode, second: PlanNode) -> PlanNode:
+    key = {
+        'dropna': 'columns',
+        'fillna': 'fills',
+        'clip': 'bounds',
+        'astype': 'dtypes',
+        'scale': 'scalers'
+    }[first.op]
+    if first.op == 'dropna':
+        params = {'columns': first.params['columns'] + second.params['columns']}
+    else:
+        params = {key: {**first.params[key], **second.params[key]}}
+    sources = first.source if first.source == second.source else f"{first.source}+{second.source}"
+    merged = PlanNode(
+        first.op, params,
+        reads=first.reads | second.reads,
+        writes=first.writes | second.writes,
+        row_filter=first.row_filter,
+        row_dependent=first.row_dependent or second.row_dependent,
+        source=sources
+    )
+    merged.fused_count = first.fused_count + second.fused_count
+    merged.notes = [note for note in first.notes + second.notes if not note.startswith('fused')]
+    merged.notes.append(f"fused {merged.fused_count} ops")
+    return merged
+
+
+# ---- 由处理器配置生成算子 ----
+
+def _cleaning_nodes(processor: CleaningProcessor) -> List[PlanNode]:
+    config = processor.config
+    statistics = processor.statistics if processor.requires_fit else None
+    source = processor.__class__.__name__
+    nodes = []
+    
+    if config.get('remove_duplicates', True):
+        nodes.append(PlanNode('drop_duplicates', reads_all=True, row_filter=True, source=source))
+        
+    for col, strategy in config.get('null_handling', {}).items():
+        if strategy == 'drop':
+            nodes.append(PlanNode(
+                'dropna', {'columns': [col]}, reads=[col], row_filter=True, source=source
+            ))
+        elif strategy in STATISTIC_STRATEGIES:
+            fitted = statistics is not None
+            spec = {'value': statistics['fill_values'][col]} if fitted else {'strategy': strategy}
+            nodes.append(PlanNode(
+                'fillna', {'fills': {col: spec}}, reads=[col], writes=[col],
+                row_dependent=not fitted, source=source
+            ))
+        elif isinstance(strategy, (int, float, str)):
+            nodes.append(PlanNode(
+                'fillna', {'fills': {col: {'value': strategy}}}, reads=[col], writes=[col], source=source
+            ))
+            
+    for col, limits in config.get('outlier_handling', {}).items():
+        if limits.get('method') == 'iqr':
+            bounds = statistics['outlier_bounds'][col] if statistics is not None else None
+            nodes.append(PlanNode(
+                'clip', {'bounds': {col: bounds}}, reads=[col], writes=[col],
+                row_dependent=bounds is None, source=source
+            ))
+    return nodes
+
+
+def _transform_nodes(processor: TransformProcessor) -> List[PlanNode]:
+    config = processor.config
+    source = processor.__class__.__name__
+    nodes = []
+    
+    for col, dtype in config.get('dtype_mapping', {}).items():
+        nodes.append(PlanNode(
+            'astype', {'dtypes': {col: dtype}}, reads=[col], writes=[col], source=source
+        ))
+        
+    for col, method in config.get('scaling', {}).items():
+        if method not in SCALERS:
+            continue
+        scaler = processor.scalers.get(col) if processor.is_fitted else None
+        nodes.append(PlanNode(
+            'scale', {'scalers': {col: (method, scaler)}}, reads=[col], writes=[col],
+            row_dependent=scaler is None, source=source
+        ))
+        
+    for col, spec in processor.encodings.items():
+        fitted = processor.is_fitted and spec['method'] != 'hashing'
+        categories = processor.categories.get(col) if fitted else None
+        statistics = processor.encoding_statistics.get(col) if fitted else None
+        # 未拟合的目标编码在批内统计，需要读取目标列
+        reads = [col] + ([spec['target']] if spec['method'] == 'target' and not fitted else [])
+        expands = spec['method'] in ('onehot', 'hashing')
+        nodes.append(PlanNode(
+            'encode', {'column': col, 'spec': spec, 'categories': categories, 'statistics': statistics},
+            reads=reads, writes=[col], write_prefixes=[f'{col}_'] if expands else [],
+            row_dependent=spec['method'] != 'hashing' and not fitted, source=source
+        ))
+    return nodes
+
+
+def _feature_nodes(processor: FeatureProcessor) -> List[PlanNode]:
+    config = processor.config
+    source = processor.__class__.__name__
+    nodes = []
+    
+    for feature in config.get('feature_combinations', []):
+        nodes.append(PlanNode(
+            'combine', {'feature': feature}, reads=feature['columns'], writes=[feature['name']],
+            source=source
+        ))
+        
+    for col in config.get('datetime_features', []):
+        nodes.append(PlanNode(
+            'datetime_parts', {'column': col}, reads=[col],
+            writes=[f'{col}_{part}' for part in DATETIME_PARTS], source=source
+        ))
+        
+    for feature in config.get('window_features', []):
+        nodes.append(PlanNode(
+            'rolling', {'feature': feature}, reads=window_columns(feature),
+            writes=list(window_output_names(feature).values()), row_dependent=True, source=source
+        ))
+    return nodes
+
+
+# ---- 物理执行 ----
+
+def _execute_drop_duplicates(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    return df.drop_duplicates()
+
+
+def _execute_dropna(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    return df.dropna(subset=node.params['columns'])
+
+
+def _execute_fillna(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    values = {}
+    for col, spec in node.params['fills'].items():
+        strategy = spec.get('strategy')
+        if strategy == 'mean':
+            values[col] = df[col].mean()
+        elif strategy == 'median':
+            values[col] = df[col].median()
+        elif strategy == 'mode':
+            values[col] = df[col].mode()[0]
+        else:
+            values[col] = spec['value']
+    for col, value in values.items():
+        df[col] = fill_missing(df[col], value)
+    return df
+
+
+def _execute_clip(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    lower, upper = {}, {}
+    for col, bounds in node.params['bounds'].items():
+        if bounds is None:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            bounds = (Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
+        lower[col], upper[col] = bounds
+    cols = list(lower)
+    if len(cols) == 1:
+        df[cols[0]] = df[cols[0]].clip(lower=lower[cols[0]], upper=upper[cols[0]])
+    else:
+        df[cols] = df[cols].clip(lower=pd.Series(lower), upper=pd.Series(upper), axis=1)
+    return df
+
+
+def _execute_astype(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    dtypes = node.params['dtypes']
+    try:
+        return df.astype(dtypes)
+    except Exception:
+        # 合并转换失败时逐列转换，与 TransformProcessor 一样只记录出错的列
+        for col, dtype in dtypes.items():
+            try:
+                df[col] = df[col].astype(dtype)
+            except Exception as e:
+                logger.error(f"Type conversion failed for {col}: {str(e)}")
+        return df
+
+
+def _execute_scale(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    fitted = {col: scaler for col, (method, scaler) in node.params['scalers'].items() if scaler is not None}
+    for col, (method, scaler) in node.params['scalers'].items():
+        if scaler is None:
+            df[col] = SCALERS[method]().fit_transform(_scaler_input(df, col))
+            
+    # 已拟合的缩放器按类型合并成一个矩阵运算，运算顺序与 sklearn 的 transform 相同
+    for scaler_type in SCALERS.values():
+        cols = [col for col, scaler in fitted.items() if type(scaler) is scaler_type]
+        if not cols:
+            continue
+        block = df[cols].to_numpy(dtype='float64', na_value=np.nan, copy=True)
+        if scaler_type is SCALERS['standard']:
+            mean = np.array([fitted[col].mean_[0] for col in cols])
+            scale = np.array([fitted[col].scale_[0] for col in cols])
+            block -= mean
+            block /= scale
+        else:
+            scale = np.array([fitted[col].scale_[0] for col in cols])
+            offset = np.array([fitted[col].min_[0] for col in cols])
+            block *= scale
+            block += offset
+        df[cols] = block
+    return df
+
+
+def _execute_encode(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    params = node.params
+    return encode_column(df, params['column'], params['spec'], params['categories'], params['statistics'])
+
+
+def _execute_combine(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    feature = node.params['feature']
+    cols, method, name = feature['columns'], feature['method'], feature['name']
+    if method == 'multiply':
+        df[name] = df[cols].prod(axis=1)
+    elif method == 'divide':
+        df[name] = df[cols[0]] / df[cols[1]]
+    elif method == 'add':
+        df[name] = df[cols].sum(axis=1)
+    elif method == 'subtract':
+        df[name] = df[cols[0]] - df[cols[1]]
+    return df
+
+
+def _execute_datetime_parts(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    col = node.params['column']
+    if pd.api.types.is_datetime64_any_dtype(df[col]):
+        for part in DATETIME_PARTS:
+            df[f'{col}_{part}'] = getattr(df[col].dt, part)
+    return df
+
+
+def _execute_rolling(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    for name, values in compute_window_feature(df, node.params['feature']).items():
+        df[name] = values
+    return df
+
+
+def _execute_processor(df: pd.DataFrame, node: PlanNode, logger: logging.Logger) -> pd.DataFrame:
+    processor = node.params['processor']
+    if processor.validate_input(df):
+        return processor.process(df)
+    logger.error(f"Validation failed for {processor.__class__.__name__}")
+    return df
+
+
+EXECUTORS: Dict[str, Callable[[pd.DataFrame, PlanNode, logging.Logger], pd.DataFrame]] = {
+    'drop_duplicates': _execute_drop_duplicates,
+    'dropna': _execute_dropna,
+    'fillna': _execute_fillna,
+    'clip': _execute_clip,
+    'astype': _execute_astype,
+    'scale': _execute_scale,
+    'encode': _execute_encode,
+    'combine': _execute_combine,
+    'datetime_parts': _execute_datetime_parts,
+    'rolling': _execute_rolling,
+    'processor': _execute_processor
+}
@@ -0,0 +1,208 @@
+from typing import Any, Callable, Dict, List, Optional
+import contextlib
+import json
+import logging
+import time
+import pandas as pd
+
+# 记录在嵌套路径中使用的分隔符，与 flame graph 的折叠栈格式一致
+PATH_SEPARATOR = ';'
+
+Hook = Callable[[Dict[str, Any]], None]
+
+
+class StageSpan:
+    """一次被记录的阶段/操作；执行完毕后调用 output() 登记输出数据框"""
+    
+    def __init__(self, record: Dict[str, Any], data: pd.DataFrame):
+        self.record = record
+        self.result = data
+        
+    def output(self, data: pd.DataFrame) -> None:
+        self.result = data
+
+
+class _NullSpan:
+    """未启用性能分析时使用，不做任何记录"""
+    
+    def output(self, data: pd.DataFrame) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class StageProfiler:
+    """记录处理器及其每个配置操作的耗时、行数、列变化与内存变化
+    
+    处理器整体和其内部操作（每列 fillna、每列缩放、每个滚动窗口等）形成嵌套记录，
+    path 为以分号分隔的调用路径。内存变化按数据框各列缓冲区大小计算（memory_usage(deep=False)），
+    不包含 object 列中字符串本身占用的内存。
+    pre/post 钩子接收记录字典：pre 钩子在操作开始前调用（只有输入相关字段），
+    post 钩子在操作结束后调用（包含全部字段）。
+    """
+    
+    def __init__(self):
+        self.records = []
+        self.pre_hooks = []
+        self.post_hooks = []
+        self._stack = []
+        self.logger = logging.getLogger(__name__)
+        
+    def __getstate__(self) -> Dict[str, Any]:
+        # 并行执行时处理链会被序列化到工作进程，钩子可能是无法序列化的闭包
+        state = self.__dict__.copy()
+        state['records'] = []
+        state['pre_hooks'] = []
+        state['post_hooks'] = []
+        state['_stack'] = []
+        return state
+        
+    def add_hook(self, pre: Optional[Hook] = None, post: Optional[Hook] = None) -> None:
+        """注册钩子"""
+        if pre is not None:
+            self.pre_hooks.append(pre)
+        if post is not None:
+            self.post_hooks.append(post)
+            
+    def reset(self) -> None:
+        """清空已有记录"""
+        self.records = []
+        self._stack = []
+        
+    @contextlib.contextmanager
+    def span(self, name: str, data: pd.DataFrame):
+        """记录一个阶段；with 块内调用 span.output(df) 登记输出，未登记时以输入数据框为输出"""
+        self._stack.append(name)
+        record = {
+            'name': name,
+            'path': PATH_SEPARATOR.join(self._stack),
+            'depth': len(self._stack) - 1,
+            'rows_in': len(data),
+            'columns_in': len(data.columns)
+        }
+        columns_in = list(data.columns)
+        bytes_in = _frame_bytes(data)
+        for hook in self.pre_hooks:
+            hook(record)
+            
+        span = StageSpan(record, data)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            record['error'] = str(e)
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            result = span.result
+            existing = set(columns_in)
+            bytes_out = _frame_bytes(result)
+            record.update({
+                'rows_out': len(result),
+                'columns_out': len(result.columns),
+                'columns_added': [str(col) for col in result.columns if col not in existing],
+                'columns_removed': [str(col) for col in columns_in if col not in set(result.columns)],
+                'bytes_in': bytes_in,
+                'bytes_out': bytes_out,
+                'memory_delta': bytes_out - bytes_in
+            })
+            self.records.append(record)
+            for hook in self.post_hooks:
+                hook(record)
+                
+    def summary(self) -> List[Dict[str, Any]]:
+        """按调用路径汇总记录（流式处理时同一路径会出现多次）
+        
+        self_seconds 为扣除子操作后本层自身的耗时，结果按首次出现的调用顺序排列。
+        """
+        totals = {}
+        for record in self.records:
+            entry = totals.get(record['path'])
+            if entry is None:
+                entry = totals[record['path']] = {
+                    'path': record['path'],
+                    'name': record['name'],
+                    'depth': record['depth'],
+                    'calls': 0,
+                    'wall_seconds': 0.0,
+                    'child_seconds': 0.0,
+                    'rows_in': 0,
+                    'rows_out': 0,
+                    'columns_added': [],
+                    'memory_delta': 0
+                }
+            entry['calls'] += 1
+            entry['wall_seconds'] += record['wall_seconds']
+            entry['rows_in'] += record['rows_in']
+            entry['rows_out'] += record['rows_out']
+            entry['memory_delta'] += record['memory_delta']
+            for col in record['columns_added']:
+                if col not in entry['columns_added']:
+                    entry['columns_added'].append(col)
+                    
+        for path, entry in totals.items():
+            parent = path.rpartition(PATH_SEPARATOR)[0]
+            if parent in totals:
+                totals[parent]['child_seconds'] += entry['wall_seconds']
+                
+        # 子操作的记录先于父阶段完成，按路径前缀恢复调用顺序
+        ordered = _tree_order(list(totals))
+        summary = []
+        for path in ordered:
+            entry = totals[path]
+            entry['self_seconds'] = max(entry['wall_seconds'] - entry.pop('child_seconds'), 0.0)
+            summary.append(entry)
+        return summary
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {'records': self.records, 'summary': self.summary()}
+        
+    def export_json(self, path: str) -> None:
+        """将明细记录与汇总导出为JSON文件"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            
+    def format_table(self, width: int = 30) -> str:
+        """flame 风格的汇总表：按调用层级缩进，条形长度为占顶层总耗时的比例"""
+        summary = self.summary()
+        total = sum(entry['wall_seconds'] for entry in summary if entry['depth'] == 0) or 1.0
+        names = ['  ' * entry['depth'] + entry['name'] for entry in summary]
+        name_width = max([len(name) for name in names] + [len('stage')])
+        
+        lines = [
+            f"{'stage':<{name_width}}  {'calls':>6}  {'total_s':>9}  {'self_s':>9}  {'%':>6}  "
+            f"{'rows_in':>10}  {'rows_out':>10}  {'cols+':>5}  {'mem_delta_MiB':>13}  profile"
+        ]
+        for name, entry in zip(names, summary):
+            share = entry['wall_seconds'] / total
+            lines.append(
+                f"{name:<{name_width}}  {entry['calls']:>6}  {entry['wall_seconds']:>9.4f}  "
+                f"{entry['self_seconds']:>9.4f}  {share:>6.1%}  {entry['rows_in']:>10}  "
+                f"{entry['rows_out']:>10}  {len(entry['columns_added']):>5}  "
+                f"{entry['memory_delta'] / 1024 ** 2:>13.2f}  {'#' * max(1, round(share * width))}"
+            )
+        return '\n'.join(lines)
+        
+    def log_summary(self) -> None:
+        self.logger.info("Stage profile:\n" + self.format_table())
+
+
+def _frame_bytes(data: pd.DataFrame) -> int:
+    return int(data.memory_usage(index=True, deep=False).sum())
+
+
+def _tree_order(paths: List[str]) -> List[str]:
+    """父路径排在其子路径之前，同层保持首次出现的顺序"""
+    first_seen = {}
+    for position, path in enumerate(paths):
+        parts = path.split(PATH_SEPARATOR)
+        for depth in range(1, len(parts) + 1):
+            first_seen.setdefault(PATH_SEPARATOR.join(parts[:depth]), position)
+            
+    def sort_key(path: str) -> List[int]:
+        parts = path.split(PATH_SEPARATOR)
+        return [first_seen[PATH_SEPARATOR.join(parts[:depth])] for depth in range(1, len(parts) + 1)]
+        
+    return sorted(paths, key=sort_key)
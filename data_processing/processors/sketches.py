@@ -0,0 +1,235 @@
+from typing import Any, Dict, List, Optional
+import math
+import pandas as pd
+import numpy as np
+
+from .statistics import ACCUMULATORS, bounds_from_quartiles, to_builtin, to_float_array
+
+# KLL 在 k=200 时归一化秩误差约为 1.65%（99% 置信度），误差与 k 成反比
+KLL_ERROR_CONSTANT = 3.3
+
+
+def kll_k_for_error(rank_error: float) -> int:
+    """给定归一化秩误差（如 0.01 表示 1%）所需的 KLL 参数 k"""
+    return max(8, int(math.ceil(KLL_ERROR_CONSTANT / rank_error)))
+
+
+class KLLSketch:
+    """KLL 分位数草图：内存为 O(k log(n/k))，可按块更新、跨分区合并
+    
+    第 h 层每个元素代表 2^h 个原始值；某层超出容量时排序后隔一取一提升到上一层。
+    整块数据一次性压缩，块内排序由 numpy 向量化完成。
+    keep_missing 为 True 时只统计缺失值个数，计算分位数时可按给定填充值以相应权重计入。
+    """
+    
+    def __init__(self, k: int = 200, keep_missing: bool = False, seed: int = 0):
+        self.k = k
+        self.keep_missing = keep_missing
+        self.levels: List[np.ndarray] = [np.empty(0, dtype='float64')]
+        self.count = 0
+        self.missing = 0
+        self._rng = np.random.default_rng(seed)
+        
+    def update(self, series: pd.Series) -> None:
+        values = to_float_array(series)
+        missing = np.isnan(values)
+        if self.keep_missing:
+            self.missing += int(missing.sum())
+        values = values[~missing]
+        self.count += len(values)
+        self._add(0, values)
+        self._compress()
+        
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self.count += other.count
+        self.missing += other.missing
+        self._compress()
+        return self
+        
+    def quantiles(self, qs: List[float], missing_value: Optional[float] = None) -> List[float]:
+        """近似分位数；missing_value 不为 None 时缺失值按该值计入"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)
+        ])
+        if missing_value is not None and self.missing:
+            items = np.append(items, float(missing_value))
+            weights = np.append(weights, float(self.missing))
+        if not len(items):
+            return [float('nan')] * len(qs)
+            
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return [float(items[min(position, len(items) - 1)]) for position in positions]
+        
+    def result(self) -> float:
+        return self.quantiles([0.5])[0]
+        
+    def iqr_bounds(self, missing_value: Optional[float] = None) -> tuple:
+        q1, q3 = self.quantiles([0.25, 0.75], missing_value)
+        return bounds_from_quartiles(q1, q3)
+        
+    def error_bound(self) -> Dict[str, float]:
+        return {'rank_error': KLL_ERROR_CONSTANT / self.k}
+        
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'type': 'kll',
+            'k': self.k,
+            'keep_missing': self.keep_missing,
+            'levels': [level.tolist() for level in self.levels],
+            'count': self.count,
+            'missing': self.missing
+        }
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'KLLSketch':
+        sketch = cls(k=state['k'], keep_missing=state['keep_missing'])
+        sketch.levels = [np.asarray(level, dtype='float64') for level in state['levels']]
+        sketch.count = state['count']
+        sketch.missing = state['missing']
+        return sketch
+        
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+        
+    def _add(self, level: int, items: np.ndarray) -> None:
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0, dtype='float64'))
+        if len(items):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+            
+    def _compress(self) -> None:
+        # 新增层会降低下层容量，因此每次压缩后从底层重新检查
+        while True:
+            for level, items in enumerate(self.levels):
+                if len(items) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+                
+    def _compact(self, level: int) -> None:
+        items = np.sort(self.levels[level])
+        kept = items[:0]
+        if len(items) % 2:
+            kept, items = items[-1:], items[:-1]
+        self.levels[level] = kept
+        self._add(level + 1, items[self._rng.integers(2)::2])
+
+
+class MisraGriesAccumulator:
+    """Misra-Gries 高频项累积器：最多保留 capacity 个计数器，用于近似众数
+    
+    每个值的计数最多被低估 总数/(capacity+1)，频次超过该值的项一定被保留；
+    块之间和分区之间按可合并版本（减去第 capacity+1 大的计数）合并。
+    """
+    
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Optional[pd.Series] = None
+        self.total = 0
+        
+    def update(self, series: pd.Series) -> None:
+        counts = series.value_counts(dropna=True)
+        self.total += int(counts.sum())
+        self._merge_counts(counts)
+        
+    def merge(self, other: 'MisraGriesAccumulator') -> 'MisraGriesAccumulator':
+        self.total += other.total
+        if other.counts is not None:
+            self._merge_counts(other.counts)
+        return self
+        
+    def result(self) -> Any:
+        if self.counts is None or self.counts.empty:
+            return None
+        top = self.counts[self.counts == self.counts.max()]
+        return to_builtin(pd.Series(top.index).sort_values().iloc[0])
+        
+    def error_bound(self) -> Dict[str, float]:
+        return {'count_error': self.total / (self.capacity + 1)}
+        
+    def to_state(self) -> Dict[str, Any]:
+        counts = [] if self.counts is None else [
+            [to_builtin(value), to_builtin(count)] for value, count in self.counts.items()
+        ]
+        return {'type': 'misra_gries', 'capacity': self.capacity, 'total': self.total, 'counts': counts}
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'MisraGriesAccumulator':
+        accumulator = cls(capacity=state['capacity'])
+        accumulator.total = state['total']
+        if state['counts']:
+            values, counts = zip(*state['counts'])
+            accumulator.counts = pd.Series(counts, index=list(values), dtype='float64')
+        return accumulator
+        
+    def _merge_counts(self, counts: pd.Series) -> None:
+        merged = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        if len(merged) > self.capacity:
+            threshold = merged.nlargest(self.capacity + 1).iloc[-1]
+            merged = merged - threshold
+            merged = merged[merged > 0]
+        self.counts = merged
+
+
+class MomentsAccumulator:
+    """可合并的均值/方差累积器（Chan 并行算法），数值上比直接累加平方和稳定"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        
+    def update(self, series: pd.Series) -> None:
+        values = to_float_array(series)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        mean = float(values.mean())
+        self._combine(len(values), mean, float(((values - mean) ** 2).sum()))
+        
+    def merge(self, other: 'MomentsAccumulator') -> 'MomentsAccumulator':
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+        
+    def result(self) -> float:
+        return self.mean if self.count else float('nan')
+        
+    def variance(self, ddof: int = 1) -> float:
+        return self.m2 / (self.count - ddof) if self.count > ddof else float('nan')
+        
+    def error_bound(self) -> Dict[str, float]:
+        return {}
+        
+    def to_state(self) -> Dict[str, Any]:
+        return {'type': 'moments', 'count': self.count, 'mean': self.mean, 'm2': self.m2}
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'MomentsAccumulator':
+        accumulator = cls()
+        accumulator.count = state['count']
+        accumulator.mean = state['mean']
+        accumulator.m2 = state['m2']
+        return accumulator
+        
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+
+ACCUMULATORS.update({
+    'kll': KLLSketch,
+    'misra_gries': MisraGriesAccumulator,
+    'moments': MomentsAccumulator
+})
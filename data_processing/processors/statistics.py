@@ -0,0 +1,204 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import numpy as np
+
+
+def to_float_array(series: pd.Series) -> np.ndarray:
+    """将列转换为float数组，缺失值统一为NaN"""
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def to_builtin(value: Any) -> Any:
+    """将numpy标量转换为Python内置类型，便于序列化"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class MeanAccumulator:
+    """可合并的均值累积器"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        
+    def update(self, series: pd.Series) -> None:
+        values = to_float_array(series)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.total += float(values.sum())
+        
+    def merge(self, other: 'MeanAccumulator') -> 'MeanAccumulator':
+        self.count += other.count
+        self.total += other.total
+        return self
+        
+    def result(self) -> float:
+        return self.total / self.count if self.count else float('nan')
+        
+    def to_state(self) -> Dict[str, Any]:
+        return {'type': 'mean', 'count': self.count, 'total': self.total}
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'MeanAccumulator':
+        accumulator = cls()
+        accumulator.count = state['count']
+        accumulator.total = state['total']
+        return accumulator
+
+
+class ValuesAccumulator:
+    """精确分位数累积器：只保留单列的float值，内存与列长度成正比而非整个数据框"""
+    
+    # 状态大小随行数增长，默认不随 get_state 保存
+    bounded = False
+    
+    def __init__(self, keep_missing: bool = False):
+        self.keep_missing = keep_missing
+        self._parts: List[np.ndarray] = []
+        
+    def update(self, series: pd.Series) -> None:
+        values = to_float_array(series)
+        if not self.keep_missing:
+            values = values[~np.isnan(values)]
+        self._parts.append(values)
+        
+    def values(self) -> np.ndarray:
+        if not self._parts:
+            return np.empty(0, dtype='float64')
+        if len(self._parts) > 1:
+            self._parts = [np.concatenate(self._parts)]
+        return self._parts[0]
+        
+    def merge(self, other: 'ValuesAccumulator') -> 'ValuesAccumulator':
+        self._parts.append(other.values())
+        return self
+        
+    def result(self) -> float:
+        values = self.values()
+        return float(np.median(values)) if len(values) else float('nan')
+        
+    def iqr_bounds(self, missing_value: Optional[float] = None) -> tuple:
+        """异常值边界；missing_value 不为 None 时缺失值按该值计入"""
+        values = self.values()
+        if missing_value is not None:
+            values = np.where(np.isnan(values), missing_value, values)
+        return iqr_bounds(values)
+        
+    def to_state(self) -> Dict[str, Any]:
+        # 精确模式的状态大小与行数成正比
+        return {'type': 'values', 'keep_missing': self.keep_missing, 'values': self.values().tolist()}
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'ValuesAccumulator':
+        accumulator = cls(keep_missing=state['keep_missing'])
+        accumulator._parts = [np.asarray(state['values'], dtype='float64')]
+        return accumulator
+
+
+class ModeAccumulator:
+    """众数累积器：按值计数，结果与 Series.mode()[0] 一致（频次相同取最小值）"""
+    
+    # 状态大小随不同值的个数增长，默认不随 get_state 保存
+    bounded = False
+    
+    def __init__(self):
+        self.counts: Optional[pd.Series] = None
+        
+    def update(self, series: pd.Series) -> None:
+        counts = series.value_counts(dropna=True)
+        if self.counts is None:
+            self.counts = counts
+        else:
+            self.counts = self.counts.add(counts, fill_value=0)
+            
+    def merge(self, other: 'ModeAccumulator') -> 'ModeAccumulator':
+        if other.counts is not None:
+            self.counts = other.counts if self.counts is None else self.counts.add(other.counts, fill_value=0)
+        return self
+        
+    def result(self) -> Any:
+        if self.counts is None or self.counts.empty:
+            return None
+        top = self.counts[self.counts == self.counts.max()]
+        return to_builtin(pd.Series(top.index).sort_values().iloc[0])
+        
+    def to_state(self) -> Dict[str, Any]:
+        # JSON 的键只能是字符串，因此按 [值, 计数] 列表保存
+        counts = [] if self.counts is None else [
+            [to_builtin(value), to_builtin(count)] for value, count in self.counts.items()
+        ]
+        return {'type': 'mode', 'counts': counts}
+        
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'ModeAccumulator':
+        accumulator = cls()
+        if state['counts']:
+            values, counts = zip(*state['counts'])
+            accumulator.counts = pd.Series(counts, index=list(values))
+        return accumulator
+
+
+class HashRuns:
+    """已见过的 64 位行哈希集合，用于流式遍历时跨块去重
+    
+    哈希保存在若干个已排序的 uint64 数组中，新数组不小于最后一个数组时合并（大小按 2 倍递增，
+    最多 O(log n) 个数组），每行 8 字节；每块的查找为 O(块大小 × log n)，合并的总代价为 O(n log n)。
+    max_size 限制保存的哈希个数，达到上限后不再记录新的哈希（返回 False），内存不再增长。
+    """
+    
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.runs: List[np.ndarray] = []
+        self.size = 0
+        
+    def __len__(self) -> int:
+        return self.size
+        
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+        
+    def add(self, hashes: np.ndarray) -> bool:
+        """加入不在集合中且互不相同的哈希；超出 max_size 时只加入能容纳的部分并返回 False"""
+        complete = True
+        if self.max_size is not None and self.size + len(hashes) > self.max_size:
+            hashes = hashes[:max(self.max_size - self.size, 0)]
+            complete = False
+        if not len(hashes):
+            return complete
+        run = np.sort(hashes)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            # 两个已排序数组拼接后的稳定排序（timsort）为线性合并
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind='stable')
+        self.runs.append(run)
+        self.size += len(hashes)
+        return complete
+
+
+ACCUMULATORS = {
+    'mean': MeanAccumulator,
+    'values': ValuesAccumulator,
+    'mode': ModeAccumulator
+}
+
+
+def accumulator_from_state(state: Dict[str, Any]) -> Any:
+    """根据序列化状态重建累积器"""
+    return ACCUMULATORS[state['type']].from_state(state)
+
+
+def iqr_bounds(values: np.ndarray) -> tuple:
+    """根据四分位距计算异常值上下界"""
+    if not len(values) or np.isnan(values).all():
+        return float('nan'), float('nan')
+    q1, q3 = np.nanquantile(values, [0.25, 0.75])
+    return bounds_from_quartiles(q1, q3)
+
+
+def bounds_from_quartiles(q1: float, q3: float) -> tuple:
+    iqr = q3 - q1
+    return float(q1 - 1.5 * iqr), float(q3 + 1.5 * iqr)
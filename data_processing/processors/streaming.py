@@ -0,0 +1,94 @@
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
+import os
+import pandas as pd
+
+ChunkSource = Union[str, Callable[[], Iterable[pd.DataFrame]]]
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith(PARQUET_SUFFIXES)
+
+
+def iter_chunks(
+    source: ChunkSource,
+    chunksize: int = 100000,
+    columns: Optional[List[str]] = None,
+    backend: str = 'numpy',
+    **read_options: Any
+) -> Iterator[pd.DataFrame]:
+    """按块读取CSV/Parquet文件
+    
+    source 可以是文件路径，也可以是每次调用都返回新分块迭代器的函数
+    （流式模式需要多次遍历数据源）。索引在块之间连续递增，与整体读取一致。
+    backend 为 pyarrow 时直接产生 Arrow 列，Parquet 批次不经过 NumPy 转换。
+    """
+    if callable(source):
+        yield from source()
+        return
+        
+    path = os.fspath(source)
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        
+        offset = 0
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            if backend == 'pyarrow':
+                read_options.setdefault('types_mapper', pd.ArrowDtype)
+            chunk = batch.to_pandas(**read_options)
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    else:
+        # CSV 分块读取时各块会独立推断类型，必要时通过 dtype 参数固定列类型
+        if backend == 'pyarrow':
+            read_options.setdefault('dtype_backend', 'pyarrow')
+        reader = pd.read_csv(path, chunksize=chunksize, usecols=columns, **read_options)
+        with reader:
+            yield from reader
+
+
+class ChunkWriter:
+    """将处理后的分块依次写入CSV/Parquet文件"""
+    
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self.rows_written = 0
+        self._parquet_writer = None
+        self._schema = None
+        self._header_written = False
+        
+    def write(self, chunk: pd.DataFrame) -> None:
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            if self._parquet_writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._schema = table.schema
+                self._parquet_writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(
+                self.path,
+                mode='a' if self._header_written else 'w',
+                header=not self._header_written,
+                index=False
+            )
+            self._header_written = True
+        self.rows_written += len(chunk)
+        
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            
+    def __enter__(self) -> 'ChunkWriter':
+        return self
+        
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,51 +1,182 @@
 from .base_processor import BaseProcessor
+from .statistics import to_builtin
+from .encoders import (
+    FITTED_METHODS,
+    column_statistics,
+    dump_statistics,
+    encode_column,
+    encoding_spec,
+    load_statistics,
+    merge_statistics,
+    vocabulary
+)
+from typing import Dict, Any
 import pandas as pd
 import numpy as np
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
-class FeatureProcessor(BaseProcessor):
-    """特征工程处理器"""
+SCALERS = {
+    'standard': StandardScaler,
+    'minmax': MinMaxScaler
+}
+
+class TransformProcessor(BaseProcessor):
+    """数据转换处理器
+    
+    encoding 的取值可以是方法名（onehot/label/hashing/frequency/target），
+    也可以是带参数的字典，如 {'method': 'onehot', 'sparse': True, 'max_categories': 1000}，
+    参数说明见 encoders.encoding_spec。拟合后的词表与频次随 get_state/save_state 保存，
+    载入后各次运行的输出列保持一致。
+    """
     
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.scalers = None
+        self.categories = None
+        self.encoding_statistics = None
+        self.encodings = {
+            col: encoding_spec(spec) for col, spec in config.get('encoding', {}).items()
+        }
+        
+    @property
+    def requires_fit(self) -> bool:
+        return bool(self.config.get('scaling')) or bool(self.config.get('encoding'))
+        
+    @property
+    def is_fitted(self) -> bool:
+        return not self.requires_fit or self.scalers is not None
+        
+    def reset_statistics(self) -> None:
+        self.scalers = None
+        self.categories = None
+        self.encoding_statistics = None
+        
+    def get_state(self, include_accumulators: bool = True) -> Dict[str, Any]:
+        # 缩放器的 n_samples_seen_/var_ 本身就是可继续 partial_fit 的累积量
+        if self.scalers is None:
+            return {'scalers': None, 'categories': None}
+        return {
+            'scalers': {
+                col: {
+                    'method': self.config['scaling'][col],
+                    'attributes': _dump_attributes(scaler)
+                }
+                for col, scaler in self.scalers.items()
+            },
+            'categories': {
+                col: [to_builtin(value) for value in values]
+                for col, values in self.categories.items()
+            },
+            'encodings': {
+                col: dump_statistics(statistics)
+                for col, statistics in self.encoding_statistics.items()
+            }
+        }
+        
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.reset_statistics()
+        if state.get('scalers') is None:
+            return
+        self.scalers = {}
+        for col, scaler_state in state['scalers'].items():
+            scaler = SCALERS[scaler_state['method']]()
+            for name, value in scaler_state['attributes'].items():
+                setattr(scaler, name, _load_attribute(value))
+            self.scalers[col] = scaler
+        self.categories = {
+            col: pd.Index(values) for col, values in state['categories'].items()
+        }
+        self.encoding_statistics = {
+            col: load_statistics(statistics)
+            for col, statistics in state.get('encodings', {}).items()
+        }
+        
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
-        df = data.copy()
+        df = self._working_frame(data)
         
-        # 特征组合
-        for feature in self.config.get('feature_combinations', []):
-            cols = feature['columns']
-            method = feature['method']
-            name = feature['name']
-            
-            if method == 'multiply':
-                df[name] = df[cols].prod(axis=1)
-            elif method == 'divide':
-                df[name] = df[cols[0]] / df[cols[1]]
-            elif method == 'add':
-                df[name] = df[cols].sum(axis=1)
-            elif method == 'subtract':
-                df[name] = df[cols[0]] - df[cols[1]]
+        # 数据类型转换
+        df = self._convert_dtypes(df)
+        
+        # 特征缩放
+        for col, method in self.config.get('scaling', {}).items():
+            with self._profile(f'scale:{col}', df) as span:
+                if self.is_fitted and col in self.scalers:
+                    df[col] = self.scalers[col].transform(_scaler_input(df, col))
+                elif method in SCALERS:
+                    scaler = SCALERS[method]()
+                    df[col] = scaler.fit_transform(_scaler_input(df, col))
+                span.output(df)
                 
-        # 时间特征提取
-        for col in self.config.get('datetime_features', []):
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[f'{col}_year'] = df[col].dt.year
-                df[f'{col}_month'] = df[col].dt.month
-                df[f'{col}_day'] = df[col].dt.day
-                df[f'{col}_hour'] = df[col].dt.hour
-                df[f'{col}_dayofweek'] = df[col].dt.dayofweek
+        # 特征编码
+        for col, spec in self.encodings.items():
+            with self._profile(f'encode:{col}', df) as span:
+                categories = self.categories.get(col) if self.is_fitted else None
+                statistics = self.encoding_statistics.get(col) if self.is_fitted else None
+                df = encode_column(df, col, spec, categories, statistics)
+                span.output(df)
                 
-        # 窗口特征
-        for feature in self.config.get('window_features', []):
-            col = feature['column']
-            window = feature['window']
-            operations = feature['operations']
-            
-            for op in operations:
-                if op == 'mean':
-                    df[f'{col}_mean_{window}'] = df[col].rolling(window).mean()
-                elif op == 'std':
-                    df[f'{col}_std_{window}'] = df[col].rolling(window).std()
-                elif op == 'min':
-                    df[f'{col}_min_{window}'] = df[col].rolling(window).min()
-                elif op == 'max':
-                    df[f'{col}_max_{window}'] = df[col].rolling(window).max()
+        return df
+        
+    def partial_fit(self, data: pd.DataFrame) -> 'TransformProcessor':
+        """按块累积缩放参数与编码类别"""
+        if not self.is_fitted:
+            self.scalers = {}
+            self.categories = {}
+            self.encoding_statistics = {}
+        df = self._convert_dtypes(data.copy())
+        
+        for col, method in self.config.get('scaling', {}).items():
+            if method in SCALERS:
+                scaler = self.scalers.setdefault(col, SCALERS[method]())
+                # 全为缺失值的块会让 MinMaxScaler 的最值变为 NaN，直接跳过
+                if df[col].notna().any():
+                    scaler.partial_fit(_scaler_input(df, col))
                     
+        for col, spec in self.encodings.items():
+            if spec['method'] not in FITTED_METHODS:
+                continue
+            target = df[spec['target']] if spec['method'] == 'target' else None
+            statistics = column_statistics(df[col], target)
+            seen = self.encoding_statistics.get(col)
+            self.encoding_statistics[col] = statistics if seen is None else merge_statistics(seen, statistics)
+            self.categories[col] = vocabulary(self.encoding_statistics[col]['counts'], spec)
+            
+        return self
+        
+    def _convert_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """数据类型转换"""
+        for col, dtype in self.config.get('dtype_mapping', {}).items():
+            with self._profile(f'astype:{col}', df):
+                try:
+                    df[col] = df[col].astype(dtype)
+                except Exception as e:
+                    self.logger.error(f"Type conversion failed for {col}: {str(e)}")
         return df
+
+
+def _scaler_input(df: pd.DataFrame, col: str) -> pd.DataFrame:
+    """sklearn 的输入；Arrow 列先转为 float64，空值变为 NaN"""
+    if isinstance(df[col].dtype, pd.ArrowDtype):
+        return df[[col]].astype('float64')
+    return df[[col]]
+
+
+def _dump_attributes(estimator: Any) -> Dict[str, Any]:
+    """导出 sklearn 估计器的拟合属性（以下划线结尾）"""
+    attributes = {}
+    for name, value in vars(estimator).items():
+        if not name.endswith('_'):
+            continue
+        if isinstance(value, (np.ndarray, np.generic)):
+            # numpy 标量同样保留类型，sklearn 的 partial_fit 依赖其 shape
+            attributes[name] = {'array': np.asarray(value).tolist(), 'dtype': str(value.dtype)}
+        else:
+            attributes[name] = to_builtin(value)
+    return attributes
+
+
+def _load_attribute(value: Any) -> Any:
+    if isinstance(value, dict) and 'array' in value:
+        array = np.asarray(value['array'], dtype=value['dtype'])
+        return array[()] if array.ndim == 0 else array
+    return value
@@ -0,0 +1,191 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import numpy as np
+
+from .statistics import to_builtin, to_float_array
+
+ROLLING_OPERATIONS = ('mean', 'std', 'var', 'min', 'max', 'sum', 'median', 'count')
+EWM_OPERATIONS = ('mean', 'std', 'var')
+EWM_PARAMETERS = ('span', 'alpha', 'halflife', 'com')
+
+
+def window_columns(feature: Dict[str, Any]) -> List[str]:
+    """窗口特征读取的列：取值列、分组列、时间列"""
+    columns = [feature['column']] + group_keys(feature)
+    if feature.get('time_column'):
+        columns.append(feature['time_column'])
+    return list(dict.fromkeys(columns))
+
+
+def group_keys(feature: Dict[str, Any]) -> List[str]:
+    group_by = feature.get('group_by') or []
+    return [group_by] if isinstance(group_by, str) else list(group_by)
+
+
+def window_output_names(feature: Dict[str, Any]) -> Dict[str, str]:
+    """操作 -> 输出列名
+    
+    计数/时间窗口为 {列}_{操作}_{窗口}（如 value_mean_7、value_mean_5min），
+    EWMA 为 {列}_ewm_{操作}_{参数}{取值}（如 value_ewm_mean_span10）。
+    """
+    col = feature['column']
+    if 'ewm' in feature:
+        param, value = _ewm_parameter(feature)
+        return {
+            op: f'{col}_ewm_{op}_{param}{value}'
+            for op in feature['operations'] if op in EWM_OPERATIONS
+        }
+    window = feature['window']
+    return {
+        op: f'{col}_{op}_{window}'
+        for op in feature['operations'] if op in ROLLING_OPERATIONS
+    }
+
+
+def compute_window_feature(df: pd.DataFrame, feature: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """计算一个窗口特征，返回输出列名 -> 与 df 行顺序一致的数组
+    
+    设置 group_by 时所有分组在一次 groupby().rolling()/ewm() 中向量化计算，窗口不跨分组；
+    设置 time_column 时按（分组, 时间）排序后计算，window 可以是 '5min' 这样的时间跨度。
+    EWMA 默认使用递推形式（adjust=False），以便跨批次精确延续。
+    """
+    frame = _window_frame(df, feature)
+    keys = [f'__key{i}' for i in range(len(group_keys(feature)))]
+    names = window_output_names(feature)
+    if not names:
+        return {}
+        
+    if 'ewm' in feature:
+        param, value = _ewm_parameter(feature)
+        options = {param: value, 'adjust': feature.get('adjust', False)}
+        if feature.get('min_periods') is not None:
+            options['min_periods'] = feature['min_periods']
+        source = frame.groupby(keys, sort=False, dropna=False)['__value'] if keys else frame['__value']
+        window = source.ewm(**options)
+    else:
+        options = {}
+        if feature.get('min_periods') is not None:
+            options['min_periods'] = feature['min_periods']
+        if _is_time_window(feature):
+            options['on'] = '__time'
+            columns = ['__value', '__time']
+            source = frame.groupby(keys, sort=False, dropna=False)[columns] if keys else frame[columns]
+        else:
+            source = frame.groupby(keys, sort=False, dropna=False)['__value'] if keys else frame['__value']
+        window = source.rolling(feature['window'], **options)
+        
+    results = {}
+    for op, name in names.items():
+        result = getattr(window, op)()
+        if isinstance(result, pd.DataFrame):
+            result = result['__value']
+        # 结果索引的最后一层是行在 df 中的位置
+        positions = result.index.get_level_values(-1).to_numpy()
+        values = np.full(len(df), np.nan)
+        values[positions] = result.to_numpy(dtype='float64', na_value=np.nan)
+        results[name] = values
+    return results
+
+
+def window_history(
+    df: pd.DataFrame,
+    feature: Dict[str, Any],
+    smoothed: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """计算下一批数据所需的历史行（只含 window_columns）
+    
+    计数窗口保留每组最后 window-1 行，时间窗口保留每组最近一个窗口跨度内的行；
+    EWMA（adjust=False）只需每组最后一个平滑值，作为下一批的起始观测值，
+    smoothed 为已经算好的 EWMA 均值（与 df 行顺序一致），不传时重新计算。
+    """
+    col = feature['column']
+    keys = group_keys(feature)
+    time_column = feature.get('time_column')
+    history = df[window_columns(feature)]
+    
+    if 'ewm' in feature:
+        if smoothed is None:
+            smoothed = next(iter(compute_window_feature(df, {**feature, 'operations': ['mean']}).values()))
+        history = history.copy()
+        history[col] = smoothed
+    if time_column:
+        history = history.sort_values(keys + [time_column], kind='stable')
+        
+    if 'ewm' in feature:
+        return _group_tail(history, keys, 1)
+    if _is_time_window(feature):
+        times = pd.to_datetime(history[time_column])
+        if keys:
+            latest = times.groupby([history[key] for key in keys], sort=False, dropna=False).transform('max')
+        else:
+            latest = times.max()
+        return history[times > latest - pd.Timedelta(feature['window'])]
+    return _group_tail(history, keys, max(feature['window'] - 1, 0))
+
+
+def validate_incremental(feature: Dict[str, Any]) -> None:
+    """跨批次计算时 EWMA 只能按递推形式（adjust=False，默认）精确延续，且只支持均值"""
+    if 'ewm' not in feature:
+        return
+    if feature.get('adjust', False):
+        raise ValueError(f"Incremental EWM feature on {feature['column']} requires adjust: false")
+    if any(op != 'mean' for op in feature['operations']):
+        raise ValueError(f"Incremental EWM feature on {feature['column']} only supports 'mean'")
+
+
+def dump_history(history: pd.DataFrame) -> Dict[str, Any]:
+    """历史行转换为可JSON序列化的形式"""
+    data = {}
+    for col in history.columns:
+        series = history[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            data[col] = [None if pd.isna(value) else value.isoformat() for value in series]
+        else:
+            data[col] = [None if pd.isna(value) else to_builtin(value) for value in series.astype(object)]
+    return {
+        'columns': list(history.columns),
+        'dtypes': {col: str(dtype) for col, dtype in history.dtypes.items()},
+        'data': data
+    }
+
+
+def load_history(state: Dict[str, Any]) -> pd.DataFrame:
+    history = pd.DataFrame(state['data'], columns=state['columns'])
+    for col, dtype in state['dtypes'].items():
+        try:
+            history[col] = history[col].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return history
+
+
+def _window_frame(df: pd.DataFrame, feature: Dict[str, Any]) -> pd.DataFrame:
+    """以行位置为索引的计算用数据框，设置时间列时按（分组, 时间）稳定排序"""
+    frame = pd.DataFrame({'__value': to_float_array(df[feature['column']])}, index=pd.RangeIndex(len(df)))
+    for i, key in enumerate(group_keys(feature)):
+        frame[f'__key{i}'] = df[key].to_numpy()
+    time_column = feature.get('time_column')
+    if time_column:
+        frame['__time'] = pd.to_datetime(df[time_column]).to_numpy()
+        keys = [f'__key{i}' for i in range(len(group_keys(feature)))]
+        frame = frame.sort_values(keys + ['__time'], kind='stable')
+    return frame
+
+
+def _is_time_window(feature: Dict[str, Any]) -> bool:
+    return isinstance(feature.get('window'), str)
+
+
+def _ewm_parameter(feature: Dict[str, Any]) -> tuple:
+    for param in EWM_PARAMETERS:
+        if param in feature['ewm']:
+            return param, feature['ewm'][param]
+    raise ValueError(f"EWM feature on {feature['column']} needs one of {EWM_PARAMETERS}")
+
+
+def _group_tail(history: pd.DataFrame, keys: List[str], rows: int) -> pd.DataFrame:
+    if rows == 0:
+        return history.iloc[0:0]
+    if not keys:
+        return history.iloc[-rows:]
+    return history.groupby(keys, sort=False, dropna=False).tail(rows)
@@ -0,0 +1,349 @@
+"""PostgreSQL 二进制 COPY 批量导入
+
+行数据按 COPY BINARY 格式逐行编码，通过类文件对象流式交给 COPY ... FROM STDIN，
+不生成中间 CSV，也不需要把全部数据编码后再发送。目标列的类型从系统表读取，
+core_tables.sql 中 experiments、samples、images、analysis_results 用到的类型
+（uuid、varchar/text、枚举、numeric、timestamptz、interval、jsonb、bool、整数、text[]）均已支持。
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import io
+import json
+import logging
+import math
+import struct
+import uuid
+
+import numpy as np
+import pandas as pd
+
+CORE_TABLES = ('experiments', 'samples', 'images', 'analysis_results')
+
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_HEADER = COPY_SIGNATURE + struct.pack('!ii', 0, 0)
+COPY_TRAILER = struct.pack('!h', -1)
+
+# PostgreSQL 时间类型以 2000-01-01 为纪元
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+PG_EPOCH_DATE = date(2000, 1, 1)
+PG_EPOCH_MICROS = 946684800 * 1000000
+
+NUMERIC_POSITIVE = 0x0000
+NUMERIC_NEGATIVE = 0x4000
+NUMERIC_NAN = 0xC000
+
+# 数组元素类型的 OID（数组的二进制格式需要）
+TYPE_OIDS = {
+    'bool': 16, 'int8': 20, 'int2': 21, 'int4': 23, 'text': 25, 'float4': 700, 'float8': 701,
+    'varchar': 1043, 'date': 1082, 'timestamp': 1114, 'timestamptz': 1184, 'interval': 1186,
+    'numeric': 1700, 'uuid': 2950, 'json': 114, 'jsonb': 3802
+}
+
+COLUMN_TYPES_QUERY = """
+    SELECT a.attname, t.typname, t.typtype, e.typname, e.typtype, e.oid
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    LEFT JOIN pg_type e ON e.oid = t.typelem AND t.typcategory = 'A'
+    WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum
+"""
+
+
+def _encode_bool(value: Any) -> bytes:
+    return b'\x01' if value else b'\x00'
+
+
+def _encode_text(value: Any) -> bytes:
+    return str(value).encode('utf-8')
+
+
+def _encode_uuid(value: Any) -> bytes:
+    return (value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))).bytes
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # jsonb 二进制格式为版本号 1 加 JSON 文本；字符串视为已经序列化的 JSON
+    return b'\x01' + _encode_json(value)
+
+
+def _encode_json(value: Any) -> bytes:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text.encode('utf-8')
+
+
+def _timestamp_micros(value: Any) -> int:
+    """距 PostgreSQL 纪元的微秒数；不带时区的时间按 UTC 处理"""
+    if isinstance(value, datetime) and not isinstance(value, pd.Timestamp):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (value - PG_EPOCH) // timedelta(microseconds=1)
+    # pd.Timestamp.value 为距 1970-01-01 UTC 的纳秒数
+    return pd.Timestamp(value).value // 1000 - PG_EPOCH_MICROS
+
+
+def _encode_timestamp(value: Any) -> bytes:
+    return struct.pack('!q', _timestamp_micros(value))
+
+
+def _encode_date(value: Any) -> bytes:
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = pd.Timestamp(value).date()
+    return struct.pack('!i', (value - PG_EPOCH_DATE).days)
+
+
+def _encode_interval(value: Any) -> bytes:
+    """interval 为（微秒, 天, 月）三元组，timedelta 不含月份"""
+    value = pd.Timedelta(value).to_pytimedelta() if not isinstance(value, timedelta) else value
+    microseconds = value.seconds * 1000000 + value.microseconds
+    return struct.pack('!qii', microseconds, value.days, 0)
+
+
+def _encode_numeric(value: Any) -> bytes:
+    """numeric 二进制格式：以 10000 为基数的数字组，weight 为首组的位权"""
+    if not isinstance(value, Decimal):
+        # numpy 标量（可空整数列、float32 等）先转为 Python 数值；
+        # float 经由 str 转换（最短的可往返表示），避免二进制浮点误差带来的多余位数
+        if isinstance(value, np.integer):
+            value = int(value)
+        elif isinstance(value, (float, np.floating)):
+            value = str(float(value))
+        value = Decimal(value)
+    if value.is_nan():
+        return struct.pack('!hhHh', 0, 0, NUMERIC_NAN, 0)
+    if value.is_infinite():
+        raise ValueError(f"Cannot encode {value} as numeric")
+        
+    sign, digits, exponent = value.as_tuple()
+    text = ''.join(map(str, digits))
+    if exponent > 0:
+        text += '0' * exponent
+        exponent = 0
+    scale = -exponent
+    if len(text) < scale:
+        text = '0' * (scale - len(text)) + text
+    integer, fraction = text[:len(text) - scale], text[len(text) - scale:]
+    integer = integer.zfill((len(integer) + 3) // 4 * 4)
+    fraction = fraction.ljust((len(fraction) + 3) // 4 * 4, '0')
+    
+    groups = [int(integer[i:i + 4]) for i in range(0, len(integer), 4)]
+    weight = len(groups) - 1
+    groups += [int(fraction[i:i + 4]) for i in range(0, len(fraction), 4)]
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+    return struct.pack(
+        f'!hhHh{len(groups)}H',
+        len(groups), weight, NUMERIC_NEGATIVE if sign else NUMERIC_POSITIVE, scale, *groups
+    )
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    'bool': _encode_bool,
+    'int2': lambda value: struct.pack('!h', int(value)),
+    'int4': lambda value: struct.pack('!i', int(value)),
+    'int8': lambda value: struct.pack('!q', int(value)),
+    'float4': lambda value: struct.pack('!f', float(value)),
+    'float8': lambda value: struct.pack('!d', float(value)),
+    'numeric': _encode_numeric,
+    'text': _encode_text,
+    'varchar': _encode_text,
+    'bpchar': _encode_text,
+    'name': _encode_text,
+    # 枚举的二进制输入就是标签文本
+    'enum': _encode_text,
+    'uuid': _encode_uuid,
+    'json': _encode_json,
+    'jsonb': _encode_jsonb,
+    'timestamptz': _encode_timestamp,
+    'timestamp': _encode_timestamp,
+    'date': _encode_date,
+    'interval': _encode_interval
+}
+
+
+def array_encoder(element_type: str, oid: Optional[int] = None) -> Callable[[Any], bytes]:
+    """一维数组的二进制编码：维数、是否含空值、元素 OID、长度与下界，然后是各元素
+    
+    服务器会校验元素 OID，枚举数组等非内置元素类型需要传入从系统表读取的 oid。
+    """
+    encode = ENCODERS[element_type]
+    oid = oid or TYPE_OIDS[element_type]
+    
+    def encode_array(values: Any) -> bytes:
+        values = list(values)
+        if not values:
+            return struct.pack('!iii', 0, 0, oid)
+        has_null = any(_is_missing(value) for value in values)
+        parts = [struct.pack('!iiiii', 1, int(has_null), oid, len(values), 1)]
+        for value in values:
+            if _is_missing(value):
+                parts.append(struct.pack('!i', -1))
+            else:
+                data = encode(value)
+                parts.append(struct.pack('!i', len(data)))
+                parts.append(data)
+        return b''.join(parts)
+    return encode_array
+
+
+def column_encoder(type_name: str, element_oid: Optional[int] = None) -> Callable[[Any], bytes]:
+    """按类型名（pg_type.typname，枚举为 'enum'，数组为 'text[]' 这样的形式）取编码函数"""
+    if type_name.endswith('[]'):
+        return array_encoder(type_name[:-2], element_oid)
+    if type_name not in ENCODERS:
+        raise ValueError(f"Binary COPY does not support column type {type_name}")
+    return ENCODERS[type_name]
+
+
+def encode_rows(
+    rows: Iterable[Sequence[Any]],
+    types: Sequence[str],
+    batch_bytes: int = 1 << 20,
+    element_oids: Optional[Sequence[Optional[int]]] = None
+) -> Iterator[bytes]:
+    """将行编码为 COPY BINARY 数据流，每次产生约 batch_bytes 字节"""
+    element_oids = element_oids or [None] * len(types)
+    encoders = [column_encoder(type_name, oid) for type_name, oid in zip(types, element_oids)]
+    field_count = struct.pack('!h', len(encoders))
+    length = struct.Struct('!i')
+    null = length.pack(-1)
+    
+    parts = [COPY_HEADER]
+    size = len(COPY_HEADER)
+    for row in rows:
+        parts.append(field_count)
+        for encode, value in zip(encoders, row):
+            if _is_missing(value):
+                parts.append(null)
+                size += 4
+            else:
+                data = encode(value)
+                parts.append(length.pack(len(data)))
+                parts.append(data)
+                size += 4 + len(data)
+        size += 2
+        if size >= batch_bytes:
+            yield b''.join(parts)
+            parts, size = [], 0
+    parts.append(COPY_TRAILER)
+    yield b''.join(parts)
+
+
+class CopyStream(io.RawIOBase):
+    """把编码后的数据块包装为只读文件对象，供 cursor.copy_expert 按需读取"""
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self.bytes_read = 0
+        
+    def readable(self) -> bool:
+        return True
+        
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._buffer + b''.join(self._chunks)
+            self._buffer = b''
+        else:
+            while len(self._buffer) < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.bytes_read += len(data)
+        return data
+        
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def rows_from_frame(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Iterator[Tuple[Any, ...]]:
+    """按行迭代数据框，缺失值（NaN/NaT/None/pd.NA）统一为 None"""
+    columns = list(df.columns) if columns is None else columns
+    for row in df[columns].itertuples(index=False, name=None):
+        yield tuple(None if _is_missing(value) else value for value in row)
+
+
+def _is_missing(value: Any) -> bool:
+    if value is None or value is pd.NaT or value is pd.NA:
+        return True
+    if isinstance(value, (float, np.floating)):
+        return math.isnan(value)
+    return False
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_table(table: str) -> str:
+    return '.'.join(_quote_identifier(part) for part in table.split('.'))
+
+
+class BulkLoader:
+    """二进制 COPY 批量导入
+    
+    connection 为 PostgreSQLConnection（从连接池取连接并在成功后提交），
+    rows 可以是任意行迭代器（元组/列表，顺序与 columns 一致），数据框使用 copy_frame。
+    """
+    
+    def __init__(self, connection: Any, batch_bytes: int = 1 << 20):
+        self.connection = connection
+        self.batch_bytes = batch_bytes
+        self.logger = logging.getLogger(__name__)
+        self._column_types: Dict[str, Dict[str, str]] = {}
+        self._element_oids: Dict[str, Dict[str, int]] = {}
+        
+    def column_types(self, table: str, conn: Any = None) -> Dict[str, str]:
+        """从系统表读取列类型（结果按表缓存）"""
+        if table not in self._column_types:
+            if conn is None:
+                with self.connection.connection() as conn:
+                    return self.column_types(table, conn)
+            with conn.cursor() as cur:
+                cur.execute(COLUMN_TYPES_QUERY, (table,))
+                types, element_oids = {}, {}
+                for column, type_name, kind, element, element_kind, element_oid in cur.fetchall():
+                    if element is not None:
+                        types[column] = ('enum' if element_kind == 'e' else element) + '[]'
+                        element_oids[column] = element_oid
+                    else:
+                        types[column] = 'enum' if kind == 'e' else type_name
+            self._column_types[table] = types
+            self._element_oids[table] = element_oids
+        return self._column_types[table]
+        
+    def copy_rows(self, table: str, rows: Iterable[Sequence[Any]], columns: List[str]) -> int:
+        """流式导入行，返回导入的行数；未列出的列使用表定义的默认值（如 uuid_generate_v4()）"""
+        with self.connection.connection() as conn:
+            types = self.column_types(table, conn)
+            unknown = [column for column in columns if column not in types]
+            if unknown:
+                raise ValueError(f"Columns not in {table}: {', '.join(unknown)}")
+            element_oids = [self._element_oids[table].get(column) for column in columns]
+            stream = CopyStream(encode_rows(
+                rows, [types[column] for column in columns], self.batch_bytes, element_oids
+            ))
+            query = (
+                f"COPY {_quote_table(table)} ({', '.join(_quote_identifier(column) for column in columns)}) "
+                f"FROM STDIN WITH (FORMAT binary)"
+            )
+            with conn.cursor() as cur:
+                cur.copy_expert(query, stream, size=self.batch_bytes)
+                count = cur.rowcount
+        self.logger.info(f"Copied {count} rows into {table} ({stream.bytes_read / 1024 ** 2:.1f} MiB)")
+        return count
+        
+    def copy_frame(self, table: str, df: pd.DataFrame, columns: Optional[List[str]] = None) -> int:
+        columns = list(df.columns) if columns is None else columns
+        return self.copy_rows(table, rows_from_frame(df, columns), columns)
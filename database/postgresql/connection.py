@@ -0,0 +1,276 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from collections import OrderedDict
+import contextlib
+import hashlib
+import logging
+import re
+import weakref
+
+from psycopg2.pool import ThreadedConnectionPool
+
+import pandas as pd
+
+from .bulk_load import BulkLoader, rows_from_frame
+
+# psycopg2 的位置参数占位符；%% 为转义的百分号
+PLACEHOLDER = re.compile(r'%%|%s')
+
+# 只有这些语句可以 PREPARE，DDL 等其余语句直接执行
+PREPARABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|VALUES|WITH)\b', re.IGNORECASE)
+
+
+def to_server_placeholders(query: str) -> Optional[str]:
+    """将 %s 占位符改写为 PREPARE 使用的 $1, $2 ...；含命名参数 %(name)s 时返回 None"""
+    if '%(' in query:
+        return None
+    counter = iter(range(1, query.count('%s') + 1))
+    return PLACEHOLDER.sub(lambda match: '%' if match.group() == '%%' else f'${next(counter)}', query)
+
+
+class StatementCache:
+    """单个连接上的服务端预编译语句缓存（LRU）
+    
+    预编译语句只在创建它的会话内有效，因此每个连接各有一个缓存；
+    超出容量时 DEALLOCATE 最久未使用的语句。
+    """
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.statements: 'OrderedDict[str, str]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def prepare(self, cursor: Any, query: str, server_query: str) -> str:
+        """返回语句名，缓存中没有时先 PREPARE"""
+        name = self.statements.get(query)
+        if name is not None:
+            self.statements.move_to_end(query)
+            self.hits += 1
+            return name
+            
+        self.misses += 1
+        name = 'stmt_' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+        cursor.execute(f"PREPARE {name} AS {server_query}")
+        self.statements[query] = name
+        if len(self.statements) > self.capacity:
+            _, evicted = self.statements.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+        return name
+
+
+class PostgreSQLConnection:
+    """PostgreSQL 连接池（psycopg2，线程安全）
+    
+    - connection() 从连接池借出连接，正常退出时提交、异常时回滚，最后归还
+    - execute/fetch_all 默认使用每个连接上的预编译语句缓存，重复执行的查询只解析和规划一次
+    - copy_rows/copy_frame 使用二进制 COPY 批量导入（见 bulk_load.py）
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.pool = None
+        self.logger = logging.getLogger(__name__)
+        self.statement_cache_size = config.get('statement_cache_size', 100)
+        # 以连接对象本身为键：连接池关闭多余的连接后，新连接可能复用同一个 id()，
+        # 按 id 记录会把旧会话的语句当作已预编译；连接被回收时其缓存随之删除
+        self._statement_caches: 'weakref.WeakKeyDictionary[Any, StatementCache]' = weakref.WeakKeyDictionary()
+        self._bulk_loader = None
+        
+    def connect(self) -> None:
+        self.pool = ThreadedConnectionPool(
+            self.config.get('min_connections', 1),
+            self.config.get('max_connections', 10),
+            **_connect_options(self.config)
+        )
+        
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+        self._statement_caches = weakref.WeakKeyDictionary()
+        
+    def __enter__(self) -> 'PostgreSQLConnection':
+        if self.pool is None:
+            self.connect()
+        return self
+        
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+        
+    @contextlib.contextmanager
+    def connection(self):
+        """借出一个连接（事务在退出时提交或回滚）"""
+        if self.pool is None:
+            self.connect()
+        conn = self.pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # 已断开的连接不再放回池中，连同其语句缓存一起丢弃
+            if conn.closed:
+                self._statement_caches.pop(conn, None)
+            self.pool.putconn(conn, close=bool(conn.closed))
+            
+    @contextlib.contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+                
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None, prepared: bool = True) -> int:
+        """执行语句，返回影响的行数"""
+        with self.cursor() as cur:
+            self.execute_with(cur, query, params, prepared)
+            return cur.rowcount
+            
+    def fetch_all(self, query: str, params: Optional[Sequence[Any]] = None, prepared: bool = True) -> List[tuple]:
+        with self.cursor() as cur:
+            self.execute_with(cur, query, params, prepared)
+            return cur.fetchall()
+            
+    def fetch_frame(self, query: str, params: Optional[Sequence[Any]] = None, prepared: bool = True) -> pd.DataFrame:
+        with self.cursor() as cur:
+            self.execute_with(cur, query, params, prepared)
+            columns = [column.name for column in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=columns)
+            
+    def statement_cache_stats(self) -> Dict[str, int]:
+        caches = list(self._statement_caches.values())
+        return {
+            'connections': len(caches),
+            'statements': sum(len(cache.statements) for cache in caches),
+            'hits': sum(cache.hits for cache in caches),
+            'misses': sum(cache.misses for cache in caches)
+        }
+        
+    @property
+    def bulk_loader(self) -> BulkLoader:
+        if self._bulk_loader is None:
+            self._bulk_loader = BulkLoader(self, self.config.get('copy_batch_bytes', 1 << 20))
+        return self._bulk_loader
+        
+    def copy_rows(self, table: str, rows: Iterable[Sequence[Any]], columns: List[str]) -> int:
+        """二进制 COPY 导入行迭代器"""
+        return self.bulk_loader.copy_rows(table, rows, columns)
+        
+    def copy_frame(self, table: str, df: pd.DataFrame, columns: Optional[List[str]] = None) -> int:
+        """二进制 COPY 导入数据框"""
+        return self.bulk_loader.copy_frame(table, df, columns)
+        
+    def execute_with(
+        self,
+        cur: Any,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        prepared: bool = True
+    ) -> None:
+        """在已借出的游标上执行语句（多条语句共用一个事务时使用）"""
+        server_query = to_server_placeholders(query) if prepared and PREPARABLE.match(query) else None
+        if server_query is None or isinstance(params, dict):
+            cur.execute(query, params)
+            return
+        cache = self._statement_caches.get(cur.connection)
+        if cache is None:
+            cache = self._statement_caches[cur.connection] = StatementCache(self.statement_cache_size)
+        name = cache.prepare(cur, query, server_query)
+        params = list(params or [])
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+
+class AsyncPostgreSQLConnection:
+    """asyncio 连接池（asyncpg）
+    
+    asyncpg 在每个连接上自动缓存预编译语句（statement_cache_size），查询使用 $1, $2 占位符；
+    copy_rows/copy_frame 使用 asyncpg 的二进制 COPY。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.pool = None
+        self.logger = logging.getLogger(__name__)
+        
+    async def connect(self) -> None:
+        try:
+            import asyncpg
+        except ImportError as e:
+            raise ImportError("AsyncPostgreSQLConnection requires asyncpg (pip install asyncpg)") from e
+            
+        options = _connect_options(self.config)
+        self.pool = await asyncpg.create_pool(
+            host=options.get('host'),
+            port=options.get('port'),
+            database=options.get('dbname'),
+            user=options.get('user'),
+            password=options.get('password'),
+            dsn=options.get('dsn'),
+            min_size=self.config.get('min_connections', 1),
+            max_size=self.config.get('max_connections', 10),
+            statement_cache_size=self.config.get('statement_cache_size', 100)
+        )
+        
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            
+    async def __aenter__(self) -> 'AsyncPostgreSQLConnection':
+        if self.pool is None:
+            await self.connect()
+        return self
+        
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+        
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        """借出一个连接并开启事务"""
+        if self.pool is None:
+            await self.connect()
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+                
+    async def execute(self, query: str, *params: Any) -> str:
+        async with self.connection() as conn:
+            return await conn.execute(query, *params)
+            
+    async def fetch_all(self, query: str, *params: Any) -> List[Any]:
+        async with self.connection() as conn:
+            return await conn.fetch(query, *params)
+            
+    async def copy_rows(self, table: str, rows: Iterable[Sequence[Any]], columns: List[str]) -> int:
+        """二进制 COPY 导入行（可以是同步或异步迭代器），返回导入的行数"""
+        schema, _, name = table.rpartition('.')
+        async with self.connection() as conn:
+            status = await conn.copy_records_to_table(
+                name, records=rows, columns=columns, schema_name=schema or None
+            )
+        # 返回的状态形如 'COPY 1000'
+        return int(status.split()[-1])
+        
+    async def copy_frame(self, table: str, df: pd.DataFrame, columns: Optional[List[str]] = None) -> int:
+        columns = list(df.columns) if columns is None else columns
+        return await self.copy_rows(table, rows_from_frame(df, columns), columns)
+
+
+def _connect_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """连接参数：dsn 或 host/port/database/user/password（与 database.yml 的 postgresql 段一致）"""
+    if config.get('dsn'):
+        return {'dsn': config['dsn']}
+    options = {
+        'host': config.get('host', 'localhost'),
+        'port': config.get('port', 5432),
+        'dbname': config.get('database'),
+        'user': config.get('user'),
+        'password': config.get('password')
+    }
+    if config.get('connect_timeout'):
+        options['connect_timeout'] = config['connect_timeout']
+    return {key: value for key, value in options.items() if value is not None}
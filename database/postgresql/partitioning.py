@@ -0,0 +1,179 @@
+"""按键或时间范围把一个查询拆分为多个可以并行执行的分区
+
+分区边界优先取自 pg_stats 的直方图（等频分桶，各分区行数接近）；没有统计信息时
+按 min/max 均匀切分（数值、时间、UUID）。第一个分区向下开放并包含 NULL，最后一个分区向上开放，
+因此统计信息过时也不会漏行。
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+import re
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from psycopg2 import sql
+
+from .connection import PostgreSQLConnection
+
+logger = logging.getLogger(__name__)
+
+# 可以按 min/max 均匀切分的类型
+NUMERIC_TYPES = re.compile(r'^(smallint|integer|bigint|numeric|real|double precision|date|timestamp|uuid)')
+TABLE_IN_QUERY = re.compile(r'\bFROM\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)', re.IGNORECASE)
+# 按分区分别执行后结果不同的子句（行数、顺序、分组、去重、集合运算、窗口）
+NOT_PARTITIONABLE = re.compile(
+    r'\b(LIMIT|OFFSET|FETCH|ORDER\s+BY|GROUP\s+BY|HAVING|DISTINCT|UNION|INTERSECT|EXCEPT|OVER|WINDOW)\b',
+    re.IGNORECASE
+)
+AGGREGATE_CALL = re.compile(
+    r'\b(count|sum|avg|min|max|array_agg|string_agg|json_agg|jsonb_agg|json_object_agg|jsonb_object_agg|'
+    r'bool_and|bool_or|every|bit_and|bit_or|stddev\w*|variance|var_\w+|percentile_\w+|mode)\s*\(',
+    re.IGNORECASE
+)
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+SELECT_LIST = re.compile(r'^\s*SELECT\s+(.*?)\s+FROM\b', re.IGNORECASE | re.DOTALL)
+
+Range = Tuple[Optional[Any], Optional[Any]]
+
+
+def table_from_query(query: str) -> Optional[str]:
+    """从简单查询（SELECT ... FROM 表）中取出表名"""
+    match = TABLE_IN_QUERY.search(query)
+    return match.group(1) if match else None
+
+
+def check_partitionable(query: str, column: str) -> None:
+    """检查查询可以按 column 的范围拆分：拼接各分区的结果必须等于原查询的结果
+    
+    只支持 SELECT 列 FROM 表 [JOIN ...] [WHERE ...] 形式的行级查询，且结果中原样包含 column（不能是别名）；
+    含 LIMIT/ORDER BY/GROUP BY/聚合/DISTINCT/集合运算/窗口函数时抛出 ValueError。
+    """
+    text = STRING_LITERAL.sub("''", query)
+    match = NOT_PARTITIONABLE.search(text) or AGGREGATE_CALL.search(text)
+    if match:
+        raise ValueError(
+            f"Query cannot be split into partitions because of {match.group(1).upper()}: "
+            "each partition would be limited, ordered, grouped or deduplicated separately"
+        )
+    select_list = SELECT_LIST.match(text)
+    if select_list is None:
+        raise ValueError("Only SELECT ... FROM queries can be split into partitions")
+    identifier = r'"?' + re.escape(column) + r'"?'
+    selected = any(
+        item == '*' or item.endswith('.*')
+        or re.fullmatch(r'(?:(?:"[^"]+"|\w+)\.)?' + identifier, item, re.IGNORECASE)
+        for item in (part.strip() for part in select_list.group(1).split(','))
+    )
+    if not selected:
+        raise ValueError(f"Partition column {column} must be in the query's select list")
+
+
+def plan_ranges(db: PostgreSQLConnection, table: str, column: str, partitions: int) -> List[Range]:
+    """返回 partitions 个左闭右开的范围 [(None, b1), (b1, b2), ..., (bn, None)]
+    
+    table 按 SQL 书写（可带 schema 与双引号）。
+    """
+    if partitions <= 1:
+        return [(None, None)]
+    schema, _, name = table.replace('"', '').rpartition('.')
+    column_type = _column_type(db, table, column)
+    bounds = _histogram_bounds(db, schema or 'public', name, column, column_type)
+    if bounds and len(bounds) > 2:
+        # 直方图的相邻边界之间行数相同，按分位取边界
+        step = (len(bounds) - 1) / partitions
+        boundaries = [bounds[round(i * step)] for i in range(1, partitions)]
+    else:
+        boundaries = _even_boundaries(db, table, column, column_type, partitions)
+        if boundaries is None:
+            logger.warning(f"Cannot split {table}.{column} ({column_type}) without statistics, using one partition")
+            return [(None, None)]
+    boundaries = list(dict.fromkeys(boundaries))
+    return list(zip([None] + boundaries, boundaries + [None]))
+
+
+def partition_queries(query: str, column: str, ranges: Sequence[Range]) -> List[Tuple[sql.Composed, List[Any]]]:
+    """把原查询包装为每个范围一条查询（简单子查询上的条件会被下推到表扫描）
+    
+    查询需要先通过 check_partitionable。
+    """
+    identifier = sql.Identifier(column)
+    queries = []
+    for lower, upper in ranges:
+        conditions, params = [], []
+        if lower is not None:
+            conditions.append(sql.SQL("{} >= %s").format(identifier))
+            params.append(lower)
+        if upper is not None:
+            conditions.append(sql.SQL("{} < %s").format(identifier))
+            params.append(upper)
+        where = sql.SQL(' AND ').join(conditions) if conditions else sql.SQL('TRUE')
+        if lower is None:
+            where = sql.SQL("({}) OR {} IS NULL").format(where, identifier)
+        queries.append((
+            sql.SQL("SELECT * FROM ({}) AS partition_source WHERE {}").format(sql.SQL(query.rstrip().rstrip(';')), where),
+            params
+        ))
+    return queries
+
+
+def _column_type(db: PostgreSQLConnection, table: str, column: str) -> str:
+    rows = db.fetch_all(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attname = %s AND NOT attisdropped",
+        [table, column],
+        prepared=False
+    )
+    if not rows:
+        raise ValueError(f"Column {column} not found in {table}")
+    return rows[0][0]
+
+
+def _histogram_bounds(
+    db: PostgreSQLConnection,
+    schema: str,
+    table: str,
+    column: str,
+    column_type: str
+) -> Optional[List[Any]]:
+    # histogram_bounds 是 anyarray：先按列类型解析以确保顺序正确，再以文本返回，
+    # 作为参数传回时由服务器转换为列类型（psycopg2 不能解析所有类型的数组）
+    query = sql.SQL(
+        "SELECT histogram_bounds::text::{}[]::text[] FROM pg_stats "
+        "WHERE schemaname = %s AND tablename = %s AND attname = %s"
+    ).format(sql.SQL(column_type))
+    with db.cursor() as cur:
+        cur.execute(query, [schema, table, column])
+        row = cur.fetchone()
+    return row[0] if row and row[0] else None
+
+
+def _even_boundaries(
+    db: PostgreSQLConnection,
+    table: str,
+    column: str,
+    column_type: str,
+    partitions: int
+) -> Optional[List[Any]]:
+    if not NUMERIC_TYPES.match(column_type):
+        return None
+    if column_type == 'uuid':
+        # 随机 UUID 在 128 位空间中均匀分布
+        return [str(uuid.UUID(int=(i << 128) // partitions)) for i in range(1, partitions)]
+    identifier = sql.Identifier(column)
+    query = sql.SQL("SELECT min({}), max({}) FROM {}").format(identifier, identifier, sql.SQL(table))
+    with db.cursor() as cur:
+        cur.execute(query)
+        low, high = cur.fetchone()
+    if low is None or low == high:
+        return None
+    return [_interpolate(low, high, i / partitions) for i in range(1, partitions)]
+
+
+def _interpolate(low: Any, high: Any, fraction: float) -> Any:
+    if isinstance(low, (datetime, date)):
+        return low + timedelta(seconds=(high - low).total_seconds() * fraction)
+    if isinstance(low, int):
+        return low + int((high - low) * fraction)
+    if isinstance(low, Decimal):
+        return low + (high - low) * Decimal(str(fraction))
+    return low + (high - low) * fraction
@@ -0,0 +1,173 @@
+from typing import Dict, Any, List, Optional, AsyncIterator, Iterator, Sequence
+import asyncio
+import uuid
+
+import pandas as pd
+from psycopg2 import sql
+
+from database.postgresql.connection import PostgreSQLConnection
+from .base_extractor import BaseExtractor
+
+EXTRACTION_MODES = ('cursor', 'keyset')
+
+
+class PostgresExtractor(BaseExtractor):
+    """PostgreSQL 流式提取器，按块产生只含所需列的数据框
+    
+    两种模式：
+    - cursor: 命名（服务端）游标，在一个事务内按 chunk_size 逐块拉取，客户端只保留一块
+    - keyset: 按索引列（如 created_at, 主键）分页，WHERE (键) > (上一页最后的键) ORDER BY 键 LIMIT n，
+      每页是独立的短查询，不占用长事务，last_key 记录进度，可以从中断处继续（start_after）。
+      键列需要有索引且不为 NULL（行比较会跳过含 NULL 的行）。
+      
+    配置项：table、columns（省略时为全部列）、where/where_params（额外过滤条件，使用 %s 占位符）、
+    mode（默认 cursor）、keyset_columns、chunk_size（默认 batch_size 或 5000）、
+    connection（PostgreSQLConnection 的连接参数）。
+    """
+    
+    def __init__(self, config: Dict[str, Any], connection: Optional[PostgreSQLConnection] = None):
+        super().__init__(config)
+        self.connection = connection or PostgreSQLConnection(config.get('connection', {}))
+        self.chunk_size = config.get('chunk_size', config.get('batch_size', 5000))
+        self.last_key: Optional[tuple] = None
+        
+    async def extract(self, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """提取全部记录（会把结果全部放入内存，大表请使用 extract_chunks）"""
+        records = []
+        async for chunk in self.extract_chunks(params):
+            records.extend(chunk.to_dict('records'))
+        return records
+        
+    async def extract_batches(self, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按块产生记录列表，可直接作为 BasePipeline.extract_batches 或 BaseLoader.load_batches 的来源"""
+        async for chunk in self.extract_chunks(params):
+            yield chunk.to_dict('records')
+            
+    async def extract_chunks(self, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[pd.DataFrame]:
+        """按块产生数据框；数据库读取在线程中执行，不阻塞事件循环
+        
+        params 可以覆盖配置中的 columns、where、where_params、chunk_size，keyset 模式还可以指定 start_after。
+        """
+        chunks = None
+        try:
+            await self._validate_params(params)
+            chunks = self._iter_chunks({**self.config, **(params or {})})
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        except Exception as e:
+            await self._handle_extraction_error(e)
+        finally:
+            # 调用方提前停止迭代时也要关闭游标并归还连接
+            if chunks is not None:
+                await asyncio.to_thread(chunks.close)
+                
+    async def validate_source(self) -> bool:
+        """检查表存在且包含所需的列"""
+        available = set(await self.column_names())
+        required = list(self.config.get('columns') or []) + list(self.config.get('keyset_columns') or [])
+        missing = [column for column in required if column not in available]
+        if missing:
+            self.logger.error(f"Columns not found in {self.config['table']}: {', '.join(missing)}")
+        return not missing
+        
+    async def column_names(self) -> List[str]:
+        """表的全部列名（不读取数据）"""
+        def fetch() -> List[str]:
+            with self.connection.cursor() as cur:
+                cur.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(_table(self.config['table'])))
+                return [column.name for column in cur.description]
+        return await asyncio.to_thread(fetch)
+        
+    async def _validate_params(self, params: Optional[Dict[str, Any]]) -> bool:
+        options = {**self.config, **(params or {})}
+        if not options.get('table'):
+            raise ValueError("PostgresExtractor requires 'table'")
+        mode = options.get('mode', 'cursor')
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode: {mode}")
+        if mode == 'keyset' and not options.get('keyset_columns'):
+            raise ValueError("Keyset extraction requires 'keyset_columns'")
+        return True
+        
+    def _iter_chunks(self, options: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        if options.get('mode', 'cursor') == 'keyset':
+            return self._iter_keyset(options)
+        return self._iter_cursor(options)
+        
+    def _iter_cursor(self, options: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """命名游标：服务端保存结果集，每次 fetchmany 只传输一块"""
+        chunk_size = options.get('chunk_size', self.chunk_size)
+        query = sql.SQL("SELECT {} FROM {}{}").format(
+            _projection(options.get('columns')),
+            _table(options['table']),
+            _where(options.get('where'))
+        )
+        with self.connection.connection() as conn:
+            with conn.cursor(name=f"extract_{uuid.uuid4().hex[:12]}") as cur:
+                cur.itersize = chunk_size
+                cur.execute(query, options.get('where_params'))
+                total = 0
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    yield pd.DataFrame.from_records(rows, columns=[column.name for column in cur.description])
+        self.logger.info(f"Extracted {total} rows from {options['table']} with a server-side cursor")
+        
+    def _iter_keyset(self, options: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """键集分页：每页按键排序取 chunk_size 行，下一页从上一页最后一行的键之后开始"""
+        chunk_size = options.get('chunk_size', self.chunk_size)
+        keys = list(options['keyset_columns'])
+        columns = options.get('columns')
+        # 键列必须出现在结果中才能记录进度，未请求的键列在产出前去掉
+        selected = None if not columns else list(dict.fromkeys(list(columns) + keys))
+        key_list = sql.SQL(', ').join(sql.Identifier(key) for key in keys)
+        base_query = sql.SQL("SELECT {} FROM {}").format(_projection(selected), _table(options['table']))
+        order = sql.SQL(" ORDER BY {} LIMIT %s").format(key_list)
+        after = sql.SQL("({}) > ({})").format(key_list, sql.SQL(', ').join([sql.Placeholder()] * len(keys)))
+        
+        self.last_key = tuple(options['start_after']) if options.get('start_after') else None
+        total = 0
+        while True:
+            conditions, params = [], []
+            if options.get('where'):
+                conditions.append(sql.SQL('(') + sql.SQL(options['where']) + sql.SQL(')'))
+                params.extend(options.get('where_params') or [])
+            if self.last_key is not None:
+                conditions.append(after)
+                params.extend(self.last_key)
+            where = sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions) if conditions else sql.SQL('')
+            with self.connection.cursor() as cur:
+                cur.execute(base_query + where + order, params + [chunk_size])
+                rows = cur.fetchall()
+                names = [column.name for column in cur.description]
+            if not rows:
+                break
+            # 直接使用驱动返回的原始值作为下一页的参数
+            self.last_key = tuple(rows[-1][names.index(key)] for key in keys)
+            chunk = pd.DataFrame.from_records(rows, columns=names)
+            total += len(chunk)
+            if columns:
+                chunk = chunk[list(columns)]
+            yield chunk
+            if len(rows) < chunk_size:
+                break
+        self.logger.info(f"Extracted {total} rows from {options['table']} with keyset pagination on {', '.join(keys)}")
+
+
+def _table(table: str) -> sql.Composable:
+    return sql.SQL('.').join(sql.Identifier(part) for part in table.split('.'))
+
+
+def _projection(columns: Optional[Sequence[str]]) -> sql.Composable:
+    if not columns:
+        return sql.SQL('*')
+    return sql.SQL(', ').join(sql.Identifier(column) for column in columns)
+
+
+def _where(condition: Optional[str]) -> sql.Composable:
+    return sql.SQL(' WHERE ') + sql.SQL(condition) if condition else sql.SQL('')
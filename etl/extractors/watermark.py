@@ -0,0 +1,228 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import datetime, timezone
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class WatermarkStore(ABC):
+    """增量提取的高水位状态存储，每个数据源一条 JSON 状态"""
+    
+    @abstractmethod
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """读取数据源的状态，没有时返回 None"""
+        pass
+        
+    @abstractmethod
+    def set(self, source: str, state: Dict[str, Any]) -> None:
+        """保存数据源的状态"""
+        pass
+        
+    @abstractmethod
+    def delete(self, source: str) -> None:
+        """删除数据源的状态"""
+        pass
+
+
+class JSONWatermarkStore(WatermarkStore):
+    """单个 JSON 文件保存所有数据源的状态，写入时先写临时文件再原子替换"""
+    
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(source)
+        
+    def set(self, source: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            states = self._read()
+            states[source] = state
+            self._write(states)
+            
+    def delete(self, source: str) -> None:
+        with self._lock:
+            states = self._read()
+            if states.pop(source, None) is not None:
+                self._write(states)
+                
+    def _read(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+            
+    def _write(self, states: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(states, f, indent=2, default=str)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+class SQLiteWatermarkStore(WatermarkStore):
+    """SQLite 保存状态，适合多个任务同时更新不同数据源的场景"""
+    
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self.logger = logging.getLogger(__name__)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS watermarks (source TEXT PRIMARY KEY, state TEXT NOT NULL)")
+            
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM watermarks WHERE source = ?", (source,)).fetchone()
+        return json.loads(row[0]) if row else None
+        
+    def set(self, source: str, state: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO watermarks (source, state) VALUES (?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET state = excluded.state",
+                (source, json.dumps(state, default=str))
+            )
+            
+    def delete(self, source: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM watermarks WHERE source = ?", (source,))
+            
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # 每次操作使用新连接，可以在不同线程中调用；正常结束时提交
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def watermark_store(path: str) -> WatermarkStore:
+    """按文件后缀选择存储：.db/.sqlite/.sqlite3 使用 SQLite，其余使用 JSON"""
+    if os.fspath(path).lower().endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteWatermarkStore(path)
+    return JSONWatermarkStore(path)
+
+
+class WatermarkTracker:
+    """单次增量运行中的水位推进与主键去重
+    
+    下一次运行从 watermark - overlap 开始提取，重新读到重叠窗口内的行，
+    用来补上提交较晚、updated_at 早于上次水位的行。state['recent'] 记录上次运行中落在
+    重叠窗口内的行（主键 + updated_at），本次再次读到且 updated_at 没有变化的行被丢弃。
+    
+    时间统一换算为 UTC 后保存和比较：timestamptz 在有夏令时的会话时区下，同一块中的
+    UTC 偏移可能不同；不带时区的列（state['naive']）按 UTC 处理。
+    """
+    
+    def __init__(
+        self,
+        state: Optional[Dict[str, Any]],
+        watermark_column: str,
+        primary_key: List[str],
+        overlap: Any = 0
+    ):
+        state = state or {}
+        self.watermark_column = watermark_column
+        self.primary_key = list(primary_key)
+        self.overlap = parse_overlap(overlap)
+        self.previous = _to_utc(state['watermark']) if state.get('watermark') else None
+        # 旧状态中没有 naive 字段时按水位字符串是否带偏移判断
+        self.naive = state.get('naive', self.previous is not None and pd.Timestamp(state['watermark']).tz is None)
+        self.watermark = self.previous
+        self.seen = {tuple(entry[:-1]): _to_utc(entry[-1]) for entry in state.get('recent', [])}
+        self.recent: Dict[tuple, pd.Timestamp] = dict(self.seen)
+        self.rows = 0
+        self.duplicates = 0
+        
+    @property
+    def low(self) -> Optional[pd.Timestamp]:
+        """本次提取的下界（含，UTC），首次运行为 None 表示全量"""
+        return None if self.previous is None else self.previous - self.overlap
+        
+    def query_bound(self) -> Optional[datetime]:
+        """作为查询参数的下界：timestamptz 列为带时区的 UTC 时间，不带时区的列为 UTC 本地时间"""
+        low = self.low
+        if low is None:
+            return None
+        return (low.tz_localize(None) if self.naive else low).to_pydatetime()
+        
+    def filter(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """去掉上次已经提取过的行，并推进水位（chunk 需按 updated_at 升序）"""
+        if chunk.empty:
+            return chunk
+        values = chunk[self.watermark_column]
+        timestamps = pd.to_datetime(values, utc=True)
+        self.naive = not _is_tz_aware(values)
+        keys = list(zip(*(chunk[column].astype(str) for column in self.primary_key)))
+        
+        keep = np.ones(len(chunk), dtype=bool)
+        if self.seen and self.previous is not None:
+            # 只有不晚于上次水位的行可能重复
+            for i in np.flatnonzero((timestamps <= self.previous).to_numpy()):
+                seen = self.seen.get(keys[i])
+                if seen is not None and seen >= timestamps.iloc[i]:
+                    keep[i] = False
+        self.duplicates += int((~keep).sum())
+        
+        chunk_max = timestamps.max()
+        if self.watermark is None or chunk_max > self.watermark:
+            self.watermark = chunk_max
+        cutoff = self.watermark - self.overlap
+        for i in np.flatnonzero((timestamps >= cutoff).to_numpy()):
+            self.recent[keys[i]] = max(timestamps.iloc[i], self.recent.get(keys[i], timestamps.iloc[i]))
+        # 水位前进后，窗口外的记录不再需要
+        self.recent = {key: value for key, value in self.recent.items() if value >= cutoff}
+        
+        self.rows += int(keep.sum())
+        return chunk[keep] if not keep.all() else chunk
+        
+    def state(self) -> Dict[str, Any]:
+        """本次运行结束后应保存的状态"""
+        return {
+            'watermark': self.watermark.isoformat() if self.watermark is not None else None,
+            'recent': [list(key) + [value.isoformat()] for key, value in self.recent.items()],
+            'rows': self.rows,
+            'duplicates': self.duplicates,
+            'naive': self.naive,
+            'last_run': datetime.now(timezone.utc).isoformat()
+        }
+
+
+def _to_utc(value: Any) -> pd.Timestamp:
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tz is None else timestamp.tz_convert('UTC')
+
+
+def _is_tz_aware(values: pd.Series) -> bool:
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return True
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return False
+    present = values.dropna()
+    return not present.empty and getattr(present.iloc[0], 'tzinfo', None) is not None
+
+
+def parse_overlap(overlap: Any) -> pd.Timedelta:
+    """重叠窗口：数字表示秒，字符串按 pandas 时间间隔解析（如 '15min'）"""
+    if overlap is None:
+        return pd.Timedelta(0)
+    if isinstance(overlap, (int, float)):
+        return pd.Timedelta(seconds=overlap)
+    return pd.Timedelta(overlap)
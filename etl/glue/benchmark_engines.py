@@ -0,0 +1,145 @@
+"""本地引擎与 Spark 执行 ApplyMapping 的耗时对比
+
+在不同大小的合成 raw_experiments Parquet 数据上，分别测量：
+- local: local_engine（Arrow 读取 + pandas 映射 + 写 Parquet）的端到端耗时
+- spark: 安装了 pyspark 时，用本地 SparkSession 执行等价的 select/cast 映射并写 Parquet，
+  会话启动时间单独记录（Glue 作业的启动开销通常更大，可用 --glue-overhead 给出实际值）
+
+报告每个大小下两者的耗时与交叉点（本地引擎开始慢于 启动开销 + Spark 处理 的最小输入大小），
+可据此设置 GlueETLJob 的 local_threshold_bytes。
+
+用法: python -m etl.glue.benchmark_engines --rows 10000,100000,1000000,5000000 --output glue_bench.json
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .glue_job import EXPERIMENT_MAPPINGS
+from .local_engine import apply_mapping, input_size, read_input, source_columns, write_parquet
+
+
+def generate_raw_experiments(rows: int, seed: int = 0) -> pd.DataFrame:
+    """合成 raw_experiments：映射用到的列加上一些会被丢弃的列"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'experiment_id': [f'EXP{i:010d}' for i in range(rows)],
+        'timestamp': pd.Timestamp('2026-01-01') + pd.to_timedelta(rng.integers(0, 86400 * 30, rows), unit='s'),
+        'parameters': [f'{{"temperature": {t:.2f}, "pressure": {p:.1f}}}' for t, p in zip(
+            rng.uniform(-50, 500, rows), rng.uniform(0, 5000, rows))],
+        'results': [f'{{"yield": {y:.4f}}}' for y in rng.random(rows)],
+        'operator': rng.choice([f'user_{i:03d}' for i in range(50)], rows),
+        'raw_signal': rng.normal(size=rows)
+    })
+
+
+def run_local(source: str, output: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    df = read_input(source, columns=source_columns(EXPERIMENT_MAPPINGS))
+    rows = write_parquet(apply_mapping(df, EXPERIMENT_MAPPINGS), output)
+    return {'seconds': time.perf_counter() - start, 'rows': rows}
+
+
+def start_spark() -> Optional[Any]:
+    try:
+        from pyspark.sql import SparkSession
+    except ImportError:
+        return None
+    return SparkSession.builder.master('local[*]').appName('glue-engine-benchmark').getOrCreate()
+
+
+def run_spark(spark: Any, source: str, output: str) -> Dict[str, Any]:
+    from pyspark.sql import functions as F
+    
+    start = time.perf_counter()
+    frame = spark.read.parquet(source)
+    frame = frame.select(*[
+        F.col(f'`{source_field}`').cast(target_type).alias(target) for source_field, _, target, target_type in EXPERIMENT_MAPPINGS
+    ])
+    frame.write.mode('overwrite').parquet(output)
+    return {'seconds': time.perf_counter() - start}
+
+
+def crossover(results: List[Dict[str, Any]], overhead: float) -> Optional[int]:
+    """本地引擎开始慢于 overhead + Spark 处理耗时的最小输入字节数"""
+    for result in results:
+        remote = overhead + (result['spark']['seconds'] if result.get('spark') else 0.0)
+        if result['local']['seconds'] > remote:
+            return result['input_bytes']
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the local mapping engine with Spark across input sizes')
+    parser.add_argument('--rows', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size, the fastest is reported')
+    parser.add_argument('--glue-overhead', type=float, default=None,
+                        help='fixed Glue job startup seconds; defaults to the measured local Spark startup')
+    parser.add_argument('--no-spark', action='store_true')
+    parser.add_argument('--output', default=None, help='JSON file for the results')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='glue_bench_')
+    spark, startup = None, None
+    if not args.no_spark:
+        start = time.perf_counter()
+        spark = start_spark()
+        startup = time.perf_counter() - start if spark is not None else None
+        if spark is None:
+            print("pyspark is not installed, measuring the local engine only")
+    overhead = args.glue_overhead if args.glue_overhead is not None else (startup or 0.0)
+    
+    results = []
+    try:
+        for rows in [int(value) for value in args.rows.split(',')]:
+            source = os.path.join(workdir, f'raw_{rows}')
+            os.makedirs(source)
+            generate_raw_experiments(rows).to_parquet(os.path.join(source, 'part-0.parquet'), index=False)
+            result = {'rows': rows, 'input_bytes': input_size(source)}
+            result['local'] = min(
+                (run_local(source, os.path.join(workdir, f'local_{rows}.parquet')) for _ in range(args.repeat)),
+                key=lambda item: item['seconds']
+            )
+            if spark is not None:
+                result['spark'] = min(
+                    (run_spark(spark, source, os.path.join(workdir, f'spark_{rows}')) for _ in range(args.repeat)),
+                    key=lambda item: item['seconds']
+                )
+            results.append(result)
+            spark_text = f", spark {result['spark']['seconds']:.3f}s + {overhead:.1f}s startup" if 'spark' in result else ''
+            print(
+                f"{rows:>10} rows ({result['input_bytes'] / 1024 / 1024:8.1f} MB): "
+                f"local {result['local']['seconds']:.3f}s{spark_text}"
+            )
+    finally:
+        if spark is not None:
+            spark.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    point = None
+    if spark is None and args.glue_overhead is None:
+        print("Pass --glue-overhead to estimate the crossover without Spark")
+    else:
+        point = crossover(results, overhead)
+        if point is None:
+            print(f"The local engine was faster at every size (startup overhead {overhead:.1f}s)")
+        else:
+            print(f"Crossover at about {point / 1024 / 1024:.1f} MB of input: set local_threshold_bytes below {point}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'spark_startup_seconds': startup,
+                'glue_overhead_seconds': overhead,
+                'crossover_bytes': point,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
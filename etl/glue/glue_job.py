@@ -1,40 +1,117 @@
-from awsglue.transforms import *
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from awsglue.context import GlueContext
-from awsglue.job import Job
+from typing import Dict, Any, Optional
+import logging
+import time
+
+from .local_engine import apply_mapping, input_size, read_input, source_columns, write_parquet, write_snowflake
+
+# ApplyMapping 映射：(源字段, 源类型, 目标字段, 目标类型)，Glue 与本地引擎共用
+EXPERIMENT_MAPPINGS = [
+    ("experiment_id", "string", "experiment_id", "string"),
+    ("timestamp", "timestamp", "timestamp", "timestamp"),
+    ("parameters", "string", "parameters", "string"),
+    ("results", "string", "results", "string")
+]
+
+DEFAULT_CONFIG = {
+    'database': 'lab_experiments',
+    'table_name': 'raw_experiments',
+    'source_path': None,                         # 目录表对应的存储位置，本地引擎读取与判断数据量时使用
+    'source_format': 'parquet',
+    'local_threshold_bytes': 256 * 1024 * 1024,  # 不超过该大小时使用本地引擎
+    'output_path': None,                         # 本地引擎写 Parquet（本地运行/测试），否则写 Snowflake
+    'connection_options': {
+        'sfDatabase': 'LAB_DB',
+        'sfSchema': 'PUBLIC',
+        'sfWarehouse': 'COMPUTE_WH'
+    }
+}
+
 
 class GlueETLJob:
-    def __init__(self):
-        self.glue_context = GlueContext(SparkContext.getOrCreate())
-        self.spark = self.glue_context.spark_session
-        self.job = Job(self.glue_context)
+    """实验数据映射作业
+    
+    输入不超过 local_threshold_bytes 时在本进程中用 pandas/Arrow 执行映射（local_engine.py），
+    不启动 Spark；更大的输入或无法判断大小时使用 Glue。Glue 上下文在首次需要时才创建，
+    因此没有 awsglue 的环境也可以运行本地引擎。
+    """
     
-    def process_experiment_data(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.logger = logging.getLogger(__name__)
+        self._glue_context = None
+        self.spark = None
+        self.job = None
+        
+    @property
+    def glue_context(self):
+        if self._glue_context is None:
+            from awsglue.context import GlueContext
+            from awsglue.job import Job
+            from pyspark.context import SparkContext
+            self._glue_context = GlueContext(SparkContext.getOrCreate())
+            self.spark = self._glue_context.spark_session
+            self.job = Job(self._glue_context)
+        return self._glue_context
+        
+    def choose_engine(self) -> str:
+        """按输入大小选择引擎：local 或 glue"""
+        if not self.config['source_path']:
+            return 'glue'
+        try:
+            size = input_size(self.config['source_path'], self.config['source_format'])
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Cannot determine input size, using Glue: {str(e)}")
+            return 'glue'
+        engine = 'local' if size <= self.config['local_threshold_bytes'] else 'glue'
+        self.logger.info(f"Input is {size / 1024 / 1024:.1f} MB, using the {engine} engine")
+        return engine
+        
+    def process_experiment_data(self, engine: str = 'auto') -> Dict[str, Any]:
+        """执行映射作业，engine 为 auto、local 或 glue；返回使用的引擎、耗时与行数"""
+        if engine == 'auto':
+            engine = self.choose_engine()
+        start = time.perf_counter()
+        if engine == 'local':
+            rows = self._process_local()
+        elif engine == 'glue':
+            rows = self._process_glue()
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
+        return {'engine': engine, 'seconds': time.perf_counter() - start, 'rows': rows}
+        
+    def _process_local(self) -> int:
+        if not self.config['source_path']:
+            raise ValueError("The local engine needs 'source_path'")
+        df = read_input(
+            self.config['source_path'],
+            self.config['source_format'],
+            columns=source_columns(EXPERIMENT_MAPPINGS)
+        )
+        mapped = apply_mapping(df, EXPERIMENT_MAPPINGS)
+        if self.config['output_path']:
+            return write_parquet(mapped, self.config['output_path'])
+        return write_snowflake(mapped, self.config['connection_options'])
+        
+    def _process_glue(self) -> Optional[int]:
+        from awsglue.transforms import ApplyMapping
+        
         # Read from source (e.g., S3)
         dynamic_frame = self.glue_context.create_dynamic_frame.from_catalog(
-            database="lab_experiments",
-            table_name="raw_experiments"
+            database=self.config['database'],
+            table_name=self.config['table_name']
         )
         
         # Apply transformations
         mapped_frame = ApplyMapping.apply(
             frame=dynamic_frame,
-            mappings=[
-                ("experiment_id", "string", "experiment_id", "string"),
-                ("timestamp", "timestamp", "timestamp", "timestamp"),
-                ("parameters", "string", "parameters", "string"),
-                ("results", "string", "results", "string")
-            ]
+            mappings=EXPERIMENT_MAPPINGS
         )
         
         # Write to destination (e.g., Snowflake)
         self.glue_context.write_dynamic_frame.from_options(
             frame=mapped_frame,
             connection_type="custom.snowflake",
-            connection_options={
-                "sfDatabase": "LAB_DB",
-                "sfSchema": "PUBLIC",
-                "sfWarehouse": "COMPUTE_WH"
-            }
+            connection_options=self.config['connection_options']
         )
+        # 统计行数需要额外的 Spark 作业，这里不计算
+        return None
@@ -0,0 +1,241 @@
+"""Glue ApplyMapping 的本地 pandas/Arrow 实现
+
+小输入（如每小时的增量）不值得启动 Spark/Glue，直接在本进程中用 Arrow 读取、
+按映射规则选择/重命名/转换类型后写出。类型转换遵循 Spark cast 的语义：无法转换的值变为 null。
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from decimal import Decimal, InvalidOperation
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# (源字段, 源类型, 目标字段, 目标类型)，与 ApplyMapping.apply 的 mappings 相同
+Mapping = Tuple[str, str, str, str]
+
+INTEGER_TYPES = {
+    'byte': 'Int8', 'tinyint': 'Int8',
+    'short': 'Int16', 'smallint': 'Int16',
+    'int': 'Int32', 'integer': 'Int32',
+    'long': 'Int64', 'bigint': 'Int64'
+}
+FLOAT_TYPES = {'float': 'float32', 'double': 'float64'}
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+DECIMAL_TYPE = re.compile(r'^decimal(?:\((\d+),\s*(\d+)\))?$')
+# Spark 转换字符串为整数时接受的形式（小数部分被截断），其余（如 1e10）为 null
+INTEGER_TEXT = re.compile(r'^([+-]?\d+)(?:\.\d*)?$')
+
+logger = logging.getLogger(__name__)
+
+
+def apply_mapping(df: pd.DataFrame, mappings: Sequence[Mapping]) -> pd.DataFrame:
+    """按映射选择、重命名并转换列；未出现在映射中的列被丢弃
+    
+    源字段可以是 a.b 形式的嵌套路径（结构体列中的字段）。
+    源字段不存在时与 Glue 一样不输出该字段。
+    """
+    columns = {}
+    for source, _, target, target_type in mappings:
+        values = _resolve(df, source)
+        if values is None:
+            logger.warning(f"Source field {source} not found, {target} is omitted")
+            continue
+        columns[target] = cast(values, target_type)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def cast(values: pd.Series, glue_type: str) -> pd.Series:
+    """转换为 Glue/Spark 类型，无法转换的值为 null"""
+    glue_type = glue_type.strip().lower()
+    if glue_type == 'string':
+        return _to_string(values)
+    if glue_type in INTEGER_TYPES:
+        return _to_integer(values, INTEGER_TYPES[glue_type])
+    if glue_type in FLOAT_TYPES:
+        return _to_number(values).astype(FLOAT_TYPES[glue_type])
+    if glue_type == 'boolean':
+        return _to_boolean(values)
+    if glue_type == 'timestamp':
+        return _to_timestamp(values)
+    if glue_type == 'date':
+        return _to_timestamp(values).dt.normalize().dt.date.astype(object).where(values.notna(), None)
+    match = DECIMAL_TYPE.match(glue_type)
+    if match:
+        return _to_decimal(values, int(match.group(2) or 0))
+    raise ValueError(f"Unsupported mapping type: {glue_type}")
+
+
+def input_size(path: str, format: str = 'parquet') -> int:
+    """输入数据集的总字节数（本地目录/文件或 s3:// 路径）"""
+    dataset = ds.dataset(path, format=format)
+    infos = dataset.filesystem.get_file_info(dataset.files)
+    return sum(info.size or 0 for info in infos)
+
+
+def read_input(path: str, format: str = 'parquet', columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """用 Arrow 读取数据集；columns 只读取映射需要的顶层列"""
+    dataset = ds.dataset(path, format=format)
+    if columns is not None:
+        columns = [column for column in columns if column in dataset.schema.names]
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+def source_columns(mappings: Sequence[Mapping]) -> List[str]:
+    """映射用到的顶层列（嵌套路径取第一段）"""
+    return list(dict.fromkeys(
+        name for source, _, _, _ in mappings for name in (source, source.split('.')[0])
+    ))
+
+
+def write_parquet(df: pd.DataFrame, path: str) -> int:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    return len(df)
+
+
+def write_snowflake(df: pd.DataFrame, options: Dict[str, Any]) -> int:
+    """用 snowflake-connector-python 写入（连接参数与 Glue 的 Snowflake 连接器同名）"""
+    try:
+        import snowflake.connector
+        from snowflake.connector.pandas_tools import write_pandas
+    except ImportError as e:
+        raise ImportError(
+            "Writing to Snowflake with the local engine requires snowflake-connector-python[pandas]"
+        ) from e
+    if not options.get('dbtable'):
+        raise ValueError("Snowflake connection options need 'dbtable' for the local engine")
+    connection = snowflake.connector.connect(
+        account=options.get('sfAccount') or options['sfURL'].split('.snowflakecomputing.com')[0],
+        user=options.get('sfUser'),
+        password=options.get('sfPassword'),
+        database=options.get('sfDatabase'),
+        schema=options.get('sfSchema'),
+        warehouse=options.get('sfWarehouse'),
+        role=options.get('sfRole')
+    )
+    try:
+        success, _, rows, _ = write_pandas(connection, df, options['dbtable'], quote_identifiers=False)
+    finally:
+        connection.close()
+    if not success:
+        raise RuntimeError(f"Snowflake write to {options['dbtable']} failed")
+    return rows
+
+
+def _resolve(df: pd.DataFrame, source: str) -> Optional[pd.Series]:
+    if source in df.columns:
+        return df[source]
+    head, _, rest = source.partition('.')
+    if not rest or head not in df.columns:
+        return None
+    values = df[head]
+    for field in rest.split('.'):
+        values = values.map(lambda value, field=field: value.get(field) if isinstance(value, dict) else None)
+    return values
+
+
+def _to_string(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        # Spark 的时间戳字符串格式
+        return values.dt.strftime('%Y-%m-%d %H:%M:%S').astype('string')
+    if pd.api.types.is_bool_dtype(values):
+        return values.map({True: 'true', False: 'false'}).astype('string')
+    return values.astype('string')
+
+
+def _to_integer(values: pd.Series, dtype: str) -> pd.Series:
+    """转换为可空整数：不经过 float64（bigint 超过 2^53 时保持精确），超出目标类型范围的值为 null"""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        integers = values.astype('Int64')
+    elif pd.api.types.is_float_dtype(values):
+        # Spark 将小数转换为整数时向零截断；NaN、无穷与超出 int64 的值为 null
+        numbers = values.astype('float64')
+        valid = np.isfinite(numbers) & (numbers.abs() < 2.0 ** 63)
+        integers = np.trunc(numbers.where(valid)).astype('Int64')
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        integers = _unix_seconds(values).astype('Int64')
+    else:
+        limits = np.iinfo(np.int64)
+        parsed = [_parse_integer(value) for value in values]
+        integers = pd.Series(pd.array(
+            [value if value is not None and limits.min <= value <= limits.max else None for value in parsed],
+            dtype='Int64'
+        ), index=values.index)
+    limits = np.iinfo(dtype.lower())
+    in_range = ((integers >= limits.min) & (integers <= limits.max)).fillna(False).astype(bool)
+    return integers.where(in_range).astype(dtype)
+
+
+def _parse_integer(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating, Decimal)):
+        try:
+            return int(value)
+        except (ValueError, OverflowError, InvalidOperation):
+            return None
+    match = INTEGER_TEXT.match(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype('float64')
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return _unix_seconds(values).astype('float64')
+    return pd.to_numeric(values.astype('string').str.strip(), errors='coerce').astype('float64')
+
+
+def _unix_seconds(values: pd.Series) -> pd.Series:
+    """时间戳转换为 Unix 秒（与存储精度 ns/us/s 无关），NaT 为 NaN"""
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    seconds = values.astype('datetime64[s]').astype('int64')
+    return seconds.where(values.notna())
+
+
+def _to_boolean(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype('boolean')
+    if pd.api.types.is_numeric_dtype(values):
+        return (values != 0).astype('boolean').where(values.notna(), pd.NA)
+    text = values.astype('string').str.strip().str.lower()
+    result = pd.Series(pd.NA, index=values.index, dtype='boolean')
+    result[text.isin(TRUE_VALUES).fillna(False).astype(bool)] = True
+    result[text.isin(FALSE_VALUES).fillna(False).astype(bool)] = False
+    return result
+
+
+def _to_timestamp(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.to_datetime(values, unit='s', errors='coerce')
+    # 带时区的字符串换算为 UTC 后去掉时区（与 Glue 默认的 UTC 会话时区一致）
+    return pd.to_datetime(values.astype('string'), format='ISO8601', errors='coerce', utc=True).dt.tz_localize(None)
+
+
+def _to_decimal(values: pd.Series, scale: int) -> pd.Series:
+    quantum = Decimal(1).scaleb(-scale)
+    
+    def convert(value: Any) -> Optional[Decimal]:
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+            return None
+        try:
+            return Decimal(str(value).strip()).quantize(quantum)
+        except (InvalidOperation, ValueError):
+            return None
+    return values.astype(object).map(convert)
@@ -1,17 +1,58 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, AsyncIterable, AsyncIterator, Iterator, Optional, Union
+import asyncio
+import collections.abc
 import logging
+import random
+import time
+
+Records = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+def batched(data: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """按需将记录切分为批次，不预先生成全部批次"""
+    batch = []
+    for record in data:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class BaseLoader(ABC):
-    """数据加载器基类"""
+    """数据加载器基类
+    
+    子类只需实现 write_batch（写入单个批次）。load_batches 按需切分批次，
+    最多 max_concurrency 个批次同时写入，失败的批次按指数退避加随机抖动重试，
+    每批耗时与整体吞吐量记录在 metrics 中。
+    
+    配置项（均可省略）：batch_size、max_concurrency（默认取 parallel_jobs）、
+    max_retries、retry_delay（首次重试的基准等待秒数）、max_retry_delay。
+    """
+    
+    # 可重试的异常类型，子类可以收窄（例如只重试连接/超时错误）
+    retryable_errors = (Exception,)
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.batch_size = config.get('batch_size', 1000)
+        self.max_concurrency = config.get('max_concurrency', config.get('parallel_jobs', 4))
+        self.max_retries = config.get('max_retries', 3)
+        self.retry_delay = config.get('retry_delay', 1.0)
+        self.max_retry_delay = config.get('max_retry_delay', 60.0)
+        self.metrics: Dict[str, Any] = {}
+        
+    async def load(self, data: Records) -> bool:
+        """加载数据，所有批次写入成功时返回 True"""
+        metrics = await self.load_batches(data)
+        return metrics['failed_batches'] == 0
         
     @abstractmethod
-    async def load(self, data: List[Dict[str, Any]]) -> bool:
-        """加载数据的抽象方法"""
+    async def write_batch(self, batch: List[Dict[str, Any]]) -> Optional[int]:
+        """写入单个批次，返回写入的记录数（返回 None 时按批次长度计）"""
         pass
         
     @abstractmethod
@@ -19,12 +60,166 @@ class BaseLoader(ABC):
         """验证目标位置"""
         pass
         
+    async def load_batches(
+        self,
+        data: Records,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        raise_on_error: bool = True
+    ) -> Dict[str, Any]:
+        """并发写入所有批次，返回加载指标
+        
+        先获取信号量再取下一批次，因此同时存在于内存中的批次不超过 max_concurrency 个，
+        data 可以是列表、生成器或异步迭代器（如流式提取的结果）。
+        重试用尽的批次交给 _handle_load_error；raise_on_error 为 True 时出现失败后不再调度新批次，
+        等待已调度的批次完成后抛出第一个错误。
+        """
+        batch_size = batch_size or self.batch_size
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        batch_metrics: List[Dict[str, Any]] = []
+        errors: List[Exception] = []
+        tasks = set()
+        start = time.perf_counter()
+        
+        async def run(index: int, batch: List[Dict[str, Any]]) -> None:
+            try:
+                batch_metrics.append(await self._write_with_retry(index, batch, errors))
+            finally:
+                semaphore.release()
+                
+        index = 0
+        batches = self._iter_batches(data, batch_size)
+        try:
+            while True:
+                await semaphore.acquire()
+                if errors and raise_on_error:
+                    semaphore.release()
+                    break
+                try:
+                    batch = await batches.__anext__()
+                except StopAsyncIteration:
+                    semaphore.release()
+                    break
+                except BaseException:
+                    semaphore.release()
+                    raise
+                task = asyncio.ensure_future(run(index, batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await batches.aclose()
+            
+        batch_metrics.sort(key=lambda item: item['index'])
+        self.metrics = self._summarize(batch_metrics, time.perf_counter() - start)
+        self.logger.info(
+            f"Loaded {self.metrics['records']} records in {self.metrics['batches']} batches "
+            f"({self.metrics['records_per_second']:.0f} records/s, "
+            f"p95 latency {self.metrics['latency']['p95']:.3f}s, "
+            f"{self.metrics['retries']} retries, {self.metrics['failed_batches']} failed)"
+        )
+        if errors and raise_on_error:
+            raise errors[0]
+        return self.metrics
+        
+    async def _write_with_retry(
+        self,
+        index: int,
+        batch: List[Dict[str, Any]],
+        errors: List[Exception]
+    ) -> Dict[str, Any]:
+        """写入一个批次，失败时重试，返回该批次的指标"""
+        start = time.perf_counter()
+        for attempt in range(1, self.max_retries + 2):
+            attempt_start = time.perf_counter()
+            try:
+                written = await self.write_batch(batch)
+                return {
+                    'index': index,
+                    'records': len(batch) if written is None else written,
+                    'attempts': attempt,
+                    'latency': time.perf_counter() - attempt_start,
+                    'seconds': time.perf_counter() - start
+                }
+            except Exception as e:
+                error = e
+                if attempt > self.max_retries or not isinstance(e, self.retryable_errors):
+                    break
+                delay = self._retry_delay(attempt)
+                self.logger.warning(
+                    f"Batch {index} failed (attempt {attempt}/{self.max_retries + 1}), "
+                    f"retrying in {delay:.2f}s: {str(e)}"
+                )
+                await asyncio.sleep(delay)
+                
+        metrics = {
+            'index': index,
+            'records': 0,
+            'attempts': attempt,
+            'latency': time.perf_counter() - attempt_start,
+            'seconds': time.perf_counter() - start,
+            'error': str(error),
+            'failed_records': len(batch)
+        }
+        try:
+            await self._handle_load_error(error, batch)
+        except Exception as e:
+            errors.append(e)
+        return metrics
+        
+    def _retry_delay(self, attempt: int) -> float:
+        """指数退避加全抖动：在 [0, min(上限, 基准 * 2^(attempt-1))] 内均匀取值，避免重试同时发生"""
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** (attempt - 1)))
+        
+    async def _iter_batches(self, data: Records, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """同步或异步的记录来源统一切分为异步批次流"""
+        if isinstance(data, collections.abc.AsyncIterable):
+            batch = []
+            async for record in data:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        else:
+            for batch in batched(data, batch_size):
+                yield batch
+                
     async def _batch_data(self, data: List[Dict[str, Any]], batch_size: int) -> List[List[Dict[str, Any]]]:
         """将数据分批"""
-        return [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        return list(batched(data, batch_size))
         
     async def _handle_load_error(self, error: Exception, batch: List[Dict[str, Any]]) -> None:
-        """处理加载错误"""
+        """处理重试用尽的批次错误；子类可以改为写入死信队列等而不抛出"""
         self.logger.error(f"Loading error: {str(error)}")
-        # 可以实现重试逻辑
         raise error
+        
+    def _summarize(self, batch_metrics: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+        latencies = sorted(item['latency'] for item in batch_metrics if 'error' not in item)
+        records = sum(item['records'] for item in batch_metrics)
+        return {
+            'batches': len(batch_metrics),
+            'records': records,
+            'failed_batches': sum(1 for item in batch_metrics if 'error' in item),
+            'failed_records': sum(item.get('failed_records', 0) for item in batch_metrics),
+            'retries': sum(item['attempts'] - 1 for item in batch_metrics),
+            'seconds': seconds,
+            'records_per_second': records / seconds if seconds else 0.0,
+            'latency': {
+                'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p50': _percentile(latencies, 0.5),
+                'p95': _percentile(latencies, 0.95),
+                'max': latencies[-1] if latencies else 0.0
+            },
+            'batch_metrics': batch_metrics
+        }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """已排序列表的分位数（最近秩）"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
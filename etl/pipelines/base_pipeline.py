@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
+import asyncio
 import logging
+import time
 from datetime import datetime
 import yaml
 import os
 
+from .checkpoint import BatchCheckpoint
+from .metrics import PipelineMetrics, registry
+
 class BasePipeline(ABC):
     """ETL管道基类"""
     
@@ -14,6 +19,7 @@ class BasePipeline(ABC):
         self.end_time = None
         self.status = "initialized"
         self.metrics = {}
+        self.records_processed = 0
         
         # 加载配置
         self.config = self._load_config(config_path)
@@ -21,6 +27,14 @@ class BasePipeline(ABC):
         # 设置日志
         self.logger = self._setup_logger()
         
+        # 阶段指标与追踪（monitoring.exporter）
+        self.exporter_config = self.config.get('monitoring', {}).get('exporter') or {}
+        self.telemetry = registry.register(PipelineMetrics(pipeline_id, self.exporter_config))
+        
+        # 批次级检查点（global.checkpoint），失败后以相同 pipeline_id 重新运行时从未提交的批次继续
+        self.checkpoint_config = self.config['global'].get('checkpoint') or {}
+        self.checkpoint: Optional[BatchCheckpoint] = None
+        
     def _load_config(self, config_path: str = None) -> Dict[str, Any]:
         """加载ETL配置"""
         if not config_path:
@@ -49,33 +63,60 @@ class BasePipeline(ABC):
                     maxBytes=handler_config['max_bytes'],
                     backupCount=handler_config['backup_count']
                 )
-            
+                
             formatter = logging.Formatter(self.config['logging']['format'])
             handler.setFormatter(formatter)
             logger.addHandler(handler)
             
         return logger
         
-    async def execute(self) -> bool:
-        """执行ETL管道"""
+    async def execute(self, streaming: Optional[bool] = None) -> bool:
+        """执行ETL管道
+        
+        streaming 为 True 时（默认取 global.streaming）以批次流的方式执行，
+        提取、转换、加载三个阶段通过有界队列并行推进，内存只与 queue_size 个批次相关。
+        启用检查点时总是按批次执行。
+        """
+        if streaming is None:
+            streaming = self.config['global'].get('streaming', False)
+        if self.checkpoint_config.get('enabled') and not streaming:
+            self.logger.info("Checkpoints are kept per batch, running in streaming mode")
+            streaming = True
         try:
             self.start_time = datetime.now()
             self.status = "running"
+            self.records_processed = 0
             self.logger.info(f"Starting pipeline: {self.pipeline_id}")
+            if self.exporter_config.get('http_port'):
+                registry.serve(self.exporter_config['http_port'])
+            self.telemetry.start_run()
             
             # 验证配置
             await self.validate_config()
             
-            # 执行提取
-            data = await self.extract()
-            self.logger.info(f"Extracted {len(data)} records")
-            
-            # 执行转换
-            transformed_data = await self.transform(data)
-            self.logger.info(f"Transformed {len(transformed_data)} records")
-            
-            # 执行加载
-            await self.load(transformed_data)
+            if streaming:
+                await self._execute_streaming()
+            else:
+                # 执行提取
+                with self.telemetry.stage('extract') as span:
+                    start = time.perf_counter()
+                    data = await self.extract()
+                    self.telemetry.observe_batch('extract', time.perf_counter() - start, data, parent=span)
+                self.logger.info(f"Extracted {len(data)} records")
+                
+                # 执行转换
+                with self.telemetry.stage('transform') as span:
+                    start = time.perf_counter()
+                    transformed_data = await self.transform(data)
+                    self.telemetry.observe_batch('transform', time.perf_counter() - start, transformed_data, parent=span)
+                self.logger.info(f"Transformed {len(transformed_data)} records")
+                
+                # 执行加载
+                with self.telemetry.stage('load') as span:
+                    start = time.perf_counter()
+                    await self.load(transformed_data)
+                    self.telemetry.observe_batch('load', time.perf_counter() - start, transformed_data, parent=span)
+                self.records_processed = len(transformed_data)
             self.logger.info("Data loaded successfully")
             
             self.status = "completed"
@@ -90,9 +131,162 @@ class BasePipeline(ABC):
             self.status = "failed"
             self.end_time = datetime.now()
             self.logger.error(f"Pipeline failed: {str(e)}")
+            if self.checkpoint is not None:
+                try:
+                    self.checkpoint.fail()
+                except Exception as checkpoint_error:
+                    self.logger.error(f"Failed to update checkpoint: {str(checkpoint_error)}")
+            self._record_metrics(e)
             await self._handle_failure(e)
             return False
             
+    async def _execute_streaming(self) -> None:
+        """三阶段流水线：提取 -> 队列 -> 转换 -> 队列 -> 加载
+        
+        队列已满时上游阶段等待（背压），任一阶段失败时取消其余阶段并抛出该错误。
+        启用检查点时，每个批次转换后先持久化，加载成功后标记为已提交；恢复运行时先加载
+        上次已转换未提交的批次，提取从 next_batch 继续。
+        """
+        queue_size = self.config['global'].get('queue_size', 4)
+        extracted = asyncio.Queue(maxsize=queue_size)
+        transformed = asyncio.Queue(maxsize=queue_size)
+        done = object()
+        
+        checkpoint = None
+        if self.checkpoint_config.get('enabled'):
+            checkpoint = self.checkpoint = BatchCheckpoint(
+                self.checkpoint_config.get('directory', '.etl_state/checkpoints'), self.pipeline_id
+            )
+            await asyncio.to_thread(checkpoint.begin)
+        first_batch = checkpoint.next_batch if checkpoint else 0
+        
+        # 批次耗时不含等待队列的时间，阶段总耗时（含等待）由 stage() 记录
+        async def produce() -> None:
+            with self.telemetry.stage('extract') as span:
+                index = first_batch
+                start = time.perf_counter()
+                batches = self.extract_batches_from(first_batch) if first_batch else self.extract_batches()
+                async for batch in batches:
+                    self.telemetry.observe_batch('extract', time.perf_counter() - start, batch, parent=span)
+                    if batch:
+                        await extracted.put((index, batch))
+                        self.telemetry.set_queue_depth('extracted', extracted.qsize())
+                    index += 1
+                    start = time.perf_counter()
+                await extracted.put(done)
+                
+        async def convert() -> None:
+            with self.telemetry.stage('transform') as span:
+                while True:
+                    item = await extracted.get()
+                    self.telemetry.set_queue_depth('extracted', extracted.qsize())
+                    if item is done:
+                        await transformed.put(done)
+                        return
+                    index, batch = item
+                    start = time.perf_counter()
+                    batch = await self.transform_batch(batch)
+                    self.telemetry.observe_batch('transform', time.perf_counter() - start, batch, parent=span)
+                    if checkpoint and batch:
+                        await asyncio.to_thread(checkpoint.save_transformed, index, batch)
+                    elif checkpoint:
+                        await asyncio.to_thread(checkpoint.mark_committed, index, 0)
+                    if batch:
+                        await transformed.put((index, batch))
+                        self.telemetry.set_queue_depth('transformed', transformed.qsize())
+                        
+        async def consume() -> None:
+            with self.telemetry.stage('load') as span:
+                # 恢复运行：先加载上次已转换但未提交的批次
+                for index in (checkpoint.pending if checkpoint else []):
+                    batch = await asyncio.to_thread(checkpoint.read_transformed, index)
+                    await self._load_indexed(index, batch, span, replayed=True)
+                while True:
+                    item = await transformed.get()
+                    self.telemetry.set_queue_depth('transformed', transformed.qsize())
+                    if item is done:
+                        return
+                    await self._load_indexed(*item, span)
+                    
+        tasks = [asyncio.ensure_future(stage()) for stage in (produce, convert, consume)]
+        try:
+            finished, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in finished:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if checkpoint:
+            await asyncio.to_thread(checkpoint.complete)
+        self.logger.info(f"Streamed {self.records_processed} records")
+        
+    async def _load_indexed(
+        self,
+        index: int,
+        batch: List[Dict[str, Any]],
+        span: Dict[str, Any],
+        replayed: bool = False
+    ) -> None:
+        """加载一个批次；启用检查点时通过 commit_batch 提交并记录"""
+        start = time.perf_counter()
+        if self.checkpoint_config.get('enabled'):
+            batch_id = self.checkpoint.batch_id(index)
+            # 上次运行中断时正在加载的批次可能已经写入目标
+            if replayed and await self.is_batch_committed(batch_id):
+                self.logger.info(f"Batch {batch_id} was already committed, skipping")
+            else:
+                await self.commit_batch(batch_id, batch)
+            await asyncio.to_thread(self.checkpoint.mark_committed, index, len(batch))
+        else:
+            await self.load_batch(batch)
+        self.telemetry.observe_batch('load', time.perf_counter() - start, batch, parent=span)
+        self.records_processed += len(batch)
+        
+    async def extract_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式模式下按批次提取数据
+        
+        默认调用 extract() 后按 global.batch_size 切分（不节省内存），
+        支持流式读取的子类应重写为逐批产生。
+        """
+        data = await self.extract()
+        batch_size = self.config['global'].get('batch_size', 1000)
+        for start in range(0, len(data), batch_size):
+            yield data[start:start + batch_size]
+            
+    async def extract_batches_from(self, first_batch: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """从检查点恢复时，从第 first_batch 个批次开始提取
+        
+        默认重新读取 extract_batches() 并跳过之前的批次（要求批次划分是确定的），
+        可以定位读取位置的子类（如按键集分页）应重写以跳过重复读取。
+        """
+        index = 0
+        async for batch in self.extract_batches():
+            if index >= first_batch:
+                yield batch
+            index += 1
+            
+    async def transform_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """流式模式下转换一个批次，默认调用 transform()"""
+        return await self.transform(batch)
+        
+    async def load_batch(self, batch: List[Dict[str, Any]]) -> bool:
+        """流式模式下加载一个批次，默认调用 load()"""
+        return await self.load(batch)
+        
+    async def commit_batch(self, batch_id: str, batch: List[Dict[str, Any]]) -> bool:
+        """启用检查点时加载一个批次，默认调用 load_batch()
+        
+        batch_id 在恢复后重新加载同一批次时保持不变。默认依赖加载端幂等（如 write_mode: upsert）；
+        需要恰好一次时，子类可以在写入数据的同一事务中记录 batch_id，并重写 is_batch_committed。
+        """
+        return await self.load_batch(batch)
+        
+    async def is_batch_committed(self, batch_id: str) -> bool:
+        """恢复时检查中断前正在加载的批次是否已写入目标，默认 False（重新加载）"""
+        return False
+        
     @abstractmethod
     async def validate_config(self) -> bool:
         """验证管道配置"""
@@ -129,17 +323,33 @@ class BasePipeline(ABC):
         if self.config['monitoring']['alerts']['slack']['enabled']:
             await self._send_slack_alert(error)
             
-    def _record_metrics(self) -> None:
-        """记录管道指标"""
+    def _record_metrics(self, error: Optional[Exception] = None) -> None:
+        """记录管道指标，并按 monitoring.exporter 输出 Prometheus 文件与 OTLP span"""
+        summary = self.telemetry.finish_run(self.status, self.records_processed, error)
         self.metrics.update({
             'pipeline_id': self.pipeline_id,
             'start_time': self.start_time,
             'end_time': self.end_time,
             'duration': (self.end_time - self.start_time).total_seconds(),
             'status': self.status,
-            'records_processed': self.records_processed
+            'records_processed': self.records_processed,
+            'records_per_second': summary['records_per_second'],
+            'stages': summary['stages'],
+            'queue_depth_max': summary['queue_depth_max']
         })
         
+        # 导出失败不影响管道结果
+        try:
+            if self.exporter_config.get('prometheus_file'):
+                self.telemetry.write_prometheus(self.exporter_config['prometheus_file'])
+            if self.exporter_config.get('trace_file'):
+                self.telemetry.write_trace(
+                    self.exporter_config['trace_file'],
+                    self.exporter_config.get('service_name', 'etl')
+                )
+        except OSError as e:
+            self.logger.warning(f"Failed to export pipeline metrics: {str(e)}")
+            
     async def _cleanup(self) -> None:
         """清理资源"""
         pass
@@ -0,0 +1,171 @@
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import datetime, timezone
+import contextlib
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import uuid
+
+
+class BatchCheckpoint:
+    """批次级检查点：记录每个批次是否已转换、是否已被加载器提交
+    
+    状态保存在 directory/checkpoints.db（SQLite），已转换但未提交的批次序列化到
+    directory/<pipeline_id>/<run_id>/ 下，提交后删除。同一 pipeline_id 的上一次运行未完成时，
+    begin() 恢复该运行：已转换的批次直接重新加载，提取从 next_batch 继续，已提交的批次不会再处理。
+    """
+    
+    def __init__(self, directory: str, pipeline_id: str):
+        self.directory = os.fspath(directory)
+        self.pipeline_id = pipeline_id
+        self.logger = logging.getLogger(__name__)
+        self.path = os.path.join(self.directory, 'checkpoints.db')
+        self.run_id: Optional[str] = None
+        self.next_batch = 0
+        self.pending: List[int] = []
+        self.resumed = False
+        os.makedirs(self.directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "pipeline_id TEXT PRIMARY KEY, run_id TEXT NOT NULL, status TEXT NOT NULL, "
+                "next_batch INTEGER NOT NULL DEFAULT 0, updated_at TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                "pipeline_id TEXT NOT NULL, run_id TEXT NOT NULL, batch_index INTEGER NOT NULL, "
+                "status TEXT NOT NULL, records INTEGER NOT NULL, updated_at TEXT, "
+                "PRIMARY KEY (pipeline_id, run_id, batch_index))"
+            )
+            
+    def begin(self) -> bool:
+        """开始或恢复一次运行，返回是否为恢复"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT run_id, next_batch FROM runs WHERE pipeline_id = ? AND status != 'completed'",
+                (self.pipeline_id,)
+            ).fetchone()
+            if row:
+                self.run_id, self.next_batch = row
+                self.pending = [index for (index,) in conn.execute(
+                    "SELECT batch_index FROM batches WHERE pipeline_id = ? AND run_id = ? AND status = 'transformed' "
+                    "ORDER BY batch_index",
+                    (self.pipeline_id, self.run_id)
+                )]
+                self.resumed = True
+                conn.execute(
+                    "UPDATE runs SET status = 'running', updated_at = ? WHERE pipeline_id = ?",
+                    (_now(), self.pipeline_id)
+                )
+            else:
+                self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:8]
+                self.next_batch, self.pending, self.resumed = 0, [], False
+                conn.execute("DELETE FROM batches WHERE pipeline_id = ?", (self.pipeline_id,))
+                conn.execute(
+                    "INSERT INTO runs (pipeline_id, run_id, status, next_batch, updated_at) VALUES (?, ?, 'running', 0, ?) "
+                    "ON CONFLICT(pipeline_id) DO UPDATE SET run_id = excluded.run_id, status = excluded.status, "
+                    "next_batch = 0, updated_at = excluded.updated_at",
+                    (self.pipeline_id, self.run_id, _now())
+                )
+        if self.resumed:
+            self.logger.info(
+                f"Resuming run {self.run_id} of {self.pipeline_id}: {len(self.pending)} transformed batches to load, "
+                f"extraction continues at batch {self.next_batch}"
+            )
+        return self.resumed
+        
+    def batch_id(self, index: int) -> str:
+        """批次的稳定标识，恢复后重新加载同一批次时不变，可用于加载端去重"""
+        return f"{self.pipeline_id}/{self.run_id}/{index:06d}"
+        
+    def save_transformed(self, index: int, batch: List[Dict[str, Any]]) -> None:
+        """先持久化转换结果，再记录状态"""
+        path = self._batch_path(index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._set_status(index, 'transformed', len(batch))
+        
+    def read_transformed(self, index: int) -> List[Dict[str, Any]]:
+        with open(self._batch_path(index), 'rb') as f:
+            return pickle.load(f)
+            
+    def mark_committed(self, index: int, records: int) -> None:
+        self._set_status(index, 'committed', records)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._batch_path(index))
+            
+    def fail(self) -> None:
+        self._set_run_status('failed')
+        
+    def complete(self) -> None:
+        """运行成功：清理批次记录和序列化文件"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM batches WHERE pipeline_id = ?", (self.pipeline_id,))
+        self._set_run_status('completed')
+        shutil.rmtree(self._run_directory(), ignore_errors=True)
+        
+    def reset(self) -> None:
+        """丢弃未完成的运行，下次从头开始"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM batches WHERE pipeline_id = ?", (self.pipeline_id,))
+            conn.execute("DELETE FROM runs WHERE pipeline_id = ?", (self.pipeline_id,))
+        shutil.rmtree(os.path.join(self.directory, self.pipeline_id), ignore_errors=True)
+        
+    def status(self) -> Dict[str, int]:
+        """当前运行中各状态的批次数"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM batches WHERE pipeline_id = ? AND run_id = ? GROUP BY status",
+                (self.pipeline_id, self.run_id)
+            ).fetchall()
+        return dict(rows)
+        
+    def _set_status(self, index: int, status: str, records: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO batches (pipeline_id, run_id, batch_index, status, records, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(pipeline_id, run_id, batch_index) "
+                "DO UPDATE SET status = excluded.status, records = excluded.records, updated_at = excluded.updated_at",
+                (self.pipeline_id, self.run_id, index, status, records, _now())
+            )
+            # 转换按顺序进行，next_batch 之前的批次都已转换或提交
+            conn.execute(
+                "UPDATE runs SET next_batch = MAX(next_batch, ?), updated_at = ? WHERE pipeline_id = ?",
+                (index + 1, _now(), self.pipeline_id)
+            )
+            
+    def _set_run_status(self, status: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE pipeline_id = ?",
+                (status, _now(), self.pipeline_id)
+            )
+            
+    def _run_directory(self) -> str:
+        return os.path.join(self.directory, self.pipeline_id, self.run_id)
+        
+    def _batch_path(self, index: int) -> str:
+        return os.path.join(self._run_directory(), f"batch-{index:06d}.pkl")
+        
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
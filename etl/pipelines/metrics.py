@@ -0,0 +1,422 @@
+from typing import Dict, Any, List, Optional, Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import contextlib
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+# 批次耗时直方图的默认桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STATUS_CODES = {'ok': 1, 'error': 2}
+
+
+class Histogram:
+    """累积直方图（Prometheus 语义：每个桶统计 <= 上界的观测数）"""
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                
+    def quantile(self, q: float) -> float:
+        """按桶线性插值估算分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, previous = 0.0, 0
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                inside = cumulative - previous
+                return lower + (bound - lower) * ((rank - previous) / inside if inside else 0.0)
+            lower, previous = bound, cumulative
+        return self.buckets[-1]
+
+
+class PipelineMetrics:
+    """管道阶段指标与追踪 span
+    
+    - 每个阶段（extract/transform/load）的累计耗时、记录数、估算字节数和批次耗时直方图
+    - 队列深度（当前值与最大值）
+    - 每次运行的 span（管道 -> 阶段 -> 可选的批次），可导出为 OTLP JSON
+    计数器和直方图在进程内累计（Prometheus 语义），summary() 只返回本次运行的增量。
+    """
+    
+    def __init__(self, pipeline_id: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.pipeline_id = pipeline_id
+        self.buckets = tuple(config.get('histogram_buckets') or DEFAULT_BUCKETS)
+        self.trace_batches = config.get('trace_batches', False)
+        self.max_spans = config.get('max_spans', 10000)
+        self.bytes_sample = config.get('bytes_sample', 100)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_records: Dict[str, int] = {}
+        self.stage_bytes: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.queue_depth: Dict[str, int] = {}
+        self.queue_depth_max: Dict[str, int] = {}
+        self.runs = {'completed': 0, 'failed': 0}
+        self.last_run: Dict[str, Any] = {}
+        
+        self.trace_id = None
+        self.spans: List[Dict[str, Any]] = []
+        self._root = None
+        self._baseline: Dict[str, Dict[str, float]] = {}
+        self._run_start = None
+        
+    def start_run(self) -> None:
+        """开始一次运行：新建 trace 与根 span，记录计数器基线"""
+        with self._lock:
+            self.trace_id = secrets.token_hex(16)
+            self.spans = []
+            self.queue_depth_max = {}
+            self._baseline = {
+                'seconds': dict(self.stage_seconds),
+                'records': dict(self.stage_records),
+                'bytes': dict(self.stage_bytes),
+                'batches': {stage: histogram.count for stage, histogram in self.histograms.items()}
+            }
+        self._run_start = time.perf_counter()
+        self._root = self.start_span(f"pipeline {self.pipeline_id}", parent=None, pipeline=self.pipeline_id)
+        
+    def finish_run(self, status: str, records: int, error: Optional[Exception] = None) -> Dict[str, Any]:
+        """结束本次运行，返回本次的汇总"""
+        seconds = time.perf_counter() - self._run_start if self._run_start is not None else 0.0
+        if self._root is not None:
+            self._root['attributes']['records'] = records
+            self.end_span(self._root, error)
+            self._root = None
+        with self._lock:
+            self.runs[status] = self.runs.get(status, 0) + 1
+            self.last_run = {
+                'status': status,
+                'seconds': seconds,
+                'records': records,
+                'records_per_second': records / seconds if seconds else 0.0,
+                'timestamp': time.time()
+            }
+        return self.summary()
+        
+    @contextlib.contextmanager
+    def stage(self, name: str, parent: Optional[Dict[str, Any]] = None):
+        """记录一个阶段的总耗时并生成阶段 span；阶段内可继续调用 observe_batch"""
+        span = self.start_span(name, parent=parent or self._root, stage=name)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        finally:
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - start
+        self.end_span(span)
+        
+    def observe_batch(
+        self,
+        stage: str,
+        seconds: float,
+        batch: Optional[List[Dict[str, Any]]] = None,
+        records: Optional[int] = None,
+        parent: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """记录一个批次：耗时进入直方图，累加记录数和估算字节数"""
+        records = len(batch) if records is None and batch is not None else (records or 0)
+        size = estimate_bytes(batch, self.bytes_sample) if batch else 0
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self.stage_records[stage] = self.stage_records.get(stage, 0) + records
+            self.stage_bytes[stage] = self.stage_bytes.get(stage, 0) + size
+        if self.trace_batches and parent is not None:
+            end = time.time_ns()
+            span = self.start_span(f"{stage} batch", parent=parent, start_ns=end - int(seconds * 1e9),
+                                   stage=stage, records=records, bytes=size)
+            self.end_span(span, end_ns=end)
+            
+    def set_queue_depth(self, queue: str, depth: int) -> None:
+        with self._lock:
+            self.queue_depth[queue] = depth
+            self.queue_depth_max[queue] = max(depth, self.queue_depth_max.get(queue, 0))
+            
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+        **attributes: Any
+    ) -> Dict[str, Any]:
+        return {
+            'name': name,
+            'span_id': secrets.token_hex(8),
+            'parent_span_id': parent['span_id'] if parent else None,
+            'start_ns': start_ns or time.time_ns(),
+            'end_ns': None,
+            'attributes': attributes,
+            'status': 'ok',
+            'message': None
+        }
+        
+    def end_span(self, span: Dict[str, Any], error: Optional[BaseException] = None, end_ns: Optional[int] = None) -> None:
+        if span['end_ns'] is not None:
+            return
+        span['end_ns'] = end_ns or time.time_ns()
+        if error is not None:
+            span['status'] = 'error'
+            span['message'] = str(error) or type(error).__name__
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+                
+    def summary(self) -> Dict[str, Any]:
+        """本次运行的阶段耗时、记录数、字节数、批次数与批次耗时分位数"""
+        with self._lock:
+            stages = {}
+            for stage in sorted(set(self.stage_seconds) | set(self.histograms)):
+                histogram = self.histograms.get(stage)
+                seconds = self.stage_seconds.get(stage, 0.0) - self._baseline.get('seconds', {}).get(stage, 0.0)
+                records = self.stage_records.get(stage, 0) - self._baseline.get('records', {}).get(stage, 0)
+                stages[stage] = {
+                    'seconds': seconds,
+                    'records': records,
+                    'bytes': self.stage_bytes.get(stage, 0) - self._baseline.get('bytes', {}).get(stage, 0),
+                    'batches': (histogram.count if histogram else 0) - self._baseline.get('batches', {}).get(stage, 0),
+                    'records_per_second': records / seconds if seconds else 0.0,
+                    # 直方图在进程内累计，分位数为累计估算值
+                    'batch_p50': histogram.quantile(0.5) if histogram else 0.0,
+                    'batch_p95': histogram.quantile(0.95) if histogram else 0.0
+                }
+            return {
+                **self.last_run,
+                'stages': stages,
+                'queue_depth_max': dict(self.queue_depth_max)
+            }
+            
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（exposition format 0.0.4）"""
+        return render_prometheus([self])
+        
+    def _prometheus_lines(self) -> Dict[str, List[str]]:
+        pipeline = f'pipeline="{_escape(self.pipeline_id)}"'
+        lines: Dict[str, List[str]] = {name: [] for name in METRIC_HELP}
+        with self._lock:
+            for stage, seconds in sorted(self.stage_seconds.items()):
+                lines['etl_pipeline_stage_seconds_total'].append(
+                    f'etl_pipeline_stage_seconds_total{{{pipeline},stage="{_escape(stage)}"}} {_number(seconds)}')
+            for stage, records in sorted(self.stage_records.items()):
+                labels = f'{pipeline},stage="{_escape(stage)}"'
+                lines['etl_pipeline_records_total'].append(f'etl_pipeline_records_total{{{labels}}} {records}')
+                lines['etl_pipeline_bytes_total'].append(f'etl_pipeline_bytes_total{{{labels}}} {self.stage_bytes.get(stage, 0)}')
+            for stage, histogram in sorted(self.histograms.items()):
+                labels = f'{pipeline},stage="{_escape(stage)}"'
+                name = 'etl_pipeline_batch_duration_seconds'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines[name].append(f'{name}_bucket{{{labels},le="{_number(bound)}"}} {count}')
+                lines[name].append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines[name].append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+                lines[name].append(f'{name}_count{{{labels}}} {histogram.count}')
+            for queue, depth in sorted(self.queue_depth.items()):
+                labels = f'{pipeline},queue="{_escape(queue)}"'
+                lines['etl_pipeline_queue_depth'].append(f'etl_pipeline_queue_depth{{{labels}}} {depth}')
+                lines['etl_pipeline_queue_depth_max'].append(
+                    f'etl_pipeline_queue_depth_max{{{labels}}} {self.queue_depth_max.get(queue, depth)}')
+            for status, count in sorted(self.runs.items()):
+                lines['etl_pipeline_runs_total'].append(
+                    f'etl_pipeline_runs_total{{{pipeline},status="{_escape(status)}"}} {count}')
+            if self.last_run:
+                lines['etl_pipeline_last_run_seconds'].append(
+                    f'etl_pipeline_last_run_seconds{{{pipeline}}} {_number(self.last_run["seconds"])}')
+                lines['etl_pipeline_last_run_records_per_second'].append(
+                    f'etl_pipeline_last_run_records_per_second{{{pipeline}}} {_number(self.last_run["records_per_second"])}')
+                lines['etl_pipeline_last_run_success'].append(
+                    f'etl_pipeline_last_run_success{{{pipeline}}} {int(self.last_run["status"] == "completed")}')
+                lines['etl_pipeline_last_run_timestamp_seconds'].append(
+                    f'etl_pipeline_last_run_timestamp_seconds{{{pipeline}}} {_number(self.last_run["timestamp"])}')
+        return lines
+        
+    def to_otlp(self, service_name: str = 'etl') -> Dict[str, Any]:
+        """本次运行的 span，OTLP/JSON 格式（可由 OpenTelemetry Collector 的 otlpjsonfile 接收器读取）"""
+        with self._lock:
+            spans = [_otlp_span(span, self.trace_id) for span in self.spans]
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', service_name)]},
+                'scopeSpans': [{'scope': {'name': 'etl.pipelines'}, 'spans': spans}]
+            }]
+        }
+        
+    def write_prometheus(self, path: str) -> None:
+        """写入 .prom 文件（node_exporter textfile collector），先写临时文件再原子替换"""
+        _write_atomic(path, self.to_prometheus())
+        
+    def write_trace(self, path: str, service_name: str = 'etl') -> None:
+        """追加本次运行的 span（每次运行一行 OTLP JSON）"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.to_otlp(service_name)) + '\n')
+
+
+# 指标名 -> (类型, 说明)，同时决定输出顺序
+METRIC_HELP = {
+    'etl_pipeline_stage_seconds_total': ('counter', 'Wall time spent in each pipeline stage, including queue waits when streaming'),
+    'etl_pipeline_records_total': ('counter', 'Records processed by each pipeline stage'),
+    'etl_pipeline_bytes_total': ('counter', 'Estimated JSON size of records processed by each stage'),
+    'etl_pipeline_batch_duration_seconds': ('histogram', 'Per-batch latency of each pipeline stage'),
+    'etl_pipeline_queue_depth': ('gauge', 'Current number of batches waiting in a stage queue'),
+    'etl_pipeline_queue_depth_max': ('gauge', 'Maximum queue depth during the last run'),
+    'etl_pipeline_runs_total': ('counter', 'Pipeline runs by final status'),
+    'etl_pipeline_last_run_seconds': ('gauge', 'Duration of the last pipeline run'),
+    'etl_pipeline_last_run_records_per_second': ('gauge', 'Throughput of the last pipeline run'),
+    'etl_pipeline_last_run_success': ('gauge', 'Whether the last pipeline run completed'),
+    'etl_pipeline_last_run_timestamp_seconds': ('gauge', 'Unix time when the last pipeline run finished')
+}
+
+
+class MetricsRegistry:
+    """进程内所有管道指标的集合，HTTP 端点输出其中全部管道"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, PipelineMetrics] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.logger = logging.getLogger(__name__)
+        
+    def register(self, metrics: PipelineMetrics) -> PipelineMetrics:
+        with self._lock:
+            self._metrics[metrics.pipeline_id] = metrics
+        return metrics
+        
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return render_prometheus(metrics)
+        
+    def serve(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """在后台线程提供 /metrics（同一进程只启动一次）"""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            registry = self
+            
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    
+                def log_message(self, format: str, *args: Any) -> None:
+                    pass
+                    
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=self._server.serve_forever, name='etl-metrics', daemon=True).start()
+            self.logger.info(f"Serving pipeline metrics on http://{host}:{self._server.server_port}/metrics")
+            return self._server
+            
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+                self._server = None
+
+
+registry = MetricsRegistry()
+
+
+def render_prometheus(metrics: Sequence[PipelineMetrics]) -> str:
+    """把多个管道的指标合并为一份 Prometheus 文本（每个指标只输出一次 HELP/TYPE）"""
+    merged: Dict[str, List[str]] = {name: [] for name in METRIC_HELP}
+    for item in metrics:
+        for name, lines in item._prometheus_lines().items():
+            merged[name].extend(lines)
+    output = []
+    for name, lines in merged.items():
+        if not lines:
+            continue
+        kind, help_text = METRIC_HELP[name]
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(lines)
+    return '\n'.join(output) + '\n'
+
+
+def estimate_bytes(batch: List[Dict[str, Any]], sample: int = 100) -> int:
+    """按前 sample 条记录的 JSON 长度估算整个批次的大小"""
+    if not batch:
+        return 0
+    head = batch[:sample] if sample else batch
+    size = len(json.dumps(head, default=str, ensure_ascii=False).encode('utf-8'))
+    return int(size * len(batch) / len(head))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _otlp_span(span: Dict[str, Any], trace_id: str) -> Dict[str, Any]:
+    result = {
+        'traceId': trace_id,
+        'spanId': span['span_id'],
+        'name': span['name'],
+        'kind': 1,
+        'startTimeUnixNano': str(span['start_ns']),
+        'endTimeUnixNano': str(span['end_ns']),
+        'attributes': [_otlp_attribute(key, value) for key, value in span['attributes'].items()],
+        'status': {'code': STATUS_CODES[span['status']]}
+    }
+    if span['parent_span_id']:
+        result['parentSpanId'] = span['parent_span_id']
+    if span['message']:
+        result['status']['message'] = span['message']
+    return result
+
+
+def _write_atomic(path: str, text: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
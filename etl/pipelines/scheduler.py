@@ -0,0 +1,178 @@
+from typing import Dict, Any, List, Optional, Sequence
+import asyncio
+import contextlib
+import logging
+import time
+
+from .base_pipeline import BasePipeline
+
+
+class PipelineScheduler:
+    """本地 DAG 调度器：按依赖关系并发执行多个 BasePipeline
+    
+    - 依赖全部成功后管道才会开始，上游失败的管道标记为 skipped
+    - 无依赖关系的管道并发执行，总并发数受 max_concurrency 限制
+    - 每个管道可以声明占用的资源（如 postgres、s3），同一资源同时运行的管道数受 resource_limits 限制
+    - 运行结束后报告每个管道的等待/执行时间与关键路径（决定总耗时的依赖链）
+    """
+    
+    def __init__(
+        self,
+        resource_limits: Optional[Dict[str, int]] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        self.resource_limits = dict(resource_limits or {})
+        self.max_concurrency = max_concurrency
+        self.logger = logging.getLogger(__name__)
+        self.pipelines: Dict[str, BasePipeline] = {}
+        self.dependencies: Dict[str, List[str]] = {}
+        self.resources: Dict[str, List[str]] = {}
+        self.report: Dict[str, Any] = {}
+        
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'PipelineScheduler':
+        """使用 etl_config.yml 的 scheduler 段"""
+        options = config.get('scheduler') or {}
+        return cls(options.get('resource_limits'), options.get('max_concurrency'))
+        
+    def add(
+        self,
+        pipeline: BasePipeline,
+        depends_on: Sequence[str] = (),
+        resources: Optional[Sequence[str]] = None
+    ) -> None:
+        """添加管道；resources 省略时使用管道的 resources 属性（若有）"""
+        pipeline_id = pipeline.pipeline_id
+        if pipeline_id in self.pipelines:
+            raise ValueError(f"Duplicate pipeline: {pipeline_id}")
+        self.pipelines[pipeline_id] = pipeline
+        self.dependencies[pipeline_id] = list(depends_on)
+        self.resources[pipeline_id] = sorted(set(resources if resources is not None else getattr(pipeline, 'resources', ())))
+        
+    def order(self) -> List[str]:
+        """拓扑顺序；依赖不存在或存在环时抛出 ValueError"""
+        for pipeline_id, dependencies in self.dependencies.items():
+            missing = [dependency for dependency in dependencies if dependency not in self.pipelines]
+            if missing:
+                raise ValueError(f"Pipeline {pipeline_id} depends on unknown pipelines: {', '.join(missing)}")
+        remaining = {pipeline_id: set(dependencies) for pipeline_id, dependencies in self.dependencies.items()}
+        order = []
+        while remaining:
+            ready = sorted(pipeline_id for pipeline_id, dependencies in remaining.items() if not dependencies)
+            if not ready:
+                raise ValueError(f"Dependency cycle among pipelines: {', '.join(sorted(remaining))}")
+            order.extend(ready)
+            for pipeline_id in ready:
+                del remaining[pipeline_id]
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+        return order
+        
+    async def run(self) -> Dict[str, Any]:
+        """执行全部管道，返回运行报告（同时保存在 self.report）"""
+        order = self.order()
+        limits = {
+            resource: asyncio.Semaphore(limit) for resource, limit in self.resource_limits.items()
+        }
+        unknown = {resource for resources in self.resources.values() for resource in resources} - set(limits)
+        if unknown:
+            self.logger.warning(f"No concurrency limit for resources: {', '.join(sorted(unknown))}")
+        slots = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        finished = {pipeline_id: asyncio.Event() for pipeline_id in order}
+        results: Dict[str, Dict[str, Any]] = {}
+        origin = time.perf_counter()
+        
+        async def run_one(pipeline_id: str) -> None:
+            result = results[pipeline_id] = {'status': 'pending', 'resources': self.resources[pipeline_id]}
+            try:
+                for dependency in self.dependencies[pipeline_id]:
+                    await finished[dependency].wait()
+                failed = [
+                    dependency for dependency in self.dependencies[pipeline_id]
+                    if results[dependency]['status'] != 'completed'
+                ]
+                result['ready'] = time.perf_counter() - origin
+                if failed:
+                    result['status'] = 'skipped'
+                    self.logger.warning(f"Skipping {pipeline_id}: upstream {', '.join(failed)} did not complete")
+                    return
+                async with contextlib.AsyncExitStack() as stack:
+                    # 按名称顺序获取资源，避免互相等待；全局槽位最后获取，
+                    # 等待资源的管道不占用槽位，不会阻塞不需要该资源的管道
+                    for resource in self.resources[pipeline_id]:
+                        if resource in limits:
+                            await stack.enter_async_context(limits[resource])
+                    if slots is not None:
+                        await stack.enter_async_context(slots)
+                    result['start'] = time.perf_counter() - origin
+                    self.logger.info(f"Starting {pipeline_id}")
+                    success = await self.pipelines[pipeline_id].execute()
+                    result['end'] = time.perf_counter() - origin
+                result['status'] = 'completed' if success else 'failed'
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+                result.setdefault('end', time.perf_counter() - origin)
+                self.logger.error(f"Pipeline {pipeline_id} raised: {str(e)}")
+            finally:
+                finished[pipeline_id].set()
+                
+        await asyncio.gather(*(run_one(pipeline_id) for pipeline_id in order))
+        self.report = self._build_report(order, results, time.perf_counter() - origin)
+        self._log_report(self.report)
+        return self.report
+        
+    def _build_report(self, order: List[str], results: Dict[str, Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+        for result in results.values():
+            if 'start' in result:
+                result['seconds'] = result['end'] - result['start']
+                # 依赖满足后等待并发槽位/资源的时间
+                result['waited'] = result['start'] - result['ready']
+        critical_path = self._critical_path(order, results)
+        statuses = [results[pipeline_id]['status'] for pipeline_id in order]
+        return {
+            'status': 'completed' if all(status == 'completed' for status in statuses) else 'failed',
+            'seconds': seconds,
+            'pipelines': {pipeline_id: results[pipeline_id] for pipeline_id in order},
+            'critical_path': critical_path,
+            'critical_path_seconds': sum(results[pipeline_id]['seconds'] for pipeline_id in critical_path),
+            'critical_path_waited': sum(results[pipeline_id]['waited'] for pipeline_id in critical_path),
+            'counts': {status: statuses.count(status) for status in sorted(set(statuses))}
+        }
+        
+    def _critical_path(self, order: List[str], results: Dict[str, Dict[str, Any]]) -> List[str]:
+        """从最后结束的管道开始，沿着最晚结束的依赖回溯（实际决定开始时间的那条链）"""
+        executed = [pipeline_id for pipeline_id in order if 'end' in results[pipeline_id] and 'start' in results[pipeline_id]]
+        if not executed:
+            return []
+        path = [max(executed, key=lambda pipeline_id: results[pipeline_id]['end'])]
+        while True:
+            dependencies = [
+                dependency for dependency in self.dependencies[path[-1]]
+                if 'end' in results[dependency] and 'start' in results[dependency]
+            ]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda dependency: results[dependency]['end']))
+        return path[::-1]
+        
+    def _log_report(self, report: Dict[str, Any]) -> None:
+        lines = [f"Scheduler run {report['status']} in {report['seconds']:.2f}s ({report['counts']})"]
+        for pipeline_id, result in report['pipelines'].items():
+            if 'seconds' in result:
+                lines.append(
+                    f"  {pipeline_id:<30} {result['status']:<10} start {result['start']:8.2f}s "
+                    f"run {result['seconds']:8.2f}s waited {result['waited']:6.2f}s"
+                )
+            else:
+                lines.append(f"  {pipeline_id:<30} {result['status']}")
+        if report['critical_path']:
+            lines.append(
+                f"Critical path ({report['critical_path_seconds']:.2f}s running, "
+                f"{report['critical_path_waited']:.2f}s waiting for slots): "
+                + ' -> '.join(
+                    f"{pipeline_id} ({report['pipelines'][pipeline_id]['seconds']:.2f}s)"
+                    for pipeline_id in report['critical_path']
+                )
+            )
+        self.logger.info('\n'.join(lines))
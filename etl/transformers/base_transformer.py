@@ -1,32 +1,117 @@
-from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from abc import ABC
+from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
 class BaseTransformer(ABC):
-    """数据转换器基类"""
+    """数据转换器基类
+    
+    批量接口按列处理整个批次：transform_batch() 把记录转成数据框，交给 transform_frame()
+    做向量化转换，再按 null_handling 转回记录。日期列（transformations.date_columns）整列解析，
+    每列实际使用的格式会被缓存，配置的 date_format 不匹配时自动推断一次，之后的批次直接复用。
+    _handle_null_values/_format_dates 是逐条记录的旧接口，保留用于兼容。
+    """
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self._date_formats: Dict[Any, str] = {}
         
-    @abstractmethod
     async def transform(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """转换数据的抽象方法"""
-        pass
+        """转换数据，默认使用批量接口"""
+        return await self.transform_batch(data)
+        
+    async def transform_batch(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按列转换一批记录"""
+        if not data:
+            return []
+        df = self.transform_frame(self._frame_from_records(data))
+        return self._frame_to_records(df)
+        
+    def transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """列式转换，默认解析日期列；子类覆盖时可先调用本方法再添加自己的向量化步骤"""
+        for column in self.config['transformations'].get('date_columns') or []:
+            if column in df.columns:
+                df[column] = self.parse_dates(df[column], column)
+        return df
+        
+    def parse_dates(self, values: Any, column: Optional[str] = None) -> pd.Series:
+        """向量化解析日期；按列缓存格式，配置的格式不匹配时从第一个非空值推断"""
+        series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        key = column if column is not None else series.name
+        date_format = self._date_formats.get(key, self.config['transformations']['date_format'])
+        try:
+            parsed = pd.to_datetime(series, format=date_format)
+        except (ValueError, TypeError) as e:
+            inferred = _infer_date_format(series)
+            if inferred is None or inferred == date_format:
+                self.logger.error(f"Date format error in {key}: {str(e)}")
+                raise ValueError(str(e)) from e
+            try:
+                parsed = pd.to_datetime(series, format=inferred)
+            except (ValueError, TypeError) as e:
+                self.logger.error(f"Date format error in {key}: {str(e)}")
+                raise ValueError(str(e)) from e
+            self.logger.info(f"Inferred date format {inferred!r} for {key}")
+            date_format = inferred
+        self._date_formats[key] = date_format
+        return parsed
+        
+    def _frame_from_records(self, data: List[Dict[str, Any]]) -> pd.DataFrame:
+        df = pd.DataFrame.from_records(data)
+        # 含 None 的整数列会被转成 float64（超过 2^53 的值会失真），
+        # 改为直接用记录中的原始值构建可空整数列
+        for column in df.columns[(df.dtypes == np.float64).to_numpy()]:
+            values = df[column]
+            if values.hasnans:
+                first = data[int(np.argmax(values.notna().to_numpy()))].get(column)
+                if isinstance(first, (int, np.integer)) and not isinstance(first, bool):
+                    try:
+                        df[column] = pd.array([record.get(column) for record in data], dtype='Int64')
+                    except (TypeError, ValueError, OverflowError):
+                        # 混有小数或超出 int64 范围时保留原始对象，不经过 float64
+                        df[column] = pd.Series([record.get(column) for record in data], dtype=object)
+        return df
+        
+    def _frame_to_records(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """按列转回记录：日期为 datetime，缺失值（None/NaN/NaT/NA）为 None，null_handling 为 drop 时去掉这些字段"""
+        missing = df.isna().to_numpy()
+        columns = []
+        for i, name in enumerate(df.columns):
+            column = df[name]
+            if pd.api.types.is_datetime64_any_dtype(column):
+                values = np.asarray(column.dt.to_pydatetime(), dtype=object)
+            else:
+                values = column.to_numpy(dtype=object)
+            if missing[:, i].any():
+                values = np.where(missing[:, i], None, values)
+            columns.append(values.tolist())
+        names = list(df.columns)
+        records = [dict(zip(names, row)) for row in zip(*columns)]
+        if self.config['transformations']['null_handling'] == 'drop' and missing.any():
+            # 只有含空值的行需要重建
+            for i in np.flatnonzero(missing.any(axis=1)):
+                records[i] = {k: v for k, v in records[i].items() if v is not None}
+        return records
         
     async def validate_schema(self, data: List[Dict[str, Any]]) -> bool:
         """验证数据模式"""
         return True
         
     async def _handle_null_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """处理空值"""
+        """处理空值（逐条记录的兼容接口，批量处理请使用 transform_batch）"""
         if self.config['transformations']['null_handling'] == 'drop':
             return {k: v for k, v in data.items() if v is not None}
         return data
         
     async def _format_dates(self, date_str: str) -> datetime:
-        """格式化日期"""
+        """格式化日期（逐个值的兼容接口，批量处理请使用 parse_dates）"""
         try:
             return datetime.strptime(
                 date_str, 
@@ -35,3 +120,10 @@ class BaseTransformer(ABC):
         except ValueError as e:
             self.logger.error(f"Date format error: {str(e)}")
             raise
+
+
+def _infer_date_format(series: pd.Series) -> Optional[str]:
+    non_null = series.dropna()
+    if non_null.empty:
+        return None
+    return guess_datetime_format(str(non_null.iloc[0]))
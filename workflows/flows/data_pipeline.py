@@ -5,9 +5,10 @@ import yaml
 import os
 from typing import Dict, Any
 
-from ..tasks.extract_tasks import extract_from_postgres, extract_from_s3
+from ..tasks.extract_tasks import extract_incremental_from_postgres, extract_from_s3, incremental_extractor
 from ..tasks.transform_tasks import clean_data, transform_data
 from ..tasks.data_quality import validate_data_quality, check_data_freshness
+from .step_graph import StepGraph
 
 @flow(
     name="main_data_pipeline",
@@ -27,52 +28,83 @@ async def main_data_pipeline(
     
     with open(config_path) as f:
         config = yaml.safe_load(f)
+        
+    # 只提取上次成功运行之后变化的行，水位在整个流程成功后才提交
+    extractor = incremental_extractor(
+        "source_table",
+        config['source']['postgres'],
+        config['incremental']['source_table']
+    )
     
     try:
+        # 按依赖关系执行：两个提取并发进行，每个清洗在其输入到达后立即开始
+        steps = StepGraph()
+        
         # 1. 提取数据
-        postgres_data = await extract_from_postgres(
-            query="SELECT * FROM source_table",
-            connection_params=config['source']['postgres']
+        postgres_data = steps.add(
+            'extract_from_postgres',
+            extract_incremental_from_postgres,
+            extractor
         )
         
-        s3_data = await extract_from_s3(
+        s3_data = steps.add(
+            'extract_from_s3',
+            extract_from_s3,
             bucket=config['source']['s3']['bucket'],
             key="raw_data/latest.parquet"
         )
         
         # 2. 检查数据新鲜度
-        await check_data_freshness(
+        freshness = steps.add(
+            'check_data_freshness',
+            check_data_freshness,
             data=postgres_data,
             timestamp_column='created_at',
             max_delay_hours=24
         )
         
         # 3. 数据清洗
-        clean_postgres_data = await clean_data(postgres_data)
-        clean_s3_data = await clean_data(s3_data)
+        clean_postgres_data = steps.add('clean_postgres_data', clean_data, postgres_data)
+        steps.add('clean_s3_data', clean_data, s3_data)
         
         # 4. 数据转换
-        transformed_data = await transform_data(
+        transformed = steps.add(
+            'transform_data',
+            transform_data,
             df=clean_postgres_data,
             transformations=config['transformations']
         )
         
-        # 5. 数据质量验证
-        validation_results = await validate_data_quality(
-            data=transformed_data,
-            expectations_suite="production_suite"
+        # 5. 数据质量验证（新鲜度检查通过后）
+        validation = steps.add(
+            'validate_data_quality',
+            validate_data_quality,
+            data=transformed,
+            expectations_suite="production_suite",
+            after=[freshness]
         )
         
+        try:
+            await steps.run()
+        finally:
+            timings = steps.report()
+            steps.log_report(timings)
+        transformed_data = transformed.result()
+        extractor.commit_watermark()
+        
         return {
             "status": "success",
-            "validation_results": validation_results,
-            "records_processed": len(transformed_data)
+            "validation_results": validation.result(),
+            "records_processed": len(transformed_data),
+            "timings": timings
         }
         
     except Exception as e:
         # 发送失败通知
         await send_failure_notification(str(e))
         raise
+    finally:
+        extractor.connection.close()
 
 @flow(
     name="scheduled_pipeline",
@@ -0,0 +1,120 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class Step:
+    """流程中的一个步骤：参数中的 Step 会被替换为其结果，并构成依赖"""
+    
+    def __init__(self, name: str, func: Callable, args: tuple, kwargs: Dict[str, Any], after: Sequence['Step']):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.dependencies = list(dict.fromkeys(
+            [value for value in list(args) + list(kwargs.values()) if isinstance(value, Step)] + list(after)
+        ))
+        self.task: Optional[asyncio.Task] = None
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+        
+    def result(self) -> Any:
+        return self.task.result()
+
+
+class StepGraph:
+    """按依赖关系并发执行流程步骤，并记录每个步骤的耗时
+    
+    每个步骤在其依赖全部完成后立即开始，互不依赖的步骤并发执行；
+    任一步骤失败时取消其余步骤并抛出该错误。运行结束后 report() 给出每个步骤的
+    开始/结束时间与关键路径（从最后结束的步骤沿最晚结束的依赖回溯）。
+    """
+    
+    def __init__(self):
+        self.steps: Dict[str, Step] = {}
+        self.origin: Optional[float] = None
+        self.logger = logging.getLogger(__name__)
+        
+    def add(self, name: str, func: Callable, *args: Any, after: Sequence[Step] = (), **kwargs: Any) -> Step:
+        """添加步骤；after 为没有通过参数传递结果的额外依赖"""
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        step = self.steps[name] = Step(name, func, args, kwargs, after)
+        return step
+        
+    async def run(self) -> Dict[str, Any]:
+        """执行全部步骤，返回 {步骤名: 结果}"""
+        self.origin = time.perf_counter()
+        for step in self.steps.values():
+            step.task = asyncio.ensure_future(self._run_step(step))
+        tasks = [step.task for step in self.steps.values()]
+        try:
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in finished:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return {name: step.result() for name, step in self.steps.items()}
+        
+    async def _run_step(self, step: Step) -> Any:
+        for dependency in step.dependencies:
+            await asyncio.shield(dependency.task)
+        args = [_resolve(value) for value in step.args]
+        kwargs = {key: _resolve(value) for key, value in step.kwargs.items()}
+        step.start = time.perf_counter() - self.origin
+        try:
+            result = step.func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            step.end = time.perf_counter() - self.origin
+            
+    def critical_path(self) -> List[str]:
+        finished = [step for step in self.steps.values() if step.end is not None and step.start is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda step: step.end)]
+        while True:
+            dependencies = [step for step in path[-1].dependencies if step.end is not None]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda step: step.end))
+        return [step.name for step in reversed(path)]
+        
+    def report(self) -> Dict[str, Any]:
+        steps = {
+            name: {
+                'start': step.start,
+                'end': step.end,
+                'seconds': step.end - step.start,
+                'depends_on': [dependency.name for dependency in step.dependencies]
+            }
+            for name, step in self.steps.items() if step.start is not None and step.end is not None
+        }
+        path = self.critical_path()
+        return {
+            'seconds': max((step['end'] for step in steps.values()), default=0.0),
+            'steps': steps,
+            'critical_path': path,
+            'critical_path_seconds': sum(steps[name]['seconds'] for name in path)
+        }
+        
+    def log_report(self, report: Optional[Dict[str, Any]] = None) -> None:
+        report = report or self.report()
+        lines = [f"Flow steps finished in {report['seconds']:.2f}s"]
+        for name, step in sorted(report['steps'].items(), key=lambda item: item[1]['start']):
+            lines.append(f"  {name:<28} start {step['start']:8.2f}s  run {step['seconds']:8.2f}s")
+        lines.append("Critical path: " + ' -> '.join(
+            f"{name} ({report['steps'][name]['seconds']:.2f}s)" for name in report['critical_path']
+        ))
+        self.logger.info('\n'.join(lines))
+
+
+def _resolve(value: Any) -> Any:
+    return value.result() if isinstance(value, Step) else value
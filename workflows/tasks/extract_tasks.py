@@ -1,8 +1,16 @@
 from prefect import task
 from prefect.tasks.database.postgres import PostgresExecute
 from prefect.tasks.aws import S3Download
+import asyncio
 import pandas as pd
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from data_processing.processors.backends import BACKENDS, read_parquet
+from data_processing.processors.memory_optimizer import MemoryOptimizer
+from database.postgresql.connection import PostgreSQLConnection
+from database.postgresql.partitioning import check_partitionable, partition_queries, plan_ranges, table_from_query
+from etl.extractors.incremental_extractor import IncrementalExtractor
+from etl.extractors.postgres_extractor import PostgresExtractor
 
 @task(
     name="extract_from_postgres",
@@ -12,17 +20,184 @@ from typing import Dict, Any
 )
 async def extract_from_postgres(
     query: str,
-    connection_params: Dict[str, Any]
+    connection_params: Dict[str, Any],
+    partition_column: Optional[str] = None,
+    partitions: int = 1,
+    partition_table: Optional[str] = None,
+    memory_config: Optional[Dict[str, Any]] = None
 ) -> pd.DataFrame:
-    """从PostgreSQL提取数据"""
+    """从PostgreSQL提取数据
+    
+    给出 partition_column 且 partitions > 1 时按该列（如 created_at 或 UUID 主键）的范围
+    把查询拆为多个分区，通过连接池并行读取后按分区顺序拼接，见 iter_postgres_partitions。
+    分区模式只支持行级查询（SELECT 列 FROM 表 [WHERE ...]），结果中必须包含 partition_column；
+    含 LIMIT、ORDER BY、GROUP BY/聚合、DISTINCT、集合运算或窗口函数时抛出 ValueError，
+    因为这些子句会在每个分区内分别执行。拼接结果的行顺序不保证与单条查询相同。
+    给出 memory_config（processing_config.yml 的 memory 段）时，返回前用 MemoryOptimizer
+    降低数值精度、转换 category 与时间戳列。
+    """
     
+    if partition_column and partitions > 1:
+        parts = [
+            part async for part in iter_postgres_partitions(
+                query, connection_params, partition_column, partitions, partition_table
+            )
+        ]
+        frames = [frame for _, frame in sorted(parts, key=lambda part: part[0])]
+        return _optimize_memory(pd.concat(frames, ignore_index=True), memory_config)
+        
     postgres_task = PostgresExecute(
         **connection_params,
         task_name="postgres_extract"
     )
     
     result = await postgres_task.run(query=query)
-    return pd.DataFrame(result)
+    return _optimize_memory(pd.DataFrame(result), memory_config)
+
+@task(
+    name="extract_table_from_postgres",
+    retry_delay_seconds=30,
+    max_retries=3,
+    tags=["extract", "postgres"]
+)
+async def extract_table_from_postgres(
+    table: str,
+    connection_params: Dict[str, Any],
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 50000,
+    mode: str = "cursor",
+    keyset_columns: Optional[List[str]] = None,
+    memory_config: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """按块从PostgreSQL表提取数据（服务端游标或键集分页，只读取 columns）
+    
+    与 extract_from_postgres 不同，驱动不会一次取回全部行，客户端同时只多保留一块；
+    结果仍然完整放入内存，需要逐块处理时使用 iter_postgres_chunks。
+    """
+    
+    frames = [
+        chunk async for chunk in iter_postgres_chunks(
+            table, connection_params, columns, chunk_size, mode, keyset_columns
+        )
+    ]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns or [])
+    return _optimize_memory(df, memory_config)
+
+@task(
+    name="extract_incremental_from_postgres",
+    retry_delay_seconds=30,
+    max_retries=3,
+    tags=["extract", "postgres"]
+)
+async def extract_incremental_from_postgres(
+    extractor: IncrementalExtractor,
+    memory_config: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """只提取上次水位之后变化的行（见 incremental_extractor）
+    
+    水位不会自动保存：调用方在数据处理成功后调用 extractor.commit_watermark()，
+    失败或重试时下次运行会重新读取同一范围。没有变化的行时返回只有列名的空数据框。
+    """
+    
+    frames = [chunk async for chunk in extractor.extract_chunks()]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=extractor.config.get('columns') or await extractor.column_names())
+    return _optimize_memory(df, memory_config)
+
+def incremental_extractor(
+    table: str,
+    connection_params: Dict[str, Any],
+    incremental: Dict[str, Any],
+    columns: Optional[List[str]] = None
+) -> IncrementalExtractor:
+    """创建供 extract_incremental_from_postgres 使用的增量提取器（水位由调用方提交）"""
+    return IncrementalExtractor({
+        'table': table,
+        'columns': columns,
+        'connection': _pool_config(connection_params),
+        'incremental': {**incremental, 'auto_commit': False}
+    })
+
+async def iter_postgres_chunks(
+    table: str,
+    connection_params: Dict[str, Any],
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 50000,
+    mode: str = "cursor",
+    keyset_columns: Optional[List[str]] = None
+) -> AsyncIterator[pd.DataFrame]:
+    """用 PostgresExtractor 逐块产出数据框，提前停止迭代时释放游标和连接"""
+    extractor = PostgresExtractor({
+        'table': table,
+        'columns': columns,
+        'chunk_size': chunk_size,
+        'mode': mode,
+        'keyset_columns': keyset_columns,
+        'connection': _pool_config(connection_params)
+    })
+    try:
+        async for chunk in extractor.extract_chunks():
+            yield chunk
+    finally:
+        extractor.connection.close()
+
+async def iter_postgres_partitions(
+    query: str,
+    connection_params: Dict[str, Any],
+    partition_column: str,
+    partitions: int,
+    partition_table: Optional[str] = None,
+    max_parallel: Optional[int] = None
+) -> AsyncIterator[Tuple[int, pd.DataFrame]]:
+    """按范围分区并行读取，每个分区完成后立即产出 (分区序号, DataFrame)
+    
+    分区边界取自 partition_table（默认为查询 FROM 后的表）的 pg_stats 直方图，
+    使各分区行数接近；最多 max_parallel（默认 partitions）个分区同时执行，每个占用池中一个连接。
+    """
+    check_partitionable(query, partition_column)
+    table = partition_table or table_from_query(query)
+    if table is None:
+        raise ValueError("Cannot find the table to partition, pass partition_table")
+    parallel = max_parallel or partitions
+    db = PostgreSQLConnection({**_pool_config(connection_params), 'max_connections': parallel})
+    semaphore = asyncio.Semaphore(parallel)
+    
+    async def fetch(index: int, statement: Any, params: list) -> Tuple[int, pd.DataFrame]:
+        async with semaphore:
+            return index, await asyncio.to_thread(db.fetch_frame, statement, params, False)
+            
+    try:
+        ranges = await asyncio.to_thread(plan_ranges, db, table, partition_column, partitions)
+        tasks = [
+            asyncio.ensure_future(fetch(index, statement, params))
+            for index, (statement, params) in enumerate(partition_queries(query, partition_column, ranges))
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        db.close()
+
+def _optimize_memory(df: pd.DataFrame, memory_config: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    if memory_config is None:
+        return df
+    optimizer = MemoryOptimizer(memory_config)
+    # 提取结果只在这里使用，直接在原数据框上转换
+    optimizer.copy_mode = 'owned'
+    return optimizer.process(df)
+
+def _pool_config(connection_params: Dict[str, Any]) -> Dict[str, Any]:
+    """PostgresExecute 的参数（db_name/user/password/host/port）转为 PostgreSQLConnection 的配置"""
+    config = dict(connection_params)
+    if 'db_name' in config:
+        config['database'] = config.pop('db_name')
+    return config
 
 @task(
     name="extract_from_s3",
@@ -33,10 +208,17 @@ async def extract_from_postgres(
 async def extract_from_s3(
     bucket: str,
     key: str,
-    file_format: str = "parquet"
+    file_format: str = "parquet",
+    backend: str = "numpy"
 ) -> pd.DataFrame:
-    """从S3提取数据"""
+    """从S3提取数据
     
+    backend 为 pyarrow 时（与 processing_config.yml 的 execution.backend 一致）直接使用
+    Arrow 列（pd.ArrowDtype），Parquet 读取不再转换为 NumPy/object 列。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+        
     s3_task = S3Download(
         bucket=bucket,
         task_name="s3_extract"
@@ -45,8 +227,10 @@ async def extract_from_s3(
     local_path = await s3_task.run(key=key)
     
     if file_format == "parquet":
-        return pd.read_parquet(local_path)
+        return read_parquet(local_path, backend)
     elif file_format == "csv":
+        if backend == "pyarrow":
+            return pd.read_csv(local_path, engine="pyarrow", dtype_backend="pyarrow")
         return pd.read_csv(local_path)
     else:
         raise ValueError(f"Unsupported file format: {file_format}")